@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Micro-benchmark of the image matcher against the former substring scans.
+
+    PYTHONPATH=. python benchmarks/bench_matcher.py
+"""
+
+import timeit
+
+from surfaceimagecontentgap import matcher
+
+NUMBER = 200
+
+# Long article without image, and the same article with an image in its
+# infobox or at its end
+TEXT = u"Lorem ipsum dolor sit amet, [[consectetur]] {{adipiscing}}.\n" * 2000
+TEXT_LEAD = u"{{Infobox Ville\n| image = Fichier:Paris.png\n}}\n" + TEXT
+TEXT_END = TEXT + u"[[Fichier:Paris.jpg|thumb]]\n"
+
+
+def substrings(text):
+    """Image detection as done before the matcher (15 substring scans)."""
+    imagepattern = ["<gallery>", "File:", "Image:", ".jpg", ".JPG", ".gif",
+                    ".GIF", ".PNG", ".SVG", ".TIF",
+                    ".png", ".svg", ".tif", ".jpeg", ".JPEG"]
+    return any(pattern in text for pattern in imagepattern)
+
+
+def chunked(text, size=4096):
+    """Text as a stream of chunks."""
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def bench(name, function, text):
+    """Print the mean duration of function on text."""
+    duration = timeit.timeit(lambda: function(text), number=NUMBER)
+    print('%-28s %8.1f us' % (name, duration / NUMBER * 1e6))
+
+
+def main():
+    imagematcher = matcher.ImageMatcher(['File', 'Image', 'Fichier'])
+    for label, text in [('no image', TEXT),
+                        ('image in infobox', TEXT_LEAD),
+                        ('image at end', TEXT_END)]:
+        print('%s (%d characters)' % (label, len(text)))
+        bench('substrings', substrings, text)
+        bench('matcher.search', imagematcher.search, text)
+        bench('matcher.searchstream',
+              lambda t: imagematcher.searchstream(chunked(t)), text)
+
+
+if __name__ == '__main__':
+    main()
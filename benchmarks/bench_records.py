@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Memory benchmark of the articles kept by ContentGap: page objects and
+ranking dictionaries against records.
+
+    PYTHONPATH=. python benchmarks/bench_records.py
+"""
+
+import sys
+
+from surfaceimagecontentgap import records
+
+ARTICLES = 100000
+
+
+class Page(object):
+
+    """Page with the attributes of a mwclient.Page after its info query."""
+    def __init__(self, site, name, pageid):
+        self.site = site
+        self.name = name
+        self.page_title = name
+        self.base_title = name
+        self.base_name = name
+        self.namespace = 0
+        self.touched = (2016, 1, 1, 0, 0, 0, 4, 1, 0)
+        self.revision = pageid * 10
+        self.exists = True
+        self.length = 12345
+        self.protection = {}
+        self.redirect = False
+        self.pageid = pageid
+        self.contentmodel = u'wikitext'
+        self.pagelanguage = u'fr'
+        self.restrictiontypes = [u'edit', u'move']
+        self.last_rev_time = None
+        self.edit_time = None
+
+
+def size(obj):
+    """Size of an object, its instance dictionary and its attributes (the
+    shared site excepted)."""
+    total = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        items = obj.values()
+    elif hasattr(obj, '__dict__'):
+        total += sys.getsizeof(obj.__dict__)
+        items = [v for k, v in obj.__dict__.items() if k != 'site']
+    else:
+        items = [getattr(obj, slot) for slot in getattr(obj, '__slots__', [])]
+    return total + sum(sys.getsizeof(item) for item in items)
+
+
+def main():
+    site = object()
+    pages = [Page(site, u'Article %d' % n, n) for n in range(ARTICLES)]
+    # former: pages in filtered_articles, dictionaries in ranked_articles
+    former = sum(size(page) for page in pages)
+    former += sum(size({'article': page.name.encode('utf-8'),
+                        'evaluation': page.pageid}) for page in pages)
+    # records in filtered_articles and ranked_articles
+    current = sum(size(records.record(page)) for page in pages)
+    current += sum(size(records.record(page, page.pageid)) for page in pages)
+    print('%d articles' % ARTICLES)
+    print('pages and dictionaries: %6.1f MB' % (former / 1e6))
+    print('records:                %6.1f MB' % (current / 1e6))
+    print('ratio:                  %6.1f' % (float(former) / current))
+
+
+if __name__ == '__main__':
+    main()
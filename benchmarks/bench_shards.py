@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark of contentgap.shardedrank with several processes, on articles
+whose filter is CPU bound (parsing of the fields of a long infobox, then
+image search in the wikitext).
+
+    PYTHONPATH=. python benchmarks/bench_shards.py
+"""
+
+import multiprocessing
+import time
+
+from surfaceimagecontentgap import contentgap, matcher
+
+ARTICLES = 2000
+FIELDS = 300
+TOP = 100
+PROCESSES = [1, 2, 4, 8]
+
+# compiled once by each process
+MATCHER = matcher.ImageMatcher()
+
+
+class TextArticle(object):
+
+    """Article with its wikitext."""
+    def __init__(self, name, text):
+        self.name = name
+        self.content = text
+
+
+def article(number):
+    """Article with a long infobox, an image in it for a third."""
+    fields = [u' | field%d = value [[link %d]]' % (n, n)
+              for n in range(FIELDS)]
+    if number % 3 == 0:
+        fields.append(u' | image = Image %d.jpg' % number)
+    text = u'{{Infobox\n%s\n}}\nText.' % u'\n'.join(fields)
+    return TextArticle(u'Article %d' % number, text)
+
+
+def infobox(text):
+    """Fields of the infobox of a wikitext."""
+    fields = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith(u'|') and u'=' in line:
+            name, _, value = line[1:].partition(u'=')
+            fields[name.strip().lower()] = value.strip()
+    return fields
+
+
+def hasnoimage(article):
+    """Filter of articles without image, in their infobox or text."""
+    if infobox(article.content).get(u'image'):
+        return False
+    return not MATCHER.search(article.content)
+
+
+def length(article):
+    """Evaluation of an article, with many equal scores."""
+    return len(article.name)
+
+
+def main():
+    articles = [article(n) for n in range(ARTICLES)]
+    callback = {'timer': 600, 'function': lambda gap: None}
+    gap = contentgap.ContentGap(articles, top=TOP)
+    start = time.time()
+    gap.filterandrank([hasnoimage], length, callback)
+    serial = time.time() - start
+    print('%d cores' % multiprocessing.cpu_count())
+    print('serial:      %6.2f s, %7.1f articles/s' % (
+        serial, ARTICLES / serial))
+    for processes in PROCESSES:
+        start = time.time()
+        merged = contentgap.shardedrank(articles, [hasnoimage], length,
+                                        processes=processes, top=TOP)
+        duration = time.time() - start
+        print('%2d shards:   %6.2f s, %7.1f articles/s, speedup %4.2f, '
+              'same results: %s' % (
+                  processes, duration, ARTICLES / duration,
+                  serial / duration,
+                  merged.ranked() == gap.ranked_articles))
+
+
+if __name__ == '__main__':
+    main()
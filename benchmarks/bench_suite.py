@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark suite of the content gap analyses against a local fake wiki.
+
+A fake MediaWiki and pageview API (see fakewiki.py) serves size articles,
+with a latency per request. Each scenario runs in its own process and
+reports its throughput, the p50 and p99 of the time between two articles
+reaching the consumer (the latency per article of a stream), and the peak
+resident memory of its process:
+    - template: articles embedding a template (mwtemplate),
+    - category: crawl of a category tree with the image properties of the
+      members (imagegap.searcharticles with batch.CategoryLister),
+    - random: random sample of titles (sampling.randomtitles),
+    - recentchanges: articles changed since a date (rc.rc_pages),
+    - analysis: filterandrank of all the articles fetched by batches, with
+      the wikitext image filter and the views of the pageview API,
+    - report: report pages of the ranking of all the articles.
+
+    PYTHONPATH=. python benchmarks/bench_suite.py --sizes 1000 10000 --latency 0.005
+"""
+
+from argparse import ArgumentParser
+import logging
+import multiprocessing
+import resource
+import time
+
+import mwclient
+
+import fakewiki
+from surfaceimagecontentgap import batch, contentgap, crawler, imagegap
+from surfaceimagecontentgap import mwtemplate, pageviews, rc, records
+from surfaceimagecontentgap import report, sampling, transport
+
+SIZES = [1000, 10000, 100000]
+LATENCY = 0.002
+WORKERS = 4
+PAGESIZE = 1000
+REPORT = u'Utilisateur:Bench/Rapport'
+
+
+def connect(port):
+    """Site of the fake wiki, through a transport without rate limit."""
+    transport.configure(rate=10 ** 6)
+    return mwclient.Site(('http', '127.0.0.1:%d' % port), path='/w/',
+                         force_login=False, pool=transport.default())
+
+
+def consume(articles):
+    """Arrival times of the articles of a stream, from its start."""
+    times = [time.time()]
+    for _ in articles:
+        times.append(time.time())
+    return times
+
+
+def template(site, port, size):
+    lister = mwtemplate.ArticleWithTemplate(site, 'Infobox')
+    return consume(lister.listarticles())
+
+
+def category(site, port, size):
+    root = u'Catégorie:Racine'
+    search = crawler.CategoryCrawler(depth=1,
+                                     lister=batch.CategoryLister(site))
+    return consume(article for article in search.crawl(site.Pages[root])
+                   if not imagegap.isthereanimageprop(article))
+
+
+def randomsample(site, port, size):
+    # a sample of a tenth: a wiki is rarely sampled whole
+    return consume(sampling.randomtitles(site, max(size // 10, 1)))
+
+
+def recentchanges(site, port, size):
+    return consume(rc.rc_pages(site, fakewiki.RC_START))
+
+
+def analysis(site, port, size):
+    titles = [fakewiki.articletitle(n) for n in range(size)]
+    views = pageviews.PageviewFetcher(
+        'fr', api='http://127.0.0.1:%d%s' % (port, fakewiki.PAGEVIEWS_PATH) +
+        '{project}/{access}/{agent}/{page}/daily/{start}/{end}')
+    times = [time.time()]
+
+    def hasnoimage(article):
+        times.append(time.time())
+        return not imagegap.isthereanimage(article)
+
+    gap = contentgap.ContentGap(titles, fetcher=batch.ContentFetcher(site),
+                                workers=WORKERS)
+    callback = {'timer': 600, 'function': lambda gap: None}
+    gap.filterandrank([hasnoimage], views.evaluation, callback,
+                      vectorized=True)
+    return times
+
+
+def reportpages(site, port, size):
+    ranked = [records.ArticleRecord(fakewiki.articletitle(n), n + 1, n, size - n)
+              for n in range(size)]
+    writer = report.ReportWriter(site, REPORT, pagesize=PAGESIZE)
+    start = time.time()
+    writer.write(ranked, size, size)
+    duration = time.time() - start
+    # one arrival per article at the pace of the pages saved
+    return [start + duration * n / size for n in range(size + 1)]
+
+
+SCENARIOS = [('template', template),
+             ('category', category),
+             ('random', randomsample),
+             ('recentchanges', recentchanges),
+             ('analysis', analysis),
+             ('report', reportpages)]
+
+
+def percentile(values, fraction):
+    """Value of values below which fraction of them are."""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def measure(scenario, port, size, results):
+    """Run a scenario in this process and put its measures in results."""
+    # the logs of each article would be measured too
+    logging.getLogger('sicglog').setLevel(logging.WARNING)
+    site = connect(port)
+    times = scenario(site, port, size)
+    gaps = [after - before for before, after in zip(times, times[1:])]
+    duration = times[-1] - times[0]
+    results.put({
+        'articles': len(gaps),
+        'duration': duration,
+        'rate': len(gaps) / duration if duration else 0.0,
+        'p50': percentile(gaps, 0.5),
+        'p99': percentile(gaps, 0.99),
+        # kilobytes on Linux
+        'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        'requests': transport.default().stats()['requests']})
+
+
+def run(name, scenario, port, size):
+    """Measures of a scenario, run in a new process."""
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure,
+                                      args=(scenario, port, size, results))
+    process.start()
+    measures = results.get()
+    process.join()
+    return measures
+
+
+def main():
+    parser = ArgumentParser(description='Benchmarks against a fake wiki')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='numbers of articles of the fake wiki')
+    parser.add_argument('--latency', type=float, default=LATENCY,
+                        help='seconds of latency of each request')
+    parser.add_argument('--scenarios', nargs='+',
+                        default=[name for name, _ in SCENARIOS],
+                        help='scenarios to run')
+    args = parser.parse_args()
+    print('%d cores, %.1f ms per request' % (
+        multiprocessing.cpu_count(), args.latency * 1000))
+    print('%-14s %8s %8s %10s %9s %9s %8s %9s' % (
+        'scenario', 'size', 'articles', 'articles/s', 'p50 ms', 'p99 ms',
+        'requests', 'peak MB'))
+    for size in args.sizes:
+        ports = multiprocessing.Queue()
+        server = multiprocessing.Process(
+            target=fakewiki.serve, args=(size, args.latency, ports))
+        server.daemon = True
+        server.start()
+        port = ports.get()
+        for name, scenario in SCENARIOS:
+            if name not in args.scenarios:
+                continue
+            measures = run(name, scenario, port, size)
+            print('%-14s %8d %8d %10.1f %9.3f %9.3f %8d %9.1f' % (
+                name, size, measures['articles'], measures['rate'],
+                measures['p50'] * 1000, measures['p99'] * 1000,
+                measures['requests'], measures['rss']))
+        server.terminate()
+        server.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark of ContentGap.filterandrank with several workers, on articles
+whose text and views take a fixed latency to fetch.
+
+    PYTHONPATH=. python benchmarks/bench_workers.py
+"""
+
+import time
+
+from surfaceimagecontentgap import contentgap
+
+ARTICLES = 200
+LATENCY = 0.02
+WORKERS = [1, 4, 16, 32]
+
+
+class SlowArticle(object):
+
+    """Article whose text is fetched with a network like latency."""
+    def __init__(self, name):
+        self.name = name
+
+    def text(self):
+        time.sleep(LATENCY)
+        if len(self.name) % 3 == 0:
+            return u'[[File:%s.jpg]]' % self.name
+        return u'No image'
+
+
+def hasnoimage(article):
+    """Filter of articles without image."""
+    return 'File:' not in article.text()
+
+
+def views(article):
+    """Evaluation of an article with a network like latency."""
+    time.sleep(LATENCY)
+    return len(article.name)
+
+
+def main():
+    articles = [SlowArticle(u'Article %d' % n) for n in range(ARTICLES)]
+    callback = {'timer': 600, 'function': lambda gap: None}
+    reference = None
+    for workers in WORKERS:
+        gap = contentgap.ContentGap(articles, workers=workers)
+        start = time.time()
+        gap.filterandrank([hasnoimage], views, callback)
+        duration = time.time() - start
+        if reference is None:
+            reference = gap.ranked_articles
+        print('%3d workers: %6.2f s, %7.1f articles/s, same results: %s' % (
+            workers, duration, ARTICLES / duration,
+            gap.ranked_articles == reference))
+
+
+if __name__ == '__main__':
+    main()
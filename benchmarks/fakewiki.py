@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Local stand-in of a MediaWiki API and of the Wikimedia pageview API.
+
+The fake wiki has size articles 'Article <n>' (a third of them with an
+image), all including Template:Infobox and spread in the subcategories of
+Catégorie:Racine, one change of each article in its recent changes, and
+deterministic daily views. Every request waits latency seconds. It answers:
+    - siteinfo, userinfo and tokens,
+    - list=categorymembers and generator=categorymembers,
+    - list=embeddedin, list=random, list=recentchanges,
+    - prop=info|revisions|images|pageimages of titles,
+    - action=edit (kept in memory),
+    - the per-article daily views of the pageview API.
+
+    python benchmarks/fakewiki.py 10000 8080
+"""
+
+import datetime
+import json
+import random
+import sys
+import threading
+import time
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+    from urllib import unquote
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, unquote, urlparse
+
+API_PATH = '/w/api.php'
+PAGEVIEWS_PATH = '/api/rest_v1/metrics/pageviews/per-article/'
+LANG = 'fr'
+SUBCATEGORIES = 20
+PARAGRAPHS = 20
+MAX_LIMIT = 500
+RC_START = datetime.datetime(2016, 1, 1)
+
+NAMESPACES = {
+    '0': {'id': 0, '*': u''},
+    '2': {'id': 2, '*': u'Utilisateur', 'canonical': u'User'},
+    '6': {'id': 6, '*': u'Fichier', 'canonical': u'File'},
+    '10': {'id': 10, '*': u'Modèle', 'canonical': u'Template'},
+    '14': {'id': 14, '*': u'Catégorie', 'canonical': u'Category'}}
+ALIASES = [{'id': 6, '*': u'Image'}]
+
+
+def articletitle(number):
+    return u'Article %d' % number
+
+
+def articlenumber(title):
+    """Number of an article title, None for other titles."""
+    if not title.startswith(u'Article '):
+        return None
+    try:
+        return int(title[len(u'Article '):])
+    except ValueError:
+        return None
+
+
+def hasimage(number):
+    return number % 3 == 0
+
+
+def wikitext(number):
+    """Wikitext of an article, with an infobox image for a third."""
+    image = u'Image %d.jpg' % number if hasimage(number) else u''
+    paragraph = (u'Paragraph of [[Article %d]] with {{lien|%d}} and text.\n'
+                 % (number + 1, number))
+    return (u'{{Infobox\n | nom = %s\n | image = %s\n}}\n%s'
+            % (articletitle(number), image, paragraph * PARAGRAPHS))
+
+
+def stripnamespace(title):
+    return title.partition(u':')[2] or title
+
+
+def limit(params):
+    """Limit of a list request, 'max' is MAX_LIMIT."""
+    for key, value in params.items():
+        if key.endswith('limit') and key not in ('imlimit', 'pilimit'):
+            return MAX_LIMIT if value == 'max' else min(int(value), MAX_LIMIT)
+    return 10
+
+
+def timestamp(number):
+    change = RC_START + datetime.timedelta(seconds=number)
+    return change.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class FakeWiki(object):
+
+    """Content and answers of the fake wiki."""
+
+    def __init__(self, size):
+        self.size = size
+        self.edits = {}
+        self.lock = threading.Lock()
+
+    def exists(self, number):
+        return number is not None and 0 <= number < self.size
+
+    def pageinfo(self, title, props):
+        """Page of a title with the props requested."""
+        number = articlenumber(title)
+        if not self.exists(number):
+            page = {'ns': 0, 'title': title, 'missing': ''}
+            if title in self.edits:
+                page = {'ns': 2, 'title': title, 'pageid': 10 ** 9,
+                        'lastrevid': 10 ** 9, 'length': 100}
+            return page
+        page = {'ns': 0, 'title': title, 'pageid': number + 1,
+                'lastrevid': number + 10 ** 7, 'length': 3000,
+                'touched': timestamp(number), 'contentmodel': 'wikitext'}
+        if 'revisions' in props:
+            page['revisions'] = [{'revid': number + 10 ** 7,
+                                  'slots': {'main': {
+                                      'contentmodel': 'wikitext',
+                                      '*': wikitext(number)}}}]
+        if 'images' in props:
+            page['images'] = [{'ns': 6, 'title': u'Fichier:Icon.svg'}]
+            if hasimage(number):
+                page['images'].append(
+                    {'ns': 6, 'title': u'Fichier:Image %d.jpg' % number})
+        if 'pageimages' in props and hasimage(number):
+            page['pageimage'] = u'Image_%d.jpg' % number
+        return page
+
+    def category(self, title):
+        """Members of a category: subcategories of the root, articles of the
+        subcategories."""
+        name = stripnamespace(title)
+        if name == u'Racine':
+            return [{'ns': 14, 'title': u'Catégorie:Sous %d' % k,
+                     'pageid': 10 ** 8 + k} for k in range(SUBCATEGORIES)]
+        if name.startswith(u'Sous '):
+            k = int(name[len(u'Sous '):])
+            return [{'ns': 0, 'title': articletitle(n), 'pageid': n + 1}
+                    for n in range(k, self.size, SUBCATEGORIES)]
+        return []
+
+    def listed(self, params, key, members):
+        """Slice of members after the continuation key."""
+        offset = int(params.get(key, 0))
+        count = limit(params)
+        chunk = members[offset:offset + count]
+        following = None
+        if offset + count < len(members):
+            following = {key: str(offset + count), 'continue': key + '||'}
+        return chunk, following
+
+    def query(self, params):
+        result = {'query': {}}
+        query = result['query']
+        meta = params.get('meta', '').split('|')
+        if 'siteinfo' in meta:
+            query['general'] = {'generator': 'MediaWiki 1.31.0',
+                                'lang': LANG, 'sitename': u'Wikipédia',
+                                'writeapi': ''}
+            query['namespaces'] = NAMESPACES
+            query['namespacealiases'] = ALIASES
+        if 'userinfo' in meta:
+            query['userinfo'] = {'id': 1, 'name': u'Bench',
+                                 'groups': ['bot'],
+                                 'rights': ['edit', 'apihighlimits']}
+        if 'tokens' in meta:
+            query['tokens'] = {'csrftoken': '+\\'}
+        following = None
+        kind = params.get('list')
+        if kind == 'categorymembers':
+            query['categorymembers'], following = self.listed(
+                params, 'cmcontinue', self.category(params['cmtitle']))
+        elif kind == 'embeddedin':
+            members = [{'ns': 0, 'title': articletitle(n), 'pageid': n + 1}
+                       for n in range(self.size)]
+            query['embeddedin'], following = self.listed(
+                params, 'eicontinue', members)
+        elif kind == 'random':
+            rng = random.Random(params.get('rncontinue'))
+            numbers = [rng.randrange(self.size) for _ in range(limit(params))]
+            query['random'] = [{'ns': 0, 'id': n + 1,
+                                'title': articletitle(n)} for n in numbers]
+            following = {'rncontinue': str(rng.random()),
+                         'continue': 'rncontinue||'}
+        elif kind == 'recentchanges':
+            end = params.get('rcend')
+            changes = [{'type': 'edit', 'ns': 0, 'rcid': n + 1,
+                        'title': articletitle(n), 'timestamp': timestamp(n)}
+                       for n in range(self.size - 1, -1, -1)]
+            if end is not None:
+                end = datetime.datetime.strptime(end, '%Y%m%d%H%M%S')
+                last = (end - RC_START).total_seconds()
+                changes = [change for change in changes
+                           if change['rcid'] - 1 >= last]
+            query['recentchanges'], following = self.listed(
+                params, 'rccontinue', changes)
+        props = params.get('prop', '').split('|')
+        if params.get('generator') == 'categorymembers':
+            members, following = self.listed(
+                params, 'gcmcontinue', self.category(params['gcmtitle']))
+            query['pages'] = dict(
+                (str(member['pageid']),
+                 self.pageinfo(member['title'], props)
+                 if member['ns'] == 0 else dict(member))
+                for member in members)
+        if 'titles' in params:
+            pages = [self.pageinfo(title, props)
+                     for title in params['titles'].split(u'|')]
+            query['pages'] = dict(
+                (str(page.get('pageid', -n - 1)), page)
+                for n, page in enumerate(pages))
+        if following is not None:
+            result['continue'] = following
+        return result
+
+    def edit(self, params):
+        with self.lock:
+            self.edits[params['title']] = params.get('text', u'')
+        return {'edit': {'result': 'Success', 'title': params['title'],
+                         'newtimestamp': '2016-01-02T00:00:00Z'}}
+
+    def api(self, params):
+        if params.get('action') == 'edit':
+            return self.edit(params)
+        return self.query(params)
+
+    def views(self, path):
+        """Daily views of the article of a pageview API path."""
+        parts = path[len(PAGEVIEWS_PATH):].split('/')
+        title = unquote(parts[3])
+        if isinstance(title, bytes):
+            title = title.decode('utf-8')
+        number = articlenumber(title.replace(u'_', u' '))
+        if not self.exists(number):
+            return None
+        return {'items': [{'article': parts[3], 'timestamp': '2016010%d00' % d,
+                           'views': (number * 7919 + d) % 1000}
+                          for d in range(1, 10)]}
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    """Requests of the fake wiki, waiting the latency of the server."""
+
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written apart, without waiting for their ack
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def params(self, query):
+        return dict((key, values[0].decode('utf-8')
+                     if isinstance(values[0], bytes) else values[0])
+                    for key, values in parse_qs(query).items())
+
+    def answer(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        if url.path == API_PATH:
+            self.answer(200, self.server.wiki.api(self.params(url.query)))
+        elif url.path.startswith(PAGEVIEWS_PATH):
+            views = self.server.wiki.views(url.path)
+            if views is None:
+                self.answer(404, {'type': 'not found'})
+            else:
+                self.answer(200, views)
+        else:
+            self.answer(404, {})
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        self.answer(200, self.server.wiki.api(self.params(body)))
+
+
+class FakeWikiServer(ThreadingMixIn, HTTPServer):
+
+    """Threaded HTTP server of a fake wiki."""
+
+    daemon_threads = True
+
+    def __init__(self, size, latency=0.0, port=0):
+        HTTPServer.__init__(self, ('127.0.0.1', port), Handler)
+        self.wiki = FakeWiki(size)
+        self.latency = latency
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+def serve(size, latency, ports):
+    """Serve a fake wiki forever, its port is put in the ports queue."""
+    server = FakeWikiServer(size, latency)
+    ports.put(server.port)
+    server.serve_forever()
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
+    server = FakeWikiServer(size, port=port)
+    print('Fake wiki of %d articles on http://127.0.0.1:%d%s' % (
+        size, server.port, API_PATH))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
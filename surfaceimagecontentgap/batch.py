@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+
+"""Batched queries on the MediaWiki API.
+
+Fetching the content of articles one by one costs one HTTP round trip per
+article. The fetchers of this module query the API for many titles at once
+and yield lightweight pages holding the fetched data.
+"""
+
+import logging
+
+from surfaceimagecontentgap import cache, metrics
+
+# Constants
+LOGGER_NAME = 'sicglog'
+
+# Maximum number of titles in a single query (apihighlimits for bots)
+BATCH_SIZE = 50
+BATCH_SIZE_HIGHLIMITS = 500
+
+# Continuation parameters of the categorymembers generator
+GENERATOR_CONTINUE = ('continue', 'gcmcontinue')
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+class BatchPage(object):
+
+    """Page fetched by a batched query.
+
+    It offers the part of mwclient.Page used by filters and evaluations,
+    without making any further API call.
+    """
+
+    __slots__ = ('site', 'name', 'pageid', 'revid', 'images', 'pageimage',
+                 'namespace', 'length', 'hasimage', '__content__')
+
+    def __init__(self, site, name, pageid=None, revid=None, content=None,
+                 images=None, pageimage=None, namespace=0, length=None,
+                 hasimage=None):
+        """Constructor.
+
+        Args:
+            site (mwclient.Site): site the page belongs to
+            name (unicode): title of the page
+            pageid (int, optional): page id, None for missing pages
+            revid (int, optional): latest revision id
+            content (unicode, optional): wikitext of the latest revision
+            images (list, optional): titles of the files used in the page
+            pageimage (unicode, optional): name of the lead image of the
+                page chosen by the PageImages extension
+            namespace (int, optional): namespace of the page
+            length (int, optional): length of the latest revision in bytes
+            hasimage (bool, optional): cached image status of the latest
+                revision, whose wikitext is then not fetched with the page
+        """
+        self.site = site
+        self.name = name
+        self.pageid = pageid
+        self.revid = revid
+        self.images = images
+        self.pageimage = pageimage
+        self.namespace = namespace
+        self.length = length
+        self.hasimage = hasimage
+        self.__content__ = content
+
+    def text(self):
+        """Wikitext of the page, empty for missing pages.
+
+        The wikitext of a page fetched with its cached image status only is
+        fetched on first use.
+        """
+        if self.__content__ is None and self.hasimage is not None:
+            self.__content__ = fetchtext(self.site, self.name)
+        if self.__content__ is None:
+            return u''
+        return self.__content__
+
+
+def title(article):
+    """Title of an article given as a page object or as a title."""
+    return getattr(article, 'name', article)
+
+
+def batchsize(site):
+    """Maximum number of titles per query allowed to the user of site."""
+    if 'apihighlimits' in getattr(site, 'rights', []):
+        return BATCH_SIZE_HIGHLIMITS
+    return BATCH_SIZE
+
+
+def chunks(iterable, size):
+    """Split iterable in lists of at most size elements."""
+    chunk = []
+    for element in iterable:
+        chunk.append(element)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def mergepage(pages, page):
+    """Merge a page of a continued query result into pages by title.
+
+    Continued queries may return the same page several times, each time
+    with a part of the requested properties.
+    """
+    known = pages.get(page['title'])
+    if known is None:
+        pages[page['title']] = page
+        return
+    for key, value in page.items():
+        if isinstance(value, list) and isinstance(known.get(key), list):
+            known[key].extend(value)
+        else:
+            known.setdefault(key, value)
+
+
+def query(site, titles, params):
+    """Query the API of site for titles, following continuation.
+
+    Args:
+        site (mwclient.Site): site to query
+        titles (list): titles to query
+        params (dict): query parameters
+
+    Returns:
+        dict: {title: page} for each title as given in titles.
+    """
+    if not titles:
+        return {}
+    base = dict(params)
+    base['titles'] = u'|'.join(titles)
+    kwargs = dict(base, **{'continue': ''})
+    pages = {}
+    redirects = {}
+    while True:
+        with metrics.timer('fetch'):
+            result = site.api('query', **kwargs)
+        answer = result.get('query', {})
+        for normalized in answer.get('normalized', []):
+            redirects[normalized['from']] = normalized['to']
+        for page in answer.get('pages', {}).values():
+            mergepage(pages, page)
+        if 'continue' not in result:
+            break
+        kwargs = dict(base, **result['continue'])
+    return dict((name, pages.get(redirects.get(name, name), {}))
+                for name in titles)
+
+
+class BatchFetcher(object):
+
+    """Query the API for many titles at once.
+
+    Subclasses define the query parameters (PARAMS) and how to build a page
+    from a query result (makepage).
+    """
+
+    PARAMS = {}
+
+    def __init__(self, site, size=None):
+        """Constructor.
+
+        Args:
+            site (mwclient.Site): site to query
+            size (int, optional): number of titles per query, default is the
+                maximum allowed by the rights of the user.
+        """
+        self.site = site
+        self.size = size
+
+    def query(self, titles, params=None):
+        """Query the API for titles with PARAMS, or params (see query)."""
+        return query(self.site, titles,
+                     self.PARAMS if params is None else params)
+
+    def makepage(self, name, page):
+        """Build the page object from the query result of a title."""
+        raise NotImplementedError
+
+    def fetch(self, articles):
+        """Fetch articles by batches.
+
+        Args:
+            articles (iterable): mwclient.Page objects or titles
+
+        Yields:
+            BatchPage: pages in the order of articles
+        """
+        size = self.size or batchsize(self.site)
+        for chunk in chunks(articles, size):
+            titles = [title(article) for article in chunk]
+            LOG.info("Fetching %d articles from %s", len(titles),
+                     titles[0].encode('utf-8'))
+            pages = self.query(titles)
+            for name in titles:
+                yield self.makepage(name, pages[name])
+
+
+def revisioncontent(revision):
+    """Wikitext of a revision, with or without content slots."""
+    if 'slots' in revision:
+        return revision['slots']['main'].get('*')
+    return revision.get('*')
+
+
+class ContentFetcher(BatchFetcher):
+
+    """Fetch the wikitext of the latest revision of articles.
+
+    When the cache is configured, the latest revisions of the articles are
+    queried first and the wikitext is not fetched for the revisions whose
+    image status is cached: their pages hold the cached status instead (see
+    BatchPage.hasimage), which does not depend on the cache entry still
+    being there when they are filtered.
+    """
+
+    PARAMS = {'prop': 'revisions',
+              'rvprop': 'ids|content',
+              'rvslots': 'main'}
+    INFO_PARAMS = {'prop': 'info'}
+
+    def query(self, titles, params=None):
+        store = cache.default()
+        if store is None or params is not None:
+            return BatchFetcher.query(self, titles, params)
+        lang = self.site.site['lang']
+        pages = BatchFetcher.query(self, titles, self.INFO_PARAMS)
+        changed = []
+        for name in titles:
+            hasimage = store.get(cache.imagekey(
+                lang, name, pages[name].get('lastrevid')))
+            if hasimage is None:
+                changed.append(name)
+            else:
+                pages[name]['hasimage'] = hasimage
+        pages.update(BatchFetcher.query(self, changed))
+        return pages
+
+    def makepage(self, name, page):
+        revisions = page.get('revisions', [])
+        revid = page.get('lastrevid')
+        content = None
+        if revisions:
+            revid = revisions[0].get('revid')
+            content = revisioncontent(revisions[0])
+        return BatchPage(self.site, name,
+                         pageid=page.get('pageid'),
+                         revid=revid,
+                         content=content,
+                         hasimage=page.get('hasimage'))
+
+
+def fetchtext(site, name):
+    """Wikitext of the latest revision of a page, None when missing."""
+    page = query(site, [name], ContentFetcher.PARAMS)[name]
+    revisions = page.get('revisions', [])
+    if not revisions:
+        return None
+    return revisioncontent(revisions[0])
+
+
+class ImagePropsFetcher(BatchFetcher):
+
+    """Fetch the images used by articles, without their wikitext."""
+
+    PARAMS = {'prop': 'info|images|pageimages',
+              'imlimit': 'max',
+              'pilimit': 'max',
+              'piprop': 'name'}
+
+    def makepage(self, name, page):
+        return propspage(self.site, name, page)
+
+
+def propspage(site, name, page):
+    """Page from a query result with info, images and pageimages props."""
+    images = [image['title'] for image in page.get('images', [])]
+    return BatchPage(site, name,
+                     pageid=page.get('pageid'),
+                     revid=page.get('lastrevid'),
+                     images=images,
+                     pageimage=page.get('pageimage'),
+                     namespace=page.get('ns', 0),
+                     length=page.get('length'))
+
+
+class CategoryLister(object):
+
+    """List the members of categories with generator=categorymembers.
+
+    The latest revision, length and image properties of the members come in
+    the same responses as the members, so that the members of a category can
+    be filtered by isthereanimageprop without any other request.
+    """
+
+    PARAMS = {'generator': 'categorymembers',
+              'gcmnamespace': '0|14',
+              'gcmlimit': 'max',
+              'prop': 'info|images|pageimages',
+              'imlimit': 'max',
+              'pilimit': 'max',
+              'piprop': 'name'}
+
+    def __init__(self, site):
+        """Constructor.
+
+        Args:
+            site (mwclient.Site): site to query
+        """
+        self.site = site
+
+    def __call__(self, category):
+        """Yields the members of category.
+
+        Args:
+            category (object): category page or its title
+
+        Yields:
+            BatchPage: articles and subcategories of category
+        """
+        base = dict(self.PARAMS)
+        base['gcmtitle'] = title(category)
+        kwargs = dict(base, **{'continue': ''})
+        pages = {}
+        while True:
+            result = self.site.api('query', **kwargs)
+            for page in result.get('query', {}).get('pages', {}).values():
+                mergepage(pages, page)
+            following = result.get('continue', {})
+            # props of the members are complete once only the generator
+            # has to be continued
+            if all(key in GENERATOR_CONTINUE for key in following):
+                for name in sorted(pages):
+                    yield propspage(self.site, name, pages[name])
+                pages = {}
+            if not following:
+                break
+            kwargs = dict(base, **following)
@@ -8,9 +8,14 @@ import mwclient
 
 from surfaceimagecontentgap import (
     __version__,
+    batch,
+    checkpoint,
     contentgap,
-    logger)
-from surfaceimagecontentgap.imagegap import Callback
+    incremental,
+    logger,
+    pageviews,
+    transport)
+from surfaceimagecontentgap.imagegap import Callback, DETECTIONS
 
 
 LOG = logger.logger()
@@ -33,7 +38,10 @@ class SurfaceContentGapBot(object):
     """
     def __init__(self, config_file=None, lang='fr', report=None,
                  list_fun=None, filter_fun=None, rank_fun=None,
-                 frequency=600):
+                 frequency=600, fetch_batch=False,
+                 detection='wikitext', rank_vectorized=False, workers=1,
+                 top=None, checkpoint=None, resume=False, metrics=None,
+                 state=None, follow=False, membership=False):
         """Constructor.
 
         Args:
@@ -46,11 +54,41 @@ class SurfaceContentGapBot(object):
             filter_fun (function):
             rank_fun (function):
             frequency (int): Amount of seconds between two write of report
+            fetch_batch (bool): Whether articles content is fetched by
+                batches of titles before filtering.
+            detection (str): Image detection backend used by
+                isthereanimage, a key of imagegap.DETECTIONS. 'pageimages'
+                always fetches articles by batches.
+            rank_vectorized (bool): Whether rank_fun takes a list of
+                articles and returns the list of their evaluations.
+            workers (int): Number of threads filtering and ranking articles.
+            top (int): Number of best articles in the report, None for every
+                filtered article.
+            checkpoint (str): Path of the checkpoint file of the analysis,
+                None for no checkpoint.
+            resume (bool): Whether the analysis resumes from the articles
+                of the checkpoint file.
+            metrics (str): Path of the file the metrics are exported to with
+                each report, None for no export.
+            state (str): Path of the state file of an incremental run (see
+                incremental), the results are then updated from the previous
+                ones, which are read from the report pages when the file
+                does not exist yet. None for a full run.
+            follow (bool): Whether list_fun follows articles as they change,
+                yielding an article again at each change (see
+                contentgap.ContentGap).
+            membership (bool): Whether list_fun lists the members of a
+                category or a template, and so lists the previous articles
+                of the state again while they are members. Otherwise
+                (recent changes, random articles) every previous article
+                is listed with the articles.
         """
         # site
+        # the wiki and pageview requests share the transport of the process,
+        # the requests of the site have the User-Agent of the bot
         agent = user_agent()
         self.site = mwclient.Site(WIKIPEDIA_URL.format(lang),
-                                  clients_useragent=agent)
+                                  pool=transport.default().client(agent))
         LOG.info("User-Agent: '%s'", agent)
 
         # Configuration
@@ -75,6 +113,37 @@ class SurfaceContentGapBot(object):
         # Time for report callback
         self.frequency = frequency
 
+        # Fetching articles content by batches
+        self.fetch_batch = fetch_batch
+
+        # Image detection backend
+        self.detection = detection
+
+        # Ranking a list of articles at once
+        self.rank_vectorized = rank_vectorized
+
+        # Threads filtering and ranking articles
+        self.workers = workers
+
+        # Size of the ranking
+        self.top = top
+
+        # Checkpoint of the analysis
+        self.checkpoint = checkpoint
+        self.resume = resume
+
+        # Export of the metrics
+        self.metrics = metrics
+
+        # Results of the previous run
+        self.state = state
+
+        # Articles followed as they change
+        self.follow = follow
+
+        # Articles listed as members of a source
+        self.membership = membership
+
     def login(self, config_file=None):
         """Login wikipedia using credential configuration file.
 
@@ -101,11 +170,17 @@ class SurfaceContentGapBot(object):
         self.__is_logged__ = True
         LOG.info("Logged in as '%s'", configparser.get('login', 'user'))
 
+    def isthereanimage(self, article):
+        """Whether there is an image in article, using the detection backend
+        of the bot."""
+        return DETECTIONS[self.detection][1](article)
+
     def run(self):
         # login if config file but not done
         if not self.__is_logged__ and self.config_file is not None:
             self.login()
-        callback = Callback(self.frequency, self.site, self.report)
+        callback = Callback(self.frequency, self.site, self.report,
+                            background=True, metricsfile=self.metrics)
 
         # articles list
         articles = self.list_fun(self)
@@ -115,5 +190,48 @@ class SurfaceContentGapBot(object):
 
         def rank(article):
             return self.rank_fun(self, article)
-        gap = contentgap.ContentGap(articles)
-        gap.filterandrank([filter_article], rank, callback.callback())
+        fetcher = None
+        if self.detection == 'pageimages':
+            fetcher = batch.ImagePropsFetcher(self.site)
+        elif self.fetch_batch:
+            fetcher = batch.ContentFetcher(self.site)
+        outcomes = None
+        if self.checkpoint is not None:
+            outcomes = checkpoint.Checkpoint(self.checkpoint,
+                                             resume=self.resume)
+        callbacks = callback.callback()
+        previous = []
+        rejected = []
+        results = None
+        if self.state is not None:
+            window = pageviews.window()[1]
+            state = incremental.previous(self.site, self.state, self.report)
+            previous, stale, rejected = incremental.refresh(self.site, state,
+                                                            window)
+            if not self.membership:
+                if fetcher is None:
+                    stale = [self.site.Pages[title] for title in stale]
+                articles = incremental.candidates(stale, articles,
+                                                  previous + rejected)
+            results = incremental.State(window=window)
+            publish = callbacks['function']
+
+            def save(gap):
+                # the state is saved with each report
+                publish(gap)
+                results.dump(self.state)
+            callbacks['function'] = save
+        gap = contentgap.ContentGap(articles, fetcher=fetcher,
+                                    workers=self.workers, top=self.top,
+                                    checkpoint=outcomes, previous=previous,
+                                    follow=self.follow, site=self.site,
+                                    rejected=rejected, outcomes=results)
+        try:
+            gap.filterandrank([filter_article], rank, callbacks,
+                              vectorized=self.rank_vectorized)
+            return gap
+        finally:
+            callback.close()
+            if outcomes is not None:
+                outcomes.close()
+            LOG.info("HTTP transport: %s", transport.default().stats())
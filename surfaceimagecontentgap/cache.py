@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""Persistent on-disk cache of image status and page views.
+
+Entries are kept in a sqlite file across runs. Each entry expires after its
+time to live, and the least recently used entries are evicted when the cache
+holds more than its maximum number of entries. New entries and access times
+are kept in memory and written in one transaction every COMMIT_PERIOD
+writes, and when the cache is closed, rather than with each lookup.
+
+The cache is configured once per process with configure(); isthereanimage,
+latest90, pageview90 and the batch fetchers use it when it is configured.
+"""
+
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+# Constants
+LOGGER_NAME = 'sicglog'
+TTL = 30 * 24 * 3600
+MAX_SIZE = 1000000
+
+# Number of writes between two evictions
+EVICTION_PERIOD = 1000
+
+# Number of writes (entries set and hits) between two commits
+COMMIT_PERIOD = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT NOT NULL PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+"""
+
+# Cache of the process, None when not configured
+CACHE = None
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+class Cache(object):
+
+    """Key value cache in a sqlite file.
+
+    Keys are tuples of strings and numbers, values are JSON serializable.
+    The cache may be shared by threads.
+    """
+
+    def __init__(self, path, ttl=TTL, maxsize=MAX_SIZE):
+        """Constructor.
+
+        Args:
+            path (str): path of the sqlite cache file
+            ttl (int): default time to live of entries, in seconds
+            maxsize (int): maximum number of entries
+        """
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__writes__ = 0
+        self.__pending__ = 0
+        self.__entries__ = {}
+        self.__accessed__ = {}
+        self.__lock__ = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """Commit the pending writes and close the cache file."""
+        with self.__lock__:
+            self.__commit__()
+            self.connection.close()
+
+    def flush(self):
+        """Commit the pending writes."""
+        with self.__lock__:
+            self.__commit__()
+
+    def __commit__(self):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                [(key,) + entry for key, entry in self.__entries__.items()])
+            self.connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                [(accessed, key)
+                 for key, accessed in self.__accessed__.items()])
+        self.__entries__ = {}
+        self.__accessed__ = {}
+        self.__pending__ = 0
+
+    def __written__(self):
+        self.__pending__ += 1
+        if self.__pending__ >= COMMIT_PERIOD:
+            self.__commit__()
+
+    @staticmethod
+    def dumpkey(key):
+        """Key of the cache table."""
+        return json.dumps(list(key))
+
+    def get(self, key):
+        """Value of key, None when missing or expired."""
+        now = time.time()
+        dumped = self.dumpkey(key)
+        with self.__lock__:
+            row = self.__entries__.get(dumped)
+            if row is None:
+                row = self.connection.execute(
+                    'SELECT value, expires FROM cache WHERE key = ?',
+                    (dumped,)).fetchone()
+            if row is None or row[1] < now:
+                self.misses += 1
+                return None
+            self.__accessed__[dumped] = now
+            self.hits += 1
+            self.__written__()
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        """Set the value of key.
+
+        Args:
+            key (tuple): key of the entry
+            value (object): JSON serializable value
+            ttl (int, optional): time to live of the entry, in seconds,
+                default is the ttl of the cache.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        now = time.time()
+        dumped = self.dumpkey(key)
+        with self.__lock__:
+            self.__entries__[dumped] = (json.dumps(value), now + ttl, now)
+            self.__accessed__.pop(dumped, None)
+            self.__written__()
+            self.__writes__ += 1
+            if self.__writes__ % EVICTION_PERIOD == 0:
+                self.__evict__(now)
+
+    def evict(self):
+        """Remove expired entries and the least recently used entries above
+        the maximum size."""
+        with self.__lock__:
+            self.__evict__(time.time())
+
+    def __evict__(self, now):
+        # with the pending entries and access times
+        self.__commit__()
+        with self.connection:
+            self.connection.execute('DELETE FROM cache WHERE expires < ?',
+                                    (now,))
+            size = self.connection.execute(
+                'SELECT COUNT(*) FROM cache').fetchone()[0]
+            if size > self.maxsize:
+                LOG.info("Evicting %d cache entries", size - self.maxsize)
+                self.connection.execute(
+                    'DELETE FROM cache WHERE key IN ('
+                    'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                    (size - self.maxsize,))
+
+
+def imagekey(lang, title, revid):
+    """Key of the image status of a revision of an article."""
+    return ('image', lang, title, revid)
+
+
+def viewskey(lang, title, end):
+    """Key of the views of an article in the window ending on day end."""
+    return ('views', lang, title, end)
+
+
+def configure(path, ttl=TTL, maxsize=MAX_SIZE):
+    """Configure the cache of the process.
+
+    Args:
+        path (str): path of the sqlite cache file, None to disable the cache
+        ttl (int): default time to live of entries, in seconds
+        maxsize (int): maximum number of entries
+    """
+    global CACHE
+    close()
+    if path is not None:
+        CACHE = Cache(path, ttl=ttl, maxsize=maxsize)
+        atexit.register(close)
+    return CACHE
+
+
+def close():
+    """Commit the pending writes of the cache of the process and close it."""
+    global CACHE
+    if CACHE is not None:
+        CACHE.close()
+        CACHE = None
+
+
+def default():
+    """Cache of the process, None when not configured."""
+    return CACHE
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""Checkpoints of content gap analyses.
+
+The outcome of each analyzed article, whether it was kept by the filters and
+its score, is saved in a sqlite file as the analysis goes. An interrupted
+analysis is resumed from its checkpoint: articles already analyzed are not
+fetched, filtered or evaluated again.
+"""
+
+import logging
+import sqlite3
+
+from surfaceimagecontentgap import records
+
+# Constants
+LOGGER_NAME = 'sicglog'
+
+# Number of outcomes buffered between two writes of the checkpoint
+CHECKPOINT_PERIOD = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outcomes (
+    title TEXT NOT NULL PRIMARY KEY,
+    pageid INTEGER,
+    revid INTEGER,
+    kept INTEGER NOT NULL,
+    score INTEGER
+);
+"""
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+class Checkpoint(object):
+
+    """Outcomes of the articles analyzed, in a sqlite file."""
+
+    def __init__(self, path, resume=False, period=CHECKPOINT_PERIOD):
+        """Constructor.
+
+        Args:
+            path (str): path of the sqlite checkpoint file
+            resume (bool): whether the outcomes already in the file are
+                kept, otherwise the checkpoint starts empty.
+            period (int): number of outcomes buffered between two writes
+        """
+        self.path = path
+        self.period = period
+        self.__buffer__ = []
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        if not resume:
+            with self.connection:
+                self.connection.execute('DELETE FROM outcomes')
+
+    def close(self):
+        """Write the buffered outcomes and close the checkpoint file."""
+        self.flush()
+        self.connection.close()
+
+    def add(self, record, kept):
+        """Save the outcome of an article.
+
+        Args:
+            record (records.ArticleRecord): article with its score, None
+                when not evaluated.
+            kept (bool): whether the article was kept by the filters
+        """
+        self.__buffer__.append((record.title, record.pageid, record.revid,
+                                int(kept), record.score))
+        if len(self.__buffer__) >= self.period:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered outcomes."""
+        if not self.__buffer__:
+            return
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?)',
+                self.__buffer__)
+        self.__buffer__ = []
+
+    def analyzed(self):
+        """Titles of the articles already analyzed."""
+        self.flush()
+        rows = self.connection.execute('SELECT title FROM outcomes')
+        return set(row[0] for row in rows)
+
+    def kept(self):
+        """Records of the articles kept by the filters, in analysis order."""
+        self.flush()
+        rows = self.connection.execute(
+            'SELECT title, pageid, revid, score FROM outcomes '
+            'WHERE kept = 1 ORDER BY rowid')
+        return [records.ArticleRecord(*row) for row in rows]
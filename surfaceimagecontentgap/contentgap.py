@@ -2,12 +2,23 @@
 
 """Content Gap Module provides search and ranking for content gap."""
 
+import collections
 import logging
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 import time
 
+from surfaceimagecontentgap import logger, metrics, ranking, records, sharding
+
 # Constants
 LOGGER_NAME = 'sicglog'
 
+# Number of filtered articles given at once to a vectorized evaluation
+VECTORIZED_SIZE = 200
+
+# Number of latest kept articles remembered from a followed stream
+FOLLOW_SIZE = 1000
+
 # logger
 LOG = logging.getLogger(LOGGER_NAME)
 
@@ -23,21 +34,234 @@ class ContentGap(object):
 
     """Find content gap from article list."""
 
-    def __init__(self, articles):
+    def __init__(self, articles, fetcher=None, workers=1, inflight=None,
+                 top=None, checkpoint=None, shard=None, previous=None,
+                 follow=False, site=None, rejected=None, outcomes=None):
         """Constructor.
 
         Args:
-            articles (list): List of wikipedia articles.
+            articles (iterable): Wikipedia articles, a list or a generator
+                consumed while articles are filtered.
+            fetcher (batch.BatchFetcher, optional): Fetcher used to get the
+                articles by batches before filtering them.
+            workers (int, optional): Number of threads filtering and
+                evaluating articles in filterandrank, 1 to run serially.
+            inflight (int, optional): Maximum number of articles submitted
+                to the threads and not yet collected, default is twice the
+                number of workers.
+            top (int, optional): Number of best articles kept in the
+                ranking, None to keep every filtered article.
+            checkpoint (checkpoint.Checkpoint, optional): Outcomes of the
+                articles analyzed, saved as they are filtered and ranked.
+                Articles of the checkpoint are not analyzed again.
+            shard (tuple, optional): (index, count) of the shard of the
+                articles analyzed, see sharding.partition. The ranking is
+                then a partial ranking (see partial).
+            previous (list, optional): Records of articles kept by a
+                previous run and not analyzed again (see
+                incremental.refresh). A record is ranked with the analyzed
+                articles when the articles list its title again, instead of
+                the article, and dropped otherwise, as with a full analysis.
+                Its score is evaluated again when it is None.
+            follow (bool, optional): Whether articles are a followed stream
+                in which an article comes again when it changes (see
+                rc.RecentChangesFollower). The ranking then keeps the
+                FOLLOW_SIZE (at least top) latest kept articles, once each,
+                and ranks the top ones (see ranking.LatestRanking), which
+                are then counted as the filtered articles.
+            site (mwclient.Site, optional): Site of the articles, given to
+                the records evaluated without page object (titles, records
+                of the checkpoint or of the previous run), default is the
+                site of the fetcher.
+            rejected (list, optional): Records of articles filtered out by
+                a previous run and not changed since (see
+                incremental.refresh): they are not analyzed again when the
+                articles list them.
+            outcomes (incremental.State, optional): Results of the run,
+                given the outcome of each article analyzed, or listed again
+                from the previous run (see incremental.State.add).
 
         Attributes:
-            articles (list): List of Wikipedia Articles
-            filtered_articles (list): Filtered list of articles, None when not
-                filtered.
-            ranked_articles (list): List of articles sorted by rank
+            articles (iterable): Wikipedia Articles
+            processed (int): Number of articles filtered so far
+            preranked (int): Number of articles evaluated before being
+                filtered (see prerank).
+            stopped (bool): Whether the filtering stopped once the top
+                articles were found (see prerank), the number of filtered
+                articles being then unknown.
+            resumed (int): Number of articles analyzed before, restored
+                from the checkpoint.
+            previous (list): Records of the articles of a previous run.
+            relisted (list): Records of the previous run whose articles
+                were listed again, in the order of the articles.
+            unchanged (int): Number of articles listed again which the
+                previous run filtered out (see rejected).
+            positions (dict): Positions of the articles of the shard among
+                all the articles, by title.
+            fetcher (batch.BatchFetcher): Batch fetcher, None when articles
+                are filtered as they are.
+            filtered (int): Number of articles kept by the filters,
+                including the ones resumed and of the previous run.
+            filtered_articles (list): Records (records.ArticleRecord) of the
+                articles kept by filter, None otherwise: filterandrank keeps
+                the ranking and the number of filtered articles only.
+            ranked_articles (list): Records of the articles sorted by rank
+            ranking (ranking.TopRanking): Best articles as they are ranked,
+                a ranking.LatestRanking when following articles, None when
+                not ranked.
         """
         self.articles = articles
+        self.fetcher = fetcher
+        self.workers = workers
+        self.inflight = inflight or 2 * workers
+        self.top = top
+        self.checkpoint = checkpoint
+        self.shard = shard
+        self.previous = previous or []
+        self.relisted = []
+        self.rejected = rejected or []
+        self.unchanged = 0
+        self.outcomes = outcomes
+        self.follow = follow
+        self.site = site
+        if site is None:
+            self.site = getattr(fetcher, 'site', None)
+        self.positions = {}
+        self.processed = 0
+        self.preranked = 0
+        self.stopped = False
+        self.resumed = 0
+        self.filtered = 0
         self.filtered_articles = None
         self.ranked_articles = None
+        self.ranking = None
+
+    def fetched(self, articles):
+        """Articles fetched by batches when there is a fetcher."""
+        if self.fetcher is None:
+            return articles
+        return self.fetcher.fetch(articles)
+
+    def candidates(self):
+        """Articles to analyze, before being fetched.
+
+        Articles already analyzed according to the checkpoint are skipped,
+        and the articles of the previous run are not analyzed again: the
+        records of the kept ones are added to relisted as they are listed,
+        the ones filtered out are counted as unchanged."""
+        articles = self.articles
+        if self.shard is not None:
+            articles = self.partition(articles)
+        skipped = set()
+        if self.checkpoint is not None:
+            skipped = self.checkpoint.analyzed()
+            self.resumed = len(skipped)
+            if skipped:
+                LOG.info("Resuming after %d articles", self.resumed)
+        self.relisted = []
+        self.unchanged = 0
+        if skipped or self.previous or self.rejected:
+            articles = self.unskipped(articles, skipped)
+        return articles
+
+    def unskipped(self, articles, skipped):
+        """Yields the articles neither skipped nor of the previous run,
+        adding the records of the previous run listed to relisted, or to
+        the outcomes when they were filtered out."""
+        previous = dict((entry.title, entry) for entry in self.previous)
+        rejected = dict((entry.title, entry) for entry in self.rejected)
+        for article in articles:
+            name = getattr(article, 'name', article)
+            if name in skipped:
+                continue
+            if name in previous:
+                self.relisted.extend(self.located([previous.pop(name)]))
+                continue
+            if name in rejected:
+                self.unchanged += 1
+                self.note(rejected.pop(name), False)
+                continue
+            yield article
+
+    def partition(self, articles):
+        """Yields the articles of the shard, keeping their positions among
+        the articles."""
+        index, count = self.shard
+        for position, article in enumerate(articles):
+            name = getattr(article, 'name', article)
+            if sharding.partition(name, count) == index:
+                self.positions[name] = position
+                yield article
+
+    def push(self, entry):
+        """Add a record to the ranking, at its position for a shard."""
+        self.ranking.push(entry, self.positions.get(entry.title))
+
+    def extend(self, entries):
+        """Add records to the ranking."""
+        for entry in entries:
+            self.push(entry)
+
+    def partial(self):
+        """Partial ranking of the shard analyzed (see sharding.merge)."""
+        if self.ranking is None:
+            raise ArticlesNotFilteredException
+        return sharding.Partial(self.ranking.positioned(),
+                                self.processed + self.resumed,
+                                self.filtered)
+
+    def resume(self):
+        """Records of the articles kept before, restored from the
+        checkpoint."""
+        if self.checkpoint is None:
+            return []
+        return self.located(self.checkpoint.kept())
+
+    def located(self, entries):
+        """Records given the site of the articles, when they have none."""
+        for entry in entries:
+            if entry.site is None:
+                entry.site = self.site
+        return entries
+
+    def reuse(self, start, evaluation, vectorized=False):
+        """Adds the records of the previous run listed since start to the
+        ranking, evaluating the ones without score, and counts them as
+        filtered.
+
+        Returns:
+            int: number of records of the previous run listed so far
+        """
+        entries = self.relisted[start:]
+        if not entries:
+            return start
+        self.filtered += len(entries)
+        for entry in entries:
+            if entry.score is not None:
+                self.note(entry, True)
+                self.push(entry)
+        self.extend(self.scored([entry for entry in entries
+                                 if entry.score is None],
+                                evaluation, vectorized))
+        return start + len(entries)
+
+    def save(self, article, kept, score=None):
+        """Save the outcome of an article to the checkpoint, if any.
+
+        Returns:
+            records.ArticleRecord: record of the article with its score
+        """
+        record = records.record(article, score)
+        if self.checkpoint is not None:
+            self.checkpoint.add(record, kept)
+        self.note(record, kept)
+        return record
+
+    def note(self, record, kept):
+        """Adds the outcome of an article to the outcomes of the run, if
+        any."""
+        if self.outcomes is not None:
+            self.outcomes.add(record, kept)
 
     def filter(self, filters=None):
         """Filters articles based on filter list.
@@ -47,44 +271,154 @@ class ContentGap(object):
         Args:
             filters (list): List of filter function, to apply to the list of
                 articles. A filter returns True to keep an articles."""
-        self.filtered_articles = []
+        self.filtered_articles = self.resume()
         if filters is None:
             filters = []
-        for article in self.articles:
-            if all(keep(article) for keep in filters):
-                self.filtered_articles.append(article)
+        for article, kept, _ in self.analyzed(filters):
+            self.processed += 1
+            record = self.save(article, kept)
+            if kept:
+                self.filtered_articles.append(record)
+        self.filtered_articles.extend(self.relisted)
+        self.filtered = len(self.filtered_articles)
+        if self.checkpoint is not None:
+            self.checkpoint.flush()
         return self.filtered_articles
 
-    def rank(self, evaluation=None):
+    def rank(self, evaluation=None, vectorized=False):
         """Ranks the articles according to an evaluation function.
 
+        The evaluation is given the records of the filtered articles, which
+        have a name and a site (see records.ArticleRecord).
+
         Args:
             evaluation (function): Function which gives a evaluation of an
                 article the higher, the better.
+            vectorized (bool): Whether evaluation takes a list of articles
+                and returns the list of their evaluations.
         Returns:
-            list: List of {'article': x, 'evaluation': evaluation(x)}
+            list: Records of the articles, with evaluation(x) as score
         """
         if self.filtered_articles is None:
             raise ArticlesNotFilteredException
+        self.ranking = ranking.TopRanking(self.top)
         if evaluation is None:
-            self.ranked_articles = [{'article': article.name.encode('utf-8'),
-                                     'evaluation': 0}
-                                    for article in self.filtered_articles]
+            self.extend(records.record(article, 0)
+                        for article in self.filtered_articles)
         else:
-            self.ranked_articles = [
-                {'article': article.name.encode('utf-8'),
-                 'evaluation': evaluation(article)}
-                for article in self.filtered_articles]
-            self.ranked_articles = sorted(self.ranked_articles,
-                                          key=lambda x: -x['evaluation'])
+            self.extend(self.evaluate(self.filtered_articles,
+                                      evaluation, vectorized))
+        self.ranked_articles = self.ranking.ranked()
         return self.ranked_articles
 
     @staticmethod
-    def rankingkey(articledict):
-        """Ranking articledict from the greatest 'evaluation' to the lower."""
-        return -articledict['evaluation']
+    def evaluate(articles, evaluation, vectorized=False):
+        """Evaluates articles.
+
+        Args:
+            articles (list): List of articles
+            evaluation (function): Evaluation of an article, or of a list of
+                articles when vectorized.
+            vectorized (bool): Whether evaluation takes a list of articles.
+        Returns:
+            list: Records of the articles, with evaluation(x) as score
+        """
+        if not articles:
+            return []
+        with metrics.timer('evaluation'):
+            if vectorized:
+                scores = evaluation(articles)
+            else:
+                scores = [evaluation(article) for article in articles]
+        return [records.record(article, score)
+                for article, score in zip(articles, scores)]
+
+    @staticmethod
+    def rankingkey(articlerecord):
+        """Ranking articlerecord from the greatest score to the lower."""
+        return -articlerecord.score
+
+    @staticmethod
+    def analyze(article, filters, evaluation=None):
+        """Filters and evaluates an article.
+
+        Returns:
+            tuple: (article, kept, score), score is None when the article is
+                filtered out or when there is no evaluation.
+        """
+        with metrics.timer('filter'):
+            kept = all(keep(article) for keep in filters)
+        if not kept:
+            return article, False, None
+        if evaluation is None:
+            return article, True, None
+        with metrics.timer('evaluation'):
+            return article, True, evaluation(article)
+
+    def analyzed(self, filters, evaluation=None, articles=None):
+        """Analyzes the articles, with a pool of threads when there are
+        several workers.
+
+        At most inflight articles are being analyzed at the same time, and
+        results are yielded in the order of the articles.
+
+        Args:
+            articles (iterable, optional): articles to analyze, fetched when
+                there is a fetcher, default is the articles to analyze (see
+                candidates).
+
+        Yields:
+            tuple: (article, kept, score) as returned by analyze.
+        """
+        self.processed = 0
+        if articles is None:
+            articles = self.candidates()
+        articles = self.fetched(articles)
+        if self.workers <= 1:
+            for article in articles:
+                yield self.analyze(article, filters, evaluation)
+            return
+        pool = ThreadPool(self.workers)
+        pending = collections.deque()
+        try:
+            for article in articles:
+                pending.append(pool.apply_async(
+                    self.analyze, (article, filters, evaluation)))
+                if len(pending) >= self.inflight:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.terminate()
+
+    def prerank(self, evaluation, vectorized=False):
+        """Articles to analyze sorted from the best score, evaluated before
+        being fetched and filtered.
+
+        Articles with the same score keep their order, as in the ranking.
+
+        Returns:
+            tuple: (articles, scores), the sorted articles and their scores
+                by title.
+        """
+        articles = list(self.candidates())
+        # titles are evaluated as records
+        entries = [article if hasattr(article, 'name')
+                   else records.ArticleRecord(article, site=self.site)
+                   for article in articles]
+        scores = {}
+        for start in range(0, len(entries), VECTORIZED_SIZE):
+            for entry in self.evaluate(entries[start:start + VECTORIZED_SIZE],
+                                       evaluation, vectorized):
+                scores[entry.title] = entry.score
+        self.preranked = len(articles)
+        LOG.info("Preranked %d articles", self.preranked)
+        articles.sort(key=lambda article:
+                      -scores[getattr(article, 'name', article)])
+        return articles, scores
 
-    def filterandrank(self, filters, evaluation, callback):
+    def filterandrank(self, filters, evaluation, callback, vectorized=False,
+                      prerank=False):
         """Filter and ranks article at the same time, and do an action on a
         callback (such as saving result).
 
@@ -94,38 +428,205 @@ class ContentGap(object):
             evaluation (function): Function which gives a evaluation of an
                 article the higher, the better.
             callback (dict): {'timer': t, 'function': c} after duration of
-                timer, the callback function is called."""
-        last_callback = time.time()
-        self.filtered_articles = []
+                timer, the callback function is called.
+            vectorized (bool): Whether evaluation takes a list of articles
+                and returns the list of their evaluations. Filtered articles
+                are then evaluated by groups of VECTORIZED_SIZE.
+            prerank (bool): Whether every article is evaluated first, and
+                then filtered from the best score on (see prerank), until
+                top articles are kept. The ranking is the same, without
+                fetching and filtering the articles ranked after them.
+
+        With several workers, articles are filtered and evaluated (unless
+        vectorized) by threads, while results are collected, and callbacks
+        called, in the calling thread in the order of the articles. The
+        timer of the callback is checked after each article, kept or not."""
+        stats = metrics.default()
+        progress = logger.Progress(total=self.total())
+        start = last_callback = time.time()
+        resumed = self.resume()
+        self.filtered = len(resumed)
+        self.filtered_articles = None
         self.ranked_articles = []
-        for article in self.articles:
-            if all(keep(article) for keep in filters):
-                self.filtered_articles.append(article)
-                articlename = article.name.encode('utf-8')
-                score = evaluation(article)
-                self.ranked_articles.append({'article': articlename,
-                                             'evaluation': score})
-                if time.time() - last_callback > callback['timer']:
-                    self.ranked_articles = sorted(self.ranked_articles,
-                                                  key=self.rankingkey)
+        self.stopped = False
+        if self.follow:
+            self.ranking = ranking.LatestRanking(
+                max(self.top or 0, FOLLOW_SIZE), self.top)
+        else:
+            self.ranking = ranking.TopRanking(self.top)
+        # articles kept before, evaluated or not
+        pending = []
+        for record in resumed:
+            if record.score is None:
+                pending.append(record)
+            else:
+                self.note(record, True)
+                self.push(record)
+        self.extend(self.scored(pending, evaluation, vectorized))
+        pending = []
+        scoring = None if vectorized else evaluation
+        articles = scores = None
+        if prerank:
+            articles, scores = self.prerank(evaluation, vectorized)
+            scoring = None
+        analyzed = self.analyzed(filters, scoring, articles)
+        # every previous record is listed before an early stop of prerank
+        reused = self.reuse(0, evaluation, vectorized)
+        found = 0
+        for article, kept, score in analyzed:
+            reused = self.reuse(reused, evaluation, vectorized)
+            self.processed += 1
+            stats.count('articles')
+            name = getattr(article, 'name', article)
+            progress.tick(name)
+            if not kept:
+                self.save(article, False)
+                if self.follow:
+                    # a followed article no longer kept leaves the ranking
+                    self.ranking.remove(name)
+                    pending = [entry for entry in pending
+                               if getattr(entry, 'name', entry) != name]
+            elif scores is not None:
+                self.filtered += 1
+                stats.count('filtered')
+                found += 1
+                self.push(self.save(article, True, scores[name]))
+                if found == self.top:
+                    # the following articles have lower scores
+                    LOG.info("Top %d articles found after %d of %d",
+                             found, self.processed, self.preranked)
+                    self.stopped = True
+                    break
+            else:
+                self.filtered += 1
+                stats.count('filtered')
+                if vectorized:
+                    pending.append(article)
+                else:
+                    self.push(self.save(article, True, score))
+            if len(pending) >= VECTORIZED_SIZE:
+                self.extend(self.scored(pending, evaluation, vectorized))
+                pending = []
+            if time.time() - last_callback > callback['timer']:
+                self.extend(self.scored(pending, evaluation, vectorized))
+                pending = []
+                self.ranked_articles = self.ranking.ranked()
+                if self.checkpoint is not None:
+                    self.checkpoint.flush()
+                with stats.timer('callback'):
                     callback['function'](self)
-                    last_callback = time.time()
-        self.ranked_articles = sorted(self.ranked_articles,
-                                      key=self.rankingkey)
-        callback['function'](self)
+                last_callback = time.time()
+        # stops the threads of an early stop
+        analyzed.close()
+        self.reuse(reused, evaluation, vectorized)
+        self.extend(self.scored(pending, evaluation, vectorized))
+        self.ranked_articles = self.ranking.ranked()
+        if self.checkpoint is not None:
+            self.checkpoint.flush()
+        with stats.timer('callback'):
+            callback['function'](self)
+        progress.report()
+        stats.observe('filterandrank', time.time() - start)
+
+    def scored(self, articles, evaluation, vectorized=False):
+        """Evaluates kept articles and saves their scores to the checkpoint
+        and the outcomes.
+
+        Returns:
+            list: Records of the articles, with evaluation(x) as score
+        """
+        evaluated = self.evaluate(articles, evaluation, vectorized)
+        for record in evaluated:
+            if self.checkpoint is not None:
+                self.checkpoint.add(record, True)
+            self.note(record, True)
+        return evaluated
 
     def reset(self):
         """Reset filter and ranking to None."""
+        self.processed = 0
+        self.preranked = 0
+        self.stopped = False
+        self.resumed = 0
+        self.relisted = []
+        self.unchanged = 0
+        self.filtered = 0
         self.filtered_articles = None
         self.ranked_articles = None
+        self.ranking = None
+
+    def total(self):
+        """Number of articles to analyze, None when they are a generator or
+        a shard of the articles."""
+        if self.shard is None and hasattr(self.articles, '__len__'):
+            return len(self.articles)
+        return None
 
     def metadata(self):
-        """Informations about the number of articles and filtered articles."""
-        len_articles = 0
-        if self.articles:
+        """Informations about the number of articles and filtered articles,
+        None when unknown (see stopped)."""
+        # articles may be a generator, of unknown length
+        len_articles = (max(self.processed, self.preranked) + self.resumed +
+                        len(self.relisted) + self.unchanged)
+        if hasattr(self.articles, '__len__'):
             len_articles = len(self.articles)
-        len_filtered_articles = 0
-        if self.filtered_articles:
-            len_filtered_articles = len(self.filtered_articles)
+        len_filtered_articles = self.filtered
+        if self.follow and self.ranking is not None:
+            # the latest filtered articles only are kept
+            len_filtered_articles = len(self.ranking)
+        if self.stopped:
+            # the articles after the top ones were not filtered
+            len_filtered_articles = None
         return {'articles': len_articles,
                 'filtered': len_filtered_articles}
+
+
+def rankshard(task):
+    """Partial ranking of a shard of articles, in a process of a pool.
+
+    Args:
+        task (tuple): (positioned, filters, evaluation, vectorized, top),
+            positioned being the (position, article) of the shard.
+    Returns:
+        dict: partial ranking, see sharding.Partial.asdict
+    """
+    positioned, filters, evaluation, vectorized, top = task
+    gap = ContentGap([article for _, article in positioned], top=top)
+    gap.positions = dict((getattr(article, 'name', article), position)
+                         for position, article in positioned)
+    callback = {'timer': float('inf'), 'function': lambda gap: None}
+    gap.filterandrank(filters, evaluation, callback, vectorized)
+    return gap.partial().asdict()
+
+
+def shardedrank(articles, filters, evaluation, processes=None, top=None,
+                vectorized=False):
+    """Filters and ranks articles by shards, in a pool of processes.
+
+    Shards are sent to the processes, so the articles, the filters and the
+    evaluation must be picklable (functions of a module, not lambdas).
+
+    Args:
+        articles (iterable): articles, see ContentGap
+        filters (list): filters of the articles, see filterandrank
+        evaluation (function): evaluation of an article, see filterandrank
+        processes (int, optional): number of processes and shards, default
+            is the number of cores.
+        top (int, optional): number of best articles kept
+        vectorized (bool): whether evaluation takes a list of articles
+    Returns:
+        sharding.Partial: ranking of the articles, the one of filterandrank
+    """
+    processes = processes or multiprocessing.cpu_count()
+    shards = [[] for _ in range(processes)]
+    for position, article in enumerate(articles):
+        name = getattr(article, 'name', article)
+        shards[sharding.partition(name, processes)].append((position, article))
+    tasks = [(shard, filters, evaluation, vectorized, top) for shard in shards]
+    pool = multiprocessing.Pool(processes)
+    try:
+        partials = pool.map(rankshard, tasks)
+    finally:
+        pool.terminate()
+    return sharding.merge([sharding.Partial.fromdict(partial)
+                           for partial in partials], top)
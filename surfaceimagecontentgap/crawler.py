@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""Breadth first search of articles in a category tree."""
+
+import logging
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+
+try:
+    from Queue import Full, Queue
+except ImportError:
+    from queue import Full, Queue
+
+# Constants
+LOGGER_NAME = 'sicglog'
+ARTICLE_NAMESPACE = 0
+CATEGORY_NAMESPACE = 14
+WORKERS = 4
+# Members of a category listed ahead of the articles yielded
+MEMBERS_BUFFER = 500
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+def put(members, item, stopped):
+    """Puts item in the members queue, unless the crawl is stopped.
+
+    Returns:
+        bool: whether item was put
+    """
+    while not stopped.is_set():
+        try:
+            members.put(item, timeout=0.1)
+            return True
+        except Full:
+            pass
+    return False
+
+
+class CategoryCrawler(object):
+
+    """Search articles in a category tree, level by level.
+
+    Categories are listed once each, even with cycles or several parent
+    categories, and articles are yielded once each. The categories of a level
+    are listed concurrently, the articles of each category being yielded as
+    they are listed, in the order of the categories.
+    """
+
+    def __init__(self, depth=0, workers=WORKERS, lister=iter,
+                 buffersize=MEMBERS_BUFFER):
+        """Constructor.
+
+        Args:
+            depth (int): how deep should we search (0 means only the
+                category, 1 the category and it's sub categories, etc.
+            workers (int): number of categories listed at the same time
+            lister (function): members of a category, default is iterating
+                a mwclient.Category; batch.CategoryLister gets the members
+                with their image properties.
+            buffersize (int): number of members of a category listed ahead
+                of the articles yielded
+
+        Attributes:
+            levels (list): for each level crawled, {'depth': d,
+                'categories': number of categories listed, 'articles':
+                number of new articles, 'duration': seconds}
+        """
+        self.depth = depth
+        self.workers = workers
+        self.lister = lister
+        self.buffersize = buffersize
+        self.levels = []
+
+    def listmembers(self, category, members, stopped):
+        """Puts the articles and subcategories of category in the members
+        queue, then None, or the error of the listing."""
+        try:
+            for page in self.lister(category):
+                if page.namespace in (ARTICLE_NAMESPACE, CATEGORY_NAMESPACE):
+                    if not put(members, page, stopped):
+                        return
+            put(members, None, stopped)
+        except Exception as error:
+            put(members, error, stopped)
+
+    def crawl(self, category):
+        """Yields the articles of category and its subcategories.
+
+        Args:
+            category (mwclient.Category): root category, or any page with a
+                name the lister accepts
+        """
+        self.levels = []
+        visited = set([category.name])
+        seen = set()
+        level = [category]
+        stopped = threading.Event()
+        pool = ThreadPool(self.workers)
+        try:
+            for depth in range(self.depth + 1):
+                if not level:
+                    break
+                start = time.time()
+                count = 0
+                nextlevel = []
+                queues = []
+                for parent in level:
+                    members = Queue(self.buffersize)
+                    pool.apply_async(self.listmembers,
+                                     (parent, members, stopped))
+                    queues.append(members)
+                for members in queues:
+                    for page in iter(members.get, None):
+                        if isinstance(page, Exception):
+                            raise page
+                        if page.namespace == CATEGORY_NAMESPACE:
+                            # subcategories are listed at the next level
+                            if page.name not in visited:
+                                visited.add(page.name)
+                                nextlevel.append(page)
+                        elif page.name not in seen:
+                            seen.add(page.name)
+                            count += 1
+                            yield page
+                self.levels.append({'depth': depth,
+                                    'categories': len(level),
+                                    'articles': count,
+                                    'duration': time.time() - start})
+                LOG.info("Depth %d: %d categories, %d articles in %.1fs",
+                         depth, len(level), count, time.time() - start)
+                level = nextlevel
+        finally:
+            stopped.set()
+            pool.terminate()
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""Ranking from Wikimedia pageview dump files.
+
+Pageview dumps (https://dumps.wikimedia.org/other/pageviews/ hourly files,
+https://dumps.wikimedia.org/other/pageview_complete/ daily files) are read
+line by line for the candidate titles only. Their daily views are kept in a
+sqlite index, so that later runs, on the same or other languages, only read
+the dump files or the candidate titles they do not know yet.
+"""
+
+import bz2
+import datetime
+import gzip
+import logging
+import os
+import re
+import sqlite3
+
+# Constants
+LOGGER_NAME = 'sicglog'
+LAST_DAYS = 90
+
+# Dump file names of a day
+HOURLY_DUMP = 'pageviews-{day}-{hour:02d}0000.gz'
+DAILY_DUMP = 'pageviews-{day}-user.bz2'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS titles (
+    lang TEXT NOT NULL,
+    title TEXT NOT NULL,
+    PRIMARY KEY (lang, title)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS views (
+    lang TEXT NOT NULL,
+    title TEXT NOT NULL,
+    day TEXT NOT NULL,
+    views INTEGER NOT NULL,
+    PRIMARY KEY (lang, title, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dumps (
+    lang TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (lang, name)
+) WITHOUT ROWID;
+"""
+DUMP_DAY = re.compile(r'pageviews-(\d{8})')
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+def opendump(path):
+    """Open a dump file, uncompressing gzip and bz2 files."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.BZ2File(path, 'rb')
+    return open(path, 'rb')
+
+
+def domains(lang):
+    """Domain codes of the wikipedia of lang in dump files.
+
+    Hourly dumps use 'fr' and 'fr.m' (mobile), daily dumps 'fr.wikipedia'.
+    """
+    return (lang, lang + '.m', lang + '.wikipedia')
+
+
+def dumptitle(title):
+    """Article title as written in dump files."""
+    return title.replace(u' ', u'_')
+
+
+def parseline(line):
+    """Domain code, title and views of a dump line, None when malformed.
+
+    Hourly lines are 'domain title views bytes', daily lines
+    'domain title page_id access views hourly_views'.
+    """
+    fields = line.decode('utf-8', 'replace').split(u' ')
+    try:
+        if len(fields) == 4:
+            return fields[0], fields[1], int(fields[2])
+        if len(fields) in (5, 6):
+            return fields[0], fields[1], int(fields[4])
+    except ValueError:
+        pass
+    return None
+
+
+def readdump(path, lang, titles):
+    """Sum the views of titles in a dump file.
+
+    Args:
+        path (str): path of the dump file
+        lang (str): language code of the wikipedia
+        titles (set): titles to keep, as written in dump files
+
+    Returns:
+        dict: {title: views}
+    """
+    keep = domains(lang)
+    views = {}
+    dump = opendump(path)
+    try:
+        for line in dump:
+            parsed = parseline(line.rstrip(b'\n'))
+            if parsed is None:
+                continue
+            domain, title, count = parsed
+            if domain in keep and title in titles:
+                views[title] = views.get(title, 0) + count
+    finally:
+        dump.close()
+    return views
+
+
+def dumpday(path):
+    """Day (YYYYmmdd) of the views of a dump file, from its name."""
+    match = DUMP_DAY.search(os.path.basename(path))
+    if match is None:
+        raise ValueError('No day in dump file name %s' % path)
+    return match.group(1)
+
+
+def windowdumps(directory, last=LAST_DAYS, today=None, hourly=False):
+    """Dump files of the last days found in directory.
+
+    Args:
+        directory (str): directory containing the dump files
+        last (int): number of days of the window, until yesterday
+        today (datetime.date, optional): end of the window, default is today
+        hourly (bool): whether to look for hourly dumps instead of daily ones
+    """
+    if today is None:
+        today = datetime.date.today()
+    paths = []
+    for ago in range(last, 0, -1):
+        day = (today - datetime.timedelta(days=ago)).strftime('%Y%m%d')
+        if hourly:
+            names = [HOURLY_DUMP.format(day=day, hour=hour)
+                     for hour in range(24)]
+        else:
+            names = [DAILY_DUMP.format(day=day)]
+        paths += [os.path.join(directory, name) for name in names]
+    return [path for path in paths if os.path.exists(path)]
+
+
+class PageviewIndex(object):
+
+    """Persistent index of the daily views of titles built from dump files.
+
+    Views are kept by day, so that the index serves any window of the days
+    it was loaded with.
+    """
+
+    def __init__(self, path):
+        """Constructor.
+
+        Args:
+            path (str): path of the sqlite index file
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """Close the index file."""
+        self.connection.close()
+
+    def loaded(self, lang):
+        """Names of the dump files already read for lang."""
+        rows = self.connection.execute(
+            'SELECT name FROM dumps WHERE lang = ?', (lang,))
+        return set(row[0] for row in rows)
+
+    def indexed(self, lang):
+        """Titles indexed for lang."""
+        rows = self.connection.execute(
+            'SELECT title FROM titles WHERE lang = ?', (lang,))
+        return set(row[0] for row in rows)
+
+    def add(self, lang, day, views):
+        """Add views of a day to titles."""
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO views VALUES (?, ?, ?, 0)',
+            [(lang, title, day) for title in views])
+        self.connection.executemany(
+            'UPDATE views SET views = views + ? '
+            'WHERE lang = ? AND title = ? AND day = ?',
+            [(count, lang, title, day) for title, count in views.items()])
+
+    def load(self, lang, paths, titles):
+        """Index the views of titles in the dump files.
+
+        Dump files already read are only read again for the titles which are
+        not indexed yet. The index is updated in a single transaction, so an
+        interrupted load leaves it unchanged.
+
+        Args:
+            lang (str): language code of the wikipedia
+            paths (list): paths of the dump files
+            titles (iterable): candidate titles
+        """
+        titles = set(dumptitle(title) for title in titles)
+        indexed = self.indexed(lang)
+        newtitles = titles - indexed
+        loaded = self.loaded(lang)
+        with self.connection:
+            for path in paths:
+                name = os.path.basename(path)
+                if name in loaded:
+                    if not newtitles:
+                        continue
+                    keep = newtitles
+                else:
+                    keep = titles | indexed
+                LOG.info("Reading %s for %d titles", name, len(keep))
+                self.add(lang, dumpday(path), readdump(path, lang, keep))
+                self.connection.execute(
+                    'INSERT OR IGNORE INTO dumps VALUES (?, ?)', (lang, name))
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO titles VALUES (?, ?)',
+                [(lang, title) for title in newtitles])
+
+    def views(self, lang, title, start='', end='99999999'):
+        """Indexed views of title from day start to day end (YYYYmmdd)."""
+        row = self.connection.execute(
+            'SELECT SUM(views) FROM views '
+            'WHERE lang = ? AND title = ? AND day >= ? AND day <= ?',
+            (lang, dumptitle(title), start, end)).fetchone()
+        return row[0] or 0
+
+    def evaluation(self, lang, last=LAST_DAYS, today=None, vectorized=False):
+        """Evaluation of articles by their indexed views of the last days
+        (until yesterday).
+
+        Args:
+            vectorized (bool): whether the evaluation takes a list of
+                articles, and is then called by the thread of the index
+                only (see ContentGap.filterandrank).
+        """
+        if today is None:
+            today = datetime.date.today()
+        start = (today - datetime.timedelta(days=last)).strftime('%Y%m%d')
+        end = (today - datetime.timedelta(days=1)).strftime('%Y%m%d')
+
+        def evaluation(article):
+            """Indexed views of article."""
+            return self.views(lang, article.name, start, end)
+        if not vectorized:
+            return evaluation
+
+        def evaluations(articles):
+            """Indexed views of articles."""
+            return [evaluation(article) for article in articles]
+        return evaluations
@@ -8,21 +8,35 @@ import logging
 
 import mwclient
 
-import contentgap
-import report
-import mwtemplate
-
-import pageviewapi.period
+# absolute imports, so that the modules are the ones of the package when
+# imagegap.py is run as a script
+from surfaceimagecontentgap import (
+    batch,
+    cache,
+    checkpoint,
+    contentgap,
+    crawler,
+    dumps,
+    incremental,
+    logger,
+    matcher,
+    metrics,
+    mwtemplate,
+    pageviews,
+    publisher,
+    report,
+    sharding,
+    transport)
 
 # Constants
 LOGGER_NAME = 'sicglog'
 WIKIPEDIA_URL = '{0}.wikipedia.org'
 PROTOCOL = 'https'
-USER_AGENT = 'Bot based on mwclient'
 MAX_TIME_WITHOUT_UPDATE = 600
 
-ARTICLE_NAMESPACE = 0
-CATEGORY_NAMEPSACE = 14
+# Extensions of used files counted as illustrations by page properties
+# (icons, flags and logos from templates are mostly SVG files)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff')
 
 # logger
 LOG = logging.getLogger(LOGGER_NAME)
@@ -34,14 +48,69 @@ class MissingDailyViewsException(ValueError):
     pass
 
 
+def imagekey(article):
+    """Cache key of the image status of article, None when its revision is
+    unknown."""
+    site = getattr(article, 'site', None)
+    # revid of batch.BatchPage, revision of mwclient.Page
+    revid = getattr(article, 'revid', getattr(article, 'revision', None))
+    if site is None or revid is None:
+        return None
+    return cache.imagekey(site.site['lang'], article.name, revid)
+
+
+@metrics.stage('imagefilter')
 def isthereanimage(article):
-    """Returns whether there is an image in the article or not."""
-    LOG.info("Analyzing: %s", article.name.encode('utf-8'))
-    imagepattern = ["<gallery>", "File:", "Image:", ".jpg", ".JPG", ".gif",
-                    ".GIF", ".PNG", ".SVG", ".TIF",
-                    ".png", ".svg", ".tif", ".jpeg", ".JPEG"]
-    text = article.text()
-    return any(pattern in text for pattern in imagepattern)
+    """Returns whether there is an image in the article or not.
+
+    The image patterns include the localized names of the File namespace of
+    the site of the article. The result is cached by revision when the cache
+    is configured, and pages fetched with their cached status (see
+    batch.ContentFetcher) are not searched.
+    """
+    LOG.debug("Analyzing: %s", article.name)
+    hasimage = getattr(article, 'hasimage', None)
+    if hasimage is not None:
+        metrics.default().hit('image', True)
+        return hasimage
+    store = cache.default()
+    key = imagekey(article)
+    if store is not None and key is not None:
+        hasimage = store.get(key)
+        metrics.default().hit('image', hasimage is not None)
+        if hasimage is not None:
+            return hasimage
+    imagematcher = matcher.matcher(getattr(article, 'site', None))
+    with metrics.timer('wikitext'):
+        text = article.text()
+    with metrics.timer('match'):
+        hasimage = imagematcher.search(text)
+    if store is not None and key is not None:
+        store.set(key, hasimage)
+    return hasimage
+
+
+@metrics.stage('imagefilter')
+def isthereanimageprop(article):
+    """Returns whether there is an image in the article according to its page
+    properties.
+
+    The article is a batch.BatchPage fetched by batch.ImagePropsFetcher: it
+    has an image when PageImages found a lead image, or when it uses a raster
+    image file.
+    """
+    LOG.debug("Analyzing: %s", article.name)
+    if article.pageimage:
+        return True
+    return any(image.lower().endswith(IMAGE_EXTENSIONS)
+               for image in article.images or [])
+
+
+# Detection backends: fetcher of the articles and image detection function
+DETECTIONS = {
+    'wikitext': (batch.ContentFetcher, isthereanimage),
+    'pageimages': (batch.ImagePropsFetcher, isthereanimageprop)
+}
 
 
 def latest90(article):
@@ -53,48 +122,76 @@ def latest90(article):
     Returns:
         int: sum of daily views.
     """
-    project = '{lang}.wikipedia'.format(lang=article.site.site['lang'])
-    return pageviewapi.period.sum_last(project,
-                                       article.name.encode('utf-8'),
-                                       last=90,
-                                       access='all-access',
-                                       agent='all-agents')
+    return pageviews.fetcher(article.site.site['lang']).views(article.name)
 
 
-def searcharticles(category, depth=0):
+def searcharticles(category, depth=0, lister=iter):
     """Search articles in category and its subcategories
     until a given depth.
 
+    Categories are searched level by level, each category and each article
+    once (see crawler.CategoryCrawler).
+
     Args:
         category (mwclient.Category): category to search
         depth (int): how deep should we search (0 means only the category,
             1 the category and it's sub categories, etc.
+        lister (function): members of a category, see
+            crawler.CategoryCrawler
     """
-    allcontent = [a for a in category]
-    articles = [a for a in allcontent if a.namespace == ARTICLE_NAMESPACE]
-    categories = [c for c in allcontent if c.namespace == CATEGORY_NAMEPSACE]
     LOG.info("Searching for articles into %s", category.name.encode('utf-8'))
-    if depth > 0 and len(categories) > 0:
-        for subcat in categories:
-            articles += searcharticles(subcat, depth - 1)
-    return articles
+    search = crawler.CategoryCrawler(depth=depth, lister=lister)
+    return metrics.timed('enumeration', search.crawl(category))
 
 
 class Callback(object):
 
     """Callback for image content gap."""
 
-    def __init__(self, timer, site, reportname):
+    def __init__(self, timer, site, reportname, maxrows=None, pagesize=None,
+                 background=False, metricsfile=None):
         """Constructor.
 
         Args:
             timer (int): timer in seconds
             site (mwclient.Site): wikipedia site object the script is running
                 on
+            reportname (str): page name of the report
+            maxrows (int, optional): maximum number of articles reported
+            pagesize (int, optional): number of articles per report page
+            background (bool, optional): whether reports are saved by a
+                background thread (see publisher.AsyncPublisher), close()
+                must then be called at the end of the analysis.
+            metricsfile (str, optional): file the metrics of the process are
+                exported to with each report and by close() (see
+                metrics.Metrics.write)
         """
         self.timer = timer
         self.site = site
         self.reportname = reportname
+        self.writer = report.ReportWriter(site, reportname, maxrows=maxrows,
+                                          pagesize=pagesize)
+        self.metricsfile = metricsfile
+        self.publisher = None
+        if background:
+            self.publisher = publisher.AsyncPublisher(self.writer)
+
+    def close(self):
+        """Wait for the last report to be saved in background, save its
+        numbers of articles when only they changed, and export the last
+        metrics."""
+        if self.publisher is not None:
+            self.publisher.close()
+        try:
+            self.writer.flush()
+        except Exception:
+            LOG.exception("Saving the numbers of articles failed")
+        self.export()
+
+    def export(self):
+        """Export the metrics of the process, when there is a file."""
+        if self.metricsfile is not None:
+            metrics.default().write(self.metricsfile)
 
     def callback(self):
         """Return the callback as dictionnary."""
@@ -102,26 +199,22 @@ class Callback(object):
             """The call back function to call in order to save result."""
             LOG.info("Saving reports to %s", self.reportname)
             info = gap.metadata()
-            content = report.create(gap.ranked_articles,
-                                    articles=info['articles'],
-                                    filtered_articles=info['filtered'])
-            report.save(self.site, self.reportname, content)
+            if self.publisher is None:
+                self.writer.write(gap.ranked_articles,
+                                  articles=info['articles'],
+                                  filtered_articles=info['filtered'])
+            else:
+                self.publisher.publish(gap.ranked_articles,
+                                       articles=info['articles'],
+                                       filtered_articles=info['filtered'])
+            self.export()
         return {'timer': self.timer, 'function': callback_function}
 
 
 def setuplog():
-    """Set up the LOG. """
-    consolehandler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        '%(asctime)s    %(levelname)s    %(message)s')
-    consolehandler.setFormatter(formatter)
-    consolehandler.setLevel(logging.INFO)
-    LOG.addHandler(consolehandler)
-    logfilehandler = logging.FileHandler('sicg.log')
-    logfilehandler.setFormatter(formatter)
-    logfilehandler.setLevel(logging.DEBUG)
-    LOG.addHandler(logfilehandler)
-    LOG.setLevel(logging.DEBUG)
+    """Set up the LOG, to the console and to sicg.log (see
+    logger.configure)."""
+    logger.configure(logfile='sicg.log')
 
 
 def main():
@@ -163,33 +256,216 @@ def main():
                         required=False,
                         default=0,
                         help='Depth of search into a category.')
+    parser.add_argument('-i', '--detection',
+                        type=str,
+                        dest='detection',
+                        required=False,
+                        default='wikitext',
+                        choices=sorted(DETECTIONS),
+                        help='How images are detected in articles.')
+    parser.add_argument('--dumps',
+                        type=str,
+                        dest='dumps',
+                        required=False,
+                        default=None,
+                        help='Directory of pageview dump files to rank '
+                             'articles without the pageview API.')
+    parser.add_argument('--hourly',
+                        action='store_true',
+                        dest='hourly',
+                        help='Read the hourly dump files of --dumps instead '
+                             'of the daily ones.')
+    parser.add_argument('--index',
+                        type=str,
+                        dest='index',
+                        required=False,
+                        default='pageviews.sqlite',
+                        help='Index file of the views read from dumps.')
+    parser.add_argument('--cache',
+                        type=str,
+                        dest='cache',
+                        required=False,
+                        default=None,
+                        help='Cache file of image status and views.')
+    parser.add_argument('--workers',
+                        type=int,
+                        dest='workers',
+                        required=False,
+                        default=1,
+                        help='Number of threads filtering articles.')
+    parser.add_argument('--top',
+                        type=int,
+                        dest='top',
+                        required=False,
+                        default=None,
+                        help='Number of best articles in the report.')
+    parser.add_argument('--page-size',
+                        type=int,
+                        dest='pagesize',
+                        required=False,
+                        default=None,
+                        help='Number of articles per report page, the '
+                             'following ones go to subpages.')
+    parser.add_argument('--checkpoint',
+                        type=str,
+                        dest='checkpoint',
+                        required=False,
+                        default=None,
+                        help='Checkpoint file of the analyzed articles.')
+    parser.add_argument('--resume',
+                        action='store_true',
+                        dest='resume',
+                        help='Resume the analysis from the checkpoint file.')
+    parser.add_argument('--shard',
+                        type=str,
+                        dest='shard',
+                        required=False,
+                        default=None,
+                        help='Shard INDEX/COUNT of the articles analyzed, '
+                             'its partial ranking is saved to --partial.')
+    parser.add_argument('--partial',
+                        type=str,
+                        dest='partial',
+                        required=False,
+                        default=None,
+                        help='File of the partial ranking of the shard.')
+    parser.add_argument('--merge',
+                        type=str,
+                        dest='merge',
+                        nargs='+',
+                        required=False,
+                        default=None,
+                        help='Partial ranking files of every shard to merge '
+                             'into the report, no article is analyzed.')
+    parser.add_argument('--metrics',
+                        type=str,
+                        dest='metrics',
+                        required=False,
+                        default=None,
+                        help='File of the metrics of the run, in the '
+                             'Prometheus text format for a .prom file, JSON '
+                             'otherwise.')
+    parser.add_argument('--state',
+                        type=str,
+                        dest='state',
+                        required=False,
+                        default=None,
+                        help='State file of incremental runs: only the '
+                             'articles changed since the previous run (or '
+                             'report) and the new ones are analyzed.')
+    parser.add_argument('--prerank',
+                        action='store_true',
+                        dest='prerank',
+                        help='Rank the articles by their views first, then '
+                             'search images from the most viewed ones until '
+                             '--top articles without image are found.')
     args = parser.parse_args()
-    if args.template is None and args.category is None:
-        raise ValueError("Use -t TEMPLATE or -c CATEGORY")
-    if args.template is not None and args.category is not None:
-        raise ValueError("Use only one of -t/-c")
+    if args.prerank and args.top is None:
+        parser.error('--prerank requires --top')
+    if args.resume and args.checkpoint is None:
+        parser.error('--resume requires --checkpoint')
+    shard = None
+    if args.shard is not None:
+        try:
+            shard = sharding.parseshard(args.shard)
+        except ValueError as error:
+            parser.error(str(error))
+        if args.partial is None:
+            parser.error('--shard requires --partial')
+        if args.resume:
+            parser.error('--shard cannot resume from a checkpoint')
+        if args.state is not None:
+            parser.error('--shard cannot update the state of a run')
+    cache.configure(args.cache)
+    if args.merge is None:
+        if args.template is None and args.category is None:
+            raise ValueError("Use -t TEMPLATE or -c CATEGORY")
+        if args.template is not None and args.category is not None:
+            raise ValueError("Use only one of -t/-c")
+    # the wiki and pageview requests share the transport of the process
     site = mwclient.Site((PROTOCOL, WIKIPEDIA_URL.format(args.lang)),
-                         clients_useragent=USER_AGENT)
+                         pool=transport.default())
     # login to the site
     configparser = RawConfigParser()
     configparser.read(args.config)
     site.login(configparser.get('login', 'user'),
                configparser.get('login', 'password'))
-    # fetch articles list
-    articles = []
+    if args.merge is not None:
+        merged = sharding.merge((sharding.Partial.load(path)
+                                 for path in args.merge), args.top)
+        LOG.info("Saving merged reports to %s", args.report)
+        writer = report.ReportWriter(site, args.report,
+                                     pagesize=args.pagesize)
+        writer.write(merged.ranked(), merged.processed, merged.filtered)
+        return
+    # articles are listed while they are analyzed
     LOG.info("Start searching articles")
     if args.category is None:
         search = mwtemplate.ArticleWithTemplate(site, args.template)
         articles = search.listarticles()
     else:
+        # members come with their image properties
         category = site.Categories[args.category.decode('utf-8')]
-        articles = searcharticles(category)
+        articles = searcharticles(category, args.depth,
+                                  lister=batch.CategoryLister(site))
     # get the call back
-    callback = Callback(MAX_TIME_WITHOUT_UPDATE, site, args.report)
-    gap = contentgap.ContentGap(articles)
-    gap.filterandrank([lambda x: not isthereanimage(x)],
-                      latest90,
-                      callback.callback())
+    callback = Callback(MAX_TIME_WITHOUT_UPDATE, site, args.report,
+                        pagesize=args.pagesize, background=True,
+                        metricsfile=args.metrics)
+    callbacks = callback.callback()
+    if shard is not None:
+        # a shard saves its partial ranking instead of reports
+        callbacks = {'timer': MAX_TIME_WITHOUT_UPDATE,
+                     'function': lambda gap: None}
+    fetcherclass, detection = DETECTIONS[args.detection]
+    fetcher = fetcherclass(site)
+    if args.category is not None and args.detection == 'pageimages':
+        fetcher = None
+    outcomes = None
+    if args.checkpoint is not None:
+        outcomes = checkpoint.Checkpoint(args.checkpoint, resume=args.resume)
+    previous = []
+    rejected = []
+    results = None
+    window = pageviews.window()[1]
+    if args.state is not None:
+        state = incremental.previous(site, args.state, args.report)
+        # the previous articles still in the category or using the template
+        # are listed again, and the stale ones analyzed as the other ones
+        previous, _, rejected = incremental.refresh(site, state, window)
+        results = incremental.State(window=window)
+    index = None
+    if args.dumps is None:
+        evaluation = pageviews.fetcher(args.lang).evaluation
+    else:
+        # the views of the candidates are indexed before they are analyzed,
+        # so that reports are saved periodically while they are filtered
+        articles = list(articles)
+        index = dumps.PageviewIndex(args.index)
+        index.load(args.lang,
+                   dumps.windowdumps(args.dumps, hourly=args.hourly),
+                   [getattr(article, 'name', article) for article in articles] +
+                   [entry.title for entry in previous])
+        evaluation = index.evaluation(args.lang, vectorized=True)
+    gap = contentgap.ContentGap(articles, fetcher=fetcher,
+                                workers=args.workers, top=args.top,
+                                checkpoint=outcomes, shard=shard,
+                                previous=previous, site=site,
+                                rejected=rejected, outcomes=results)
+    try:
+        gap.filterandrank([lambda x: not detection(x)], evaluation,
+                          callbacks, vectorized=True, prerank=args.prerank)
+        if shard is not None:
+            gap.partial().dump(args.partial)
+        if results is not None:
+            results.dump(args.state)
+    finally:
+        if index is not None:
+            index.close()
+        callback.close()
+        if outcomes is not None:
+            outcomes.close()
+        LOG.info("HTTP transport: %s", transport.default().stats())
 
 
 if __name__ == '__main__':
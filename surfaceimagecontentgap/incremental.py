@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+"""Incremental re-ranking from the results of a previous run.
+
+The outcome of every article analyzed by a run, its revision, whether it was
+kept by the filters and its score, is saved with the pageview window of the
+scores to a JSON state file. Without a state file, the ranking of the report
+pages already on the wiki is used, without revisions nor window. The next
+run starts from these previous results instead of a full scan:
+    - kept articles whose revision did not change are kept without being
+      analyzed again, with their score when the window did not change, and
+      evaluated again otherwise,
+    - articles filtered out whose revision did not change are not analyzed
+      again either,
+    - articles whose revision changed, or is unknown, are analyzed again:
+      they are dropped if they gained an image,
+    - deleted articles are dropped,
+    - the candidates listed by the run which were not in the previous
+      results are analyzed as usual.
+Previous articles are only kept, or analyzed again, when the listing of the
+run lists them again (see contentgap.ContentGap), so that an article which
+left the category or the template of a report leaves it too. Sources
+without membership, such as recent changes or random articles, list the
+previous articles themselves (see candidates).
+"""
+
+import collections
+import itertools
+import json
+import logging
+import os
+import re
+
+from surfaceimagecontentgap import batch, records, report
+
+# Constants
+LOGGER_NAME = 'sicglog'
+
+# Title and score of the rows of a report table (see report.ROW)
+ROW_PATTERN = re.compile(r'^\| \[\[(.+?)\]\]\n\| (.*)$', re.MULTILINE)
+
+# Properties giving the latest revision of the previous articles
+INFO_PARAMS = {'prop': 'info'}
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+class State(object):
+
+    """Results of a run: the outcome of each article analyzed."""
+
+    def __init__(self, kept=None, window=None, rejected=None):
+        """Constructor.
+
+        Args:
+            kept (list): records.ArticleRecord of the articles kept by the
+                filters, with their score
+            window (str, optional): last day (YYYYmmdd) of the pageview
+                window of the scores, None when unknown
+            rejected (list, optional): records.ArticleRecord of the articles
+                filtered out
+        """
+        self.window = window
+        self.__outcomes__ = collections.OrderedDict()
+        for entry in kept or []:
+            self.add(entry, True)
+        for entry in rejected or []:
+            self.add(entry, False)
+
+    @property
+    def kept(self):
+        """Records of the articles kept by the filters."""
+        return [entry for entry, kept in self.__outcomes__.values() if kept]
+
+    @property
+    def rejected(self):
+        """Records of the articles filtered out."""
+        return [entry for entry, kept in self.__outcomes__.values()
+                if not kept]
+
+    def __len__(self):
+        return len(self.__outcomes__)
+
+    def add(self, record, kept):
+        """Save the outcome of an article, replacing a former one.
+
+        Args:
+            record (records.ArticleRecord): article with its score, None
+                when not evaluated.
+            kept (bool): whether the article was kept by the filters
+        """
+        self.__outcomes__.pop(record.title, None)
+        self.__outcomes__[record.title] = (record, kept)
+
+    def dump(self, path):
+        """Save the state to a JSON file."""
+        with open(path, 'w') as statefile:
+            json.dump({'window': self.window,
+                       'kept': [list(entry.astuple())
+                                for entry in self.kept],
+                       'rejected': [list(entry.astuple()[:3])
+                                    for entry in self.rejected]},
+                      statefile)
+
+    @staticmethod
+    def load(path):
+        """State saved to a JSON file, or the ranking of a former one."""
+        with open(path) as statefile:
+            state = json.load(statefile)
+        kept = state.get('kept', state.get('ranking', []))
+        return State([records.ArticleRecord(*row) for row in kept],
+                     state['window'],
+                     [records.ArticleRecord(*row)
+                      for row in state.get('rejected', [])])
+
+
+def score(text):
+    """Score of a report row, None when it is not a number."""
+    try:
+        return int(text.strip())
+    except ValueError:
+        return None
+
+
+def parsereport(text):
+    """Records of the articles of a report page, without revision."""
+    return [records.ArticleRecord(title, score=score(views))
+            for title, views in ROW_PATTERN.findall(text)]
+
+
+def fromreport(site, pagename):
+    """State of the report pages saved on the wiki.
+
+    Args:
+        site (mwclient.Site): wiki of the report
+        pagename (str): name of the first report page, the following ones
+            are its subpages (see report.subpage)
+    """
+    if isinstance(pagename, bytes):
+        pagename = pagename.decode('utf-8')
+    ranked = []
+    number = 0
+    while True:
+        page = site.Pages[report.subpage(pagename, number)]
+        rows = parsereport(page.text()) if page.exists else []
+        if not rows:
+            break
+        ranked.extend(rows)
+        number += 1
+    LOG.info("%d articles in the report %s", len(ranked), pagename)
+    return State(ranked)
+
+
+def previous(site, path, pagename):
+    """State of the file path, or of the report pages when there is no such
+    file."""
+    if os.path.exists(path):
+        state = State.load(path)
+        LOG.info("%d articles in the state %s", len(state), path)
+        return state
+    return fromreport(site, pagename)
+
+
+def revisions(site, titles):
+    """Latest revision of titles, by batches.
+
+    Returns:
+        dict: {title: revid}, None for missing pages
+    """
+    latest = {}
+    for chunk in batch.chunks(titles, batch.batchsize(site)):
+        pages = batch.query(site, chunk, INFO_PARAMS)
+        for title in chunk:
+            if 'missing' in pages[title]:
+                latest[title] = None
+            else:
+                latest[title] = pages[title].get('lastrevid')
+    return latest
+
+
+def refresh(site, state, window):
+    """Previous articles to keep, to analyze again and to leave out.
+
+    Args:
+        site (mwclient.Site): wiki of the articles
+        state (State): previous results
+        window (str): last day of the pageview window of the run
+
+    Returns:
+        tuple: (kept, stale, rejected), the records of the articles kept,
+            with no score when they need to be evaluated again, the titles
+            of the articles to analyze again, and the records of the
+            articles filtered out which did not change.
+    """
+    previous = state.kept
+    filteredout = state.rejected
+    latest = revisions(site, [entry.title
+                              for entry in itertools.chain(previous,
+                                                           filteredout)])
+    kept = []
+    stale = []
+    rejected = []
+    dropped = 0
+    for entry in previous:
+        revid = latest[entry.title]
+        if revid is None:
+            dropped += 1
+        elif entry.revid is None or entry.revid != revid:
+            stale.append(entry.title)
+        elif state.window != window:
+            kept.append(records.record(entry))
+        else:
+            kept.append(entry)
+    for entry in filteredout:
+        revid = latest[entry.title]
+        if revid is None:
+            dropped += 1
+        elif entry.revid is None or entry.revid != revid:
+            stale.append(entry.title)
+        else:
+            rejected.append(entry)
+    LOG.info("Previous articles: %d kept, %d left out, %d to analyze again, "
+             "%d deleted", len(kept), len(rejected), len(stale), dropped)
+    return kept, stale, rejected
+
+
+def candidates(stale, articles, kept=()):
+    """Articles of a source without membership (recent changes, random
+    articles), with the previous articles.
+
+    Yields the stale articles (titles or page objects), the records of the
+    previous articles not analyzed again (kept or filtered out), then the
+    articles listed by the run which are not among them.
+    """
+    titles = set()
+    for article in itertools.chain(stale, kept):
+        titles.add(getattr(article, 'name', article))
+        yield article
+    for article in articles:
+        if getattr(article, 'name', article) not in titles:
+            yield article
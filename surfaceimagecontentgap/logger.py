@@ -1,29 +1,251 @@
+"""Logging of the scripts, configured once for the whole process.
+
+The records of the sicglog logger are put in a queue by the threads logging
+them, and written to the console (and to a log file) by a listener thread,
+so that no analysis thread waits for the formatting and the I/O of a record.
+
+Articles are not logged one by one but counted by a Progress, which logs a
+progress line (articles per second and ETA) periodically, and the title of
+one article every sample articles.
+"""
+
+import atexit
 import logging
+import os
 import sys
+import threading
+import time
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+try:
+    from logging.handlers import QueueHandler, QueueListener
+except ImportError:
+    QueueHandler = QueueListener = None
 
 
 FMT = '%(asctime)s    %(module)s    %(levelname)s    %(message)s'
 LOGGER_NAME = 'sicglog'
 
+# Seconds between two progress lines
+PROGRESS_INTERVAL = 30
+
+# Articles between two articles logged, None to log none
+PROGRESS_SAMPLE = 1000
+
+# Listener of the queue of records, None until configured
+LISTENER = None
+
+
+if QueueHandler is None:
+    class QueueHandler(logging.Handler):
+
+        """Handler putting the records in a queue (logging.handlers of
+        Python 3)."""
+
+        def __init__(self, queue):
+            logging.Handler.__init__(self)
+            self.queue = queue
+
+        def prepare(self, record):
+            """Record with its message merged, as it may be written after
+            its arguments changed."""
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(
+                    record.exc_info)
+                record.exc_info = None
+            return record
+
+        def emit(self, record):
+            try:
+                self.queue.put_nowait(self.prepare(record))
+            except Exception:
+                self.handleError(record)
+
+if QueueListener is None:
+    class QueueListener(object):
+
+        """Thread writing the records of a queue to handlers
+        (logging.handlers of Python 3)."""
+
+        sentinel = None
+
+        def __init__(self, queue, *handlers):
+            self.queue = queue
+            self.handlers = handlers
+            self.__thread__ = None
+
+        def handle(self, record):
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+        def monitor(self):
+            while True:
+                record = self.queue.get()
+                if record is self.sentinel:
+                    return
+                self.handle(record)
+
+        def start(self):
+            self.__thread__ = threading.Thread(target=self.monitor)
+            self.__thread__.daemon = True
+            self.__thread__.start()
+
+        def stop(self):
+            self.queue.put_nowait(self.sentinel)
+            self.__thread__.join()
+            self.__thread__ = None
+
+
+class ProcessQueueHandler(QueueHandler):
+
+    """Queue handler of the process configuring the logging.
+
+    Processes forked from it (shards of an analysis for instance) have no
+    listener: they write their records to the handlers themselves.
+    """
+
+    def __init__(self, queue, handlers):
+        QueueHandler.__init__(self, queue)
+        self.handlers = handlers
+        self.pid = os.getpid()
+
+    def emit(self, record):
+        if os.getpid() == self.pid:
+            QueueHandler.emit(self, record)
+            return
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def configure(debug=False, logfile=None, interval=None, sample=None):
+    """Configure the logging of the process, once: later calls only return
+    the logger.
+
+    Args:
+        debug (bool): whether debug records are logged
+        logfile (str, optional): file the records are also written to
+        interval (int, optional): seconds between two progress lines,
+            default is PROGRESS_INTERVAL
+        sample (int, optional): articles between two articles logged by a
+            progress, default is PROGRESS_SAMPLE
+
+    Returns:
+        logging.Logger: the sicglog logger
+    """
+    global LISTENER, PROGRESS_INTERVAL, PROGRESS_SAMPLE
+    log = logging.getLogger(LOGGER_NAME)
+    if len(log.handlers):
+        # handlers have already been added
+        return log
+    level = logging.DEBUG if debug else logging.INFO
+    formatter = logging.Formatter(FMT)
+    handlers = [logging.StreamHandler(stream=sys.stdout)]
+    if logfile is not None:
+        handlers.append(logging.FileHandler(logfile))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        handler.setLevel(level)
+    queue = Queue()
+    LISTENER = QueueListener(queue, *handlers)
+    LISTENER.start()
+    atexit.register(shutdown)
+    log.addHandler(ProcessQueueHandler(queue, handlers))
+    log.setLevel(level)
+    # the records are not written again by the handlers of the root logger
+    log.propagate = False
+    if interval is not None:
+        PROGRESS_INTERVAL = interval
+    if sample is not None:
+        PROGRESS_SAMPLE = sample
+    return log
+
+
+def shutdown():
+    """Write the records left in the queue and stop the listener."""
+    global LISTENER
+    if LISTENER is not None:
+        LISTENER.stop()
+        LISTENER = None
+
 
 def logger(debug=False):
     """Logger for query engine."""
-    log = logging.getLogger(name=LOGGER_NAME)
-    if not len(log.handlers):
-        # handlers have not yet been added
-        setup(log, debug=debug)
-    return log
+    return configure(debug=debug)
 
 
-def setup(log, debug=True):
-    consolehandler = logging.StreamHandler(stream=sys.stdout)
-    formatter = logging.Formatter(FMT)
-    consolehandler.setFormatter(formatter)
-    if debug:
-        consolehandler.setLevel(logging.DEBUG)
-        log.addHandler(consolehandler)
-        log.setLevel(logging.DEBUG)
-    else:
-        consolehandler.setLevel(logging.INFO)
-        log.addHandler(consolehandler)
-        log.setLevel(logging.INFO)
+def duration(seconds):
+    """Duration as H:MM:SS."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '%d:%02d:%02d' % (hours, minutes, seconds)
+
+
+class Progress(object):
+
+    """Progress of the analysis of articles, logged periodically.
+
+    Attributes:
+        total (int): number of articles to analyze, None when unknown
+        count (int): number of articles analyzed
+    """
+
+    def __init__(self, total=None, interval=None, sample=None,
+                 clock=time.time):
+        """Constructor.
+
+        Args:
+            total (int, optional): number of articles to analyze, for the ETA
+            interval (int, optional): seconds between two progress lines,
+                default is the one configured
+            sample (int, optional): articles between two articles logged,
+                default is the one configured
+            clock (function): current time in seconds
+        """
+        self.total = total
+        self.interval = PROGRESS_INTERVAL if interval is None else interval
+        self.sample = PROGRESS_SAMPLE if sample is None else sample
+        self.clock = clock
+        self.count = 0
+        self.start = self.last = clock()
+        self.log = logging.getLogger(LOGGER_NAME)
+
+    def tick(self, name=None):
+        """Count an article analyzed."""
+        self.count += 1
+        if self.sample and name is not None and self.count % self.sample == 0:
+            self.log.info("Analyzing: %s (article %d)", name, self.count)
+        now = self.clock()
+        if now - self.last >= self.interval:
+            self.report(now)
+
+    def rate(self, now=None):
+        """Articles analyzed per second."""
+        elapsed = (self.clock() if now is None else now) - self.start
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def eta(self, now=None):
+        """Seconds left until every article is analyzed, None when the total
+        is unknown."""
+        rate = self.rate(now)
+        if self.total is None or not rate:
+            return None
+        return max(self.total - self.count, 0) / rate
+
+    def report(self, now=None):
+        """Log a progress line."""
+        now = self.clock() if now is None else now
+        self.last = now
+        eta = self.eta(now)
+        if eta is None:
+            self.log.info("%d articles analyzed, %.1f articles/s",
+                          self.count, self.rate(now))
+        else:
+            self.log.info("%d/%d articles analyzed, %.1f articles/s, ETA %s",
+                          self.count, self.total, self.rate(now),
+                          duration(eta))
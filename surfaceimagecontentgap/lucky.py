@@ -1,33 +1,45 @@
 from argparse import ArgumentParser
 
-import pageviewapi
-from surfaceimagecontentgap import logger
+from surfaceimagecontentgap import cache, logger, pageviews, sampling
 from surfaceimagecontentgap.bot import SurfaceContentGapBot
-from surfaceimagecontentgap.imagegap import isthereanimage
 
 
 LOG = logger.logger()
 
 
-def list_artilces(bot):
-    site = bot.site
-    titles = []
-    random_generator = site.random(0)
-    while len(titles) < 1000:
-        r = random_generator.next()
-        if r['title'] not in titles:
-            titles.append(r['title'])
-    LOG.info('%d random articles', len(titles))
-    return [site.Pages[title] for title in titles]
+def list_artilces(bot, size=sampling.SAMPLE_SIZE):
+    """Yields the titles of distinct random articles, fetched by batches by
+    the bot."""
+    count = 0
+    for title in sampling.randomtitles(bot.site, size):
+        count += 1
+        yield title
+    LOG.info('%d random articles', count)
+
+
+def sample_articles(size=sampling.SAMPLE_SIZE, titles=None, seed=None):
+    """List function of random articles.
+
+    Args:
+        size (int): number of articles
+        titles (str, optional): all titles dump file the articles are
+            sampled from, None to use the random list of the API.
+        seed (int, optional): seed of the sample from the dump file
+    """
+    def list_fun(bot):
+        if titles is None:
+            return list_artilces(bot, size)
+        return sampling.sampletitles(titles, size, seed)
+    return list_fun
 
 
 def pageview90(bot, article):
-    project = '{lang}.wikipedia'.format(lang=bot.lang)
-    return pageviewapi.period.sum_last(project,
-                                       article.name.encode('utf-8'),
-                                       last=90,
-                                       access='all-access',
-                                       agent='all-agents')
+    return pageviews.fetcher(bot.lang).views(article.name)
+
+
+def pageviews90(bot, articles):
+    """Views of the latest 90 days of articles, requested concurrently."""
+    return pageviews.fetcher(bot.lang).evaluation(articles)
 
 
 def main():
@@ -49,15 +61,65 @@ def main():
                         dest='config',
                         required=True,
                         help='Config file with login and password.')
+    parser.add_argument('--cache',
+                        type=str,
+                        dest='cache',
+                        required=False,
+                        default=None,
+                        help='Cache file of image status and views.')
+    parser.add_argument('--checkpoint',
+                        type=str,
+                        dest='checkpoint',
+                        required=False,
+                        default=None,
+                        help='Checkpoint file of the analyzed articles.')
+    parser.add_argument('--resume',
+                        action='store_true',
+                        dest='resume',
+                        help='Resume the analysis from the checkpoint file.')
+    parser.add_argument('-n', '--size',
+                        type=int,
+                        dest='size',
+                        required=False,
+                        default=sampling.SAMPLE_SIZE,
+                        help='Number of random articles.')
+    parser.add_argument('--titles',
+                        type=str,
+                        dest='titles',
+                        required=False,
+                        default=None,
+                        help='Dump file of all titles to sample articles '
+                             'from, instead of the random API.')
+    parser.add_argument('--seed',
+                        type=int,
+                        dest='seed',
+                        required=False,
+                        default=None,
+                        help='Seed of the sample of the titles dump file.')
+    parser.add_argument('--state',
+                        type=str,
+                        dest='state',
+                        required=False,
+                        default=None,
+                        help='State file of incremental runs, updating the '
+                             'results of the previous run (or report).')
     args = parser.parse_args()
+    if args.resume and args.checkpoint is None:
+        parser.error('--resume requires --checkpoint')
+    cache.configure(args.cache)
     kwargs = {
         'config_file': args.config,
         'lang': args.lang,
         'report': args.report,
-        'list_fun': list_artilces,
-        'filter_fun': lambda bot, x: not isthereanimage(x),
-        'rank_fun': pageview90,
-        'frequency': 60
+        'list_fun': sample_articles(args.size, args.titles, args.seed),
+        'filter_fun': lambda bot, x: not bot.isthereanimage(x),
+        'rank_fun': pageviews90,
+        'rank_vectorized': True,
+        'frequency': 60,
+        'fetch_batch': True,
+        'checkpoint': args.checkpoint,
+        'resume': args.resume,
+        'state': args.state
     }
     lucky_bot = SurfaceContentGapBot(**kwargs)
     lucky_bot.run()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""Image patterns matching in wikitext.
+
+A matcher is compiled once per language, with the names of the File
+namespace of the wiki. The text is scanned once by a regular expression
+starting with one of the few characters of the patterns ('<' of galleries,
+'.' of extensions, ':' after a namespace name), the namespace names being
+checked before each ':' found: an alternation of the names themselves would
+be tried at each of their frequent first letters.
+"""
+
+import re
+
+# Constants
+FILE_NAMESPACE = 6
+
+# Image patterns, besides the File namespace names
+GALLERY = '<gallery>'
+DEFAULT_NAMESPACES = ['File', 'Image']
+EXTENSIONS = ['.jpg', '.JPG', '.gif', '.GIF', '.PNG', '.SVG', '.TIF',
+              '.png', '.svg', '.tif', '.jpeg', '.JPEG']
+
+# Matchers by language
+MATCHERS = {}
+
+
+class ImageMatcher(object):
+
+    """Finds image patterns in wikitext."""
+
+    def __init__(self, namespaces=None):
+        """Constructor.
+
+        Args:
+            namespaces (list, optional): names and aliases of the File
+                namespace, default is the english ones ('File', 'Image').
+        """
+        if namespaces is None:
+            namespaces = DEFAULT_NAMESPACES
+        names = set()
+        for name in namespaces:
+            names.add(name)
+            # namespace names are case insensitive on their first letter
+            names.add(name[:1].lower() + name[1:])
+        self.names = names
+        self.lengths = sorted(set(len(name) for name in names))
+        self.patterns = ([GALLERY] +
+                         [name + u':' for name in sorted(names)] +
+                         EXTENSIONS)
+        extensions = u'|'.join(re.escape(extension[1:])
+                               for extension in EXTENSIONS)
+        self.regex = re.compile(u'%s|\\.(?:%s)|:' % (re.escape(GALLERY),
+                                                     extensions),
+                                re.UNICODE)
+        self.overlap = max(len(pattern) for pattern in self.patterns) - 1
+
+    def search(self, text):
+        """Returns whether there is an image pattern in text."""
+        for match in self.regex.finditer(text):
+            end = match.start()
+            if text[end] != u':':
+                return True
+            for length in self.lengths:
+                if length > end:
+                    break
+                if text[end - length:end] in self.names:
+                    return True
+        return False
+
+    def searchstream(self, chunks):
+        """Returns whether there is an image pattern in a text read by chunks.
+
+        Reading stops at the first chunk where a pattern is found. The end of
+        each chunk is kept to find patterns spanning two chunks.
+
+        Args:
+            chunks (iterable): chunks of the text
+        """
+        tail = u''
+        for chunk in chunks:
+            text = tail + chunk
+            if self.search(text):
+                return True
+            tail = text[-self.overlap:]
+        return False
+
+
+def filenamespaces(site):
+    """Names and aliases of the File namespace of site from its siteinfo."""
+    result = site.api('query', meta='siteinfo',
+                      siprop='namespaces|namespacealiases')
+    query = result['query']
+    namespace = query['namespaces'][str(FILE_NAMESPACE)]
+    names = set(DEFAULT_NAMESPACES)
+    names.add(namespace['*'])
+    if namespace.get('canonical'):
+        names.add(namespace['canonical'])
+    for alias in query.get('namespacealiases', []):
+        if alias['id'] == FILE_NAMESPACE:
+            names.add(alias['*'])
+    return sorted(names)
+
+
+def matcher(site=None):
+    """Image matcher for the language of site, compiled once per language.
+
+    Args:
+        site (mwclient.Site, optional): site of the articles, default matcher
+            with english namespaces when None.
+    """
+    lang = None
+    if site is not None:
+        lang = site.site['lang']
+    if lang not in MATCHERS:
+        if site is None:
+            MATCHERS[lang] = ImageMatcher()
+        else:
+            MATCHERS[lang] = ImageMatcher(filenamespaces(site))
+    return MATCHERS[lang]
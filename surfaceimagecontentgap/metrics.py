@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+"""Timings and counters of the stages of an analysis.
+
+Each stage (listing of the articles, fetch of their wikitext, search of
+images, views lookup, report saves...) records its durations in a
+histogram; counters count the articles, the HTTP requests and bytes, and
+the hits and misses of each kind of cache entry. The metrics of the process
+are exported at the end of a run as a JSON summary, or in the Prometheus
+text format for a long running bot (with the textfile collector of the node
+exporter for instance).
+"""
+
+from contextlib import contextmanager
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+# Constants
+LOGGER_NAME = 'sicglog'
+PREFIX = 'sicg'
+
+# Upper bounds of the buckets of the histograms, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1, 2.5, 5, 10, 30, 60)
+
+# Metrics of the process
+METRICS = None
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+class Histogram(object):
+
+    """Distribution of durations in buckets.
+
+    Attributes:
+        buckets (tuple): upper bounds of the buckets
+        counts (list): number of values in each bucket, the last one for the
+            values above every bound
+        count (int): number of values
+        sum (float): sum of the values
+        max (float): greatest value
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Add a value."""
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket of the quantile, max above the last
+        bound."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        cumulated = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulated += count
+            if cumulated >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def asdict(self):
+        """Summary of the histogram."""
+        return {'count': self.count,
+                'sum': self.sum,
+                'mean': self.sum / self.count if self.count else 0.0,
+                'p50': self.quantile(0.5),
+                'p99': self.quantile(0.99),
+                'max': self.max}
+
+
+class Metrics(object):
+
+    """Histograms of the stages and counters, shared by threads."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.stages = {}
+        self.counters = {}
+        self.caches = {}
+        self.__lock__ = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """Record a duration of stage."""
+        with self.__lock__:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram(self.buckets)
+            self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Context recording its duration in stage."""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.time() - start)
+
+    def count(self, counter, value=1):
+        """Add value to a counter."""
+        with self.__lock__:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def hit(self, cache, hit):
+        """Count a hit, or a miss, of a kind of cache entry."""
+        with self.__lock__:
+            hits, misses = self.caches.get(cache, (0, 0))
+            if hit:
+                hits += 1
+            else:
+                misses += 1
+            self.caches[cache] = (hits, misses)
+
+    def asdict(self):
+        """Summary of the metrics."""
+        with self.__lock__:
+            caches = {}
+            for cache, (hits, misses) in self.caches.items():
+                total = hits + misses
+                caches[cache] = {'hits': hits, 'misses': misses,
+                                 'rate': float(hits) / total if total else 0.0}
+            return {'stages': dict((stage, histogram.asdict())
+                                   for stage, histogram
+                                   in self.stages.items()),
+                    'counters': dict(self.counters),
+                    'caches': caches}
+
+    def json(self):
+        """Summary of the metrics as JSON."""
+        return json.dumps(self.asdict(), indent=2, sort_keys=True)
+
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format."""
+        name = PREFIX + '_stage_seconds'
+        lines = ['# HELP %s Duration of the stages.' % name,
+                 '# TYPE %s histogram' % name]
+        with self.__lock__:
+            for stage in sorted(self.stages):
+                histogram = self.stages[stage]
+                cumulated = 0
+                bounds = [repr(float(bound)) for bound in histogram.buckets]
+                for bound, count in zip(bounds + ['+Inf'], histogram.counts):
+                    cumulated += count
+                    lines.append('%s_bucket{stage="%s",le="%s"} %d' % (
+                        name, stage, bound, cumulated))
+                lines.append('%s_sum{stage="%s"} %r' % (
+                    name, stage, histogram.sum))
+                lines.append('%s_count{stage="%s"} %d' % (
+                    name, stage, histogram.count))
+            for counter in sorted(self.counters):
+                name = '%s_%s_total' % (PREFIX, counter)
+                lines.append('# TYPE %s counter' % name)
+                lines.append('%s %s' % (name, self.counters[counter]))
+            name = PREFIX + '_cache_lookups_total'
+            lines.append('# TYPE %s counter' % name)
+            for cache in sorted(self.caches):
+                hits, misses = self.caches[cache]
+                lines.append('%s{cache="%s",result="hit"} %d' % (
+                    name, cache, hits))
+                lines.append('%s{cache="%s",result="miss"} %d' % (
+                    name, cache, misses))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Export the metrics to a file, in the Prometheus text format when
+        its extension is .prom, as JSON otherwise.
+
+        The file is replaced at once, so that it is never read half written.
+        """
+        if path.endswith('.prom'):
+            text = self.prometheus()
+        else:
+            text = self.json()
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as metricsfile:
+            metricsfile.write(text)
+        os.rename(temporary, path)
+
+
+def configure(buckets=BUCKETS):
+    """Start new metrics for the process."""
+    global METRICS
+    METRICS = Metrics(buckets)
+    return METRICS
+
+
+def default():
+    """Metrics of the process, created on first use."""
+    if METRICS is None:
+        configure()
+    return METRICS
+
+
+def timer(stage):
+    """Context recording its duration in stage of the process metrics."""
+    return default().timer(stage)
+
+
+def stage(name):
+    """Decorator recording the duration of each call in a stage."""
+    def decorator(function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            with timer(name):
+                return function(*args, **kwargs)
+        return timed
+    return decorator
+
+
+def timed(name, iterable):
+    """Yields the elements of iterable, recording the time taken to get each
+    of them in a stage."""
+    iterator = iter(iterable)
+    while True:
+        start = time.time()
+        try:
+            element = next(iterator)
+        except StopIteration:
+            return
+        default().observe(name, time.time() - start)
+        yield element
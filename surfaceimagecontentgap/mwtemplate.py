@@ -5,9 +5,10 @@
 import logging
 
 
-import mwclient
 import mwclient.listing as listing
 
+from surfaceimagecontentgap import metrics
+
 LOGGER_NAME = 'sicglog'
 LOG = logging.getLogger(LOGGER_NAME)
 
@@ -25,11 +26,15 @@ class ArticleWithTemplate(object):
 
     def listarticles(self):
         """List of articles containing a given template."""
+        return metrics.timed('enumeration', self.embeddedin())
+
+    def embeddedin(self):
+        """Yields the titles of the articles containing the template, fetched
+        by batches by the bot (see batch.BatchFetcher)."""
         # list only namespace 0 for wikipedia articles namespace
         kwargs = dict(listing.List.generate_kwargs('ei', prop='title',
                                                    title=self.templatename,
                                                    namespace=0))
         gen = listing.List(self.site, 'embeddedin', 'ei', **kwargs)
         for info in gen:
-            titlename = info['title']
-            yield mwclient.page.Page(self.site, titlename)
+            yield info['title']
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""Bulk retrieval of page views from the Wikimedia pageview API.
+
+Views of many articles are requested concurrently, by a bounded pool of
+threads sharing the HTTP transport of the process (and its keep-alive
+connections).
+"""
+
+import datetime
+import logging
+from multiprocessing.pool import ThreadPool
+try:
+    from urllib import quote
+except ImportError:
+    from urllib.parse import quote
+
+from surfaceimagecontentgap import cache, metrics, transport
+
+# Constants
+LOGGER_NAME = 'sicglog'
+API_URL = ('https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article/'
+           '{project}/{access}/{agent}/{page}/daily/{start}/{end}')
+WORKERS = 8
+LAST_DAYS = 90
+
+# Views of a window change when the window moves, every day
+VIEWS_TTL = 24 * 3600
+
+# Fetchers by language
+FETCHERS = {}
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+def window(last=LAST_DAYS, today=None):
+    """First and last days (YYYYmmdd) of the last days until today."""
+    if today is None:
+        today = datetime.date.today()
+    start = today - datetime.timedelta(days=last)
+    return start.strftime('%Y%m%d'), today.strftime('%Y%m%d')
+
+
+def pagename(title):
+    """Article title as expected in the pageview API url."""
+    if not isinstance(title, bytes):
+        title = title.encode('utf-8')
+    return quote(title.replace(b' ', b'_'), safe='')
+
+
+class PageviewFetcher(object):
+
+    """Sum of the daily views of articles over the last days."""
+
+    def __init__(self, lang, last=LAST_DAYS, workers=WORKERS, http=None,
+                 access='all-access', agent='all-agents', api=API_URL):
+        """Constructor.
+
+        Args:
+            lang (str): language code of the wikipedia
+            last (int): number of days to sum the views of
+            workers (int): maximum number of concurrent requests
+            http (requests.Session, optional): HTTP session to use, default
+                is the transport of the process (transport.default())
+            access (str): access method of the views
+            agent (str): agent type of the views
+            api (str): url template of the daily views of a page
+        """
+        self.lang = lang
+        self.project = '{lang}.wikipedia'.format(lang=lang)
+        self.last = last
+        self.workers = workers
+        self.http = http or transport.default()
+        self.access = access
+        self.agent = agent
+        self.api = api
+        self.__pool__ = None
+
+    def url(self, title):
+        """Pageview API url of the daily views of title."""
+        start, end = window(self.last)
+        return self.api.format(project=self.project,
+                               access=self.access,
+                               agent=self.agent,
+                               page=pagename(title),
+                               start=start,
+                               end=end)
+
+    def views(self, title):
+        """Sum of the daily views of title, 0 when there is no data.
+
+        Views are cached by window when the cache is configured.
+        """
+        store = cache.default()
+        key = cache.viewskey(self.lang, title, window(self.last)[1])
+        if store is not None:
+            views = store.get(key)
+            metrics.default().hit('views', views is not None)
+            if views is not None:
+                return views
+        with metrics.timer('pageviews'):
+            response = self.http.get(self.url(title))
+        if response.status_code == 404:
+            # no data for articles without views (or not loaded yet)
+            views = 0
+        else:
+            response.raise_for_status()
+            views = sum(daily['views'] for daily in response.json()['items'])
+        if store is not None:
+            store.set(key, views, ttl=VIEWS_TTL)
+        return views
+
+    def pool(self):
+        """Thread pool of the concurrent requests, created on first use."""
+        if self.__pool__ is None:
+            self.__pool__ = ThreadPool(self.workers)
+        return self.__pool__
+
+    def bulk(self, titles):
+        """Views of many titles, requested concurrently.
+
+        Returns:
+            dict: {title: views}
+        """
+        titles = list(titles)
+        LOG.info("Fetching views of %d articles", len(titles))
+        return dict(zip(titles, self.pool().map(self.views, titles)))
+
+    def evaluation(self, articles):
+        """Vectorized evaluation of articles by their views.
+
+        Args:
+            articles (list): page objects with a name
+
+        Returns:
+            list: views of each article
+        """
+        titles = [article.name for article in articles]
+        views = self.bulk(titles)
+        return [views[title] for title in titles]
+
+
+def fetcher(lang):
+    """Pageview fetcher of the language, shared by the whole process."""
+    if lang not in FETCHERS:
+        FETCHERS[lang] = PageviewFetcher(lang)
+    return FETCHERS[lang]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""Background publishing of reports.
+
+Saving a report is a wiki edit which may take seconds with edit throttling.
+The publisher saves reports in a background thread, so that the analysis
+goes on meanwhile. Snapshots queued during a save are coalesced: only the
+latest one is saved next.
+"""
+
+import logging
+import threading
+import time
+
+# Constants
+LOGGER_NAME = 'sicglog'
+RETRIES = 3
+BACKOFF = 5
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+class AsyncPublisher(object):
+
+    """Writes the latest report snapshot in a background thread.
+
+    Failed writes are retried with an exponential backoff, unless a newer
+    snapshot is waiting, and never raise in the publishing thread.
+    """
+
+    def __init__(self, writer, retries=RETRIES, backoff=BACKOFF):
+        """Constructor.
+
+        Args:
+            writer (report.ReportWriter): writer of the reports
+            retries (int): number of retries of a failed write
+            backoff (float): delay before the first retry, in seconds,
+                doubled at each retry
+
+        Attributes:
+            published (int): number of snapshots written
+            coalesced (int): number of snapshots replaced by a newer one
+                before being written
+            failures (int): number of snapshots given up after retries
+        """
+        self.writer = writer
+        self.retries = retries
+        self.backoff = backoff
+        self.published = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.__snapshot__ = None
+        self.__closed__ = False
+        self.__condition__ = threading.Condition()
+        self.__thread__ = threading.Thread(target=self.__run__,
+                                           name='report-publisher')
+        self.__thread__.daemon = True
+        self.__thread__.start()
+
+    def publish(self, articlelist, articles=None, filtered_articles=None):
+        """Queue a snapshot of the report, replacing the queued one.
+
+        Args:
+            articlelist (list): ranked records.ArticleRecord
+            articles (int, optional): number of articles processed
+            filtered_articles (int, optional): number of articles filtered
+        """
+        snapshot = (list(articlelist), articles, filtered_articles)
+        with self.__condition__:
+            if self.__snapshot__ is not None:
+                self.coalesced += 1
+            self.__snapshot__ = snapshot
+            self.__condition__.notify()
+
+    def close(self, timeout=None):
+        """Write the queued snapshot and stop the publishing thread.
+
+        Args:
+            timeout (float, optional): maximum time to wait, in seconds
+        """
+        with self.__condition__:
+            self.__closed__ = True
+            self.__condition__.notify()
+        self.__thread__.join(timeout)
+
+    def __run__(self):
+        while True:
+            with self.__condition__:
+                while self.__snapshot__ is None and not self.__closed__:
+                    self.__condition__.wait()
+                if self.__snapshot__ is None:
+                    return
+                snapshot = self.__snapshot__
+                self.__snapshot__ = None
+            self.__write__(snapshot)
+
+    def __write__(self, snapshot):
+        for attempt in range(self.retries + 1):
+            try:
+                self.writer.write(*snapshot)
+                self.published += 1
+                return
+            except Exception:
+                LOG.exception("Publishing report failed (attempt %d)",
+                              attempt + 1)
+            with self.__condition__:
+                if self.__snapshot__ is not None:
+                    # a newer snapshot supersedes this one
+                    return
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        self.failures += 1
+        LOG.error("Report snapshot given up after %d attempts",
+                  self.retries + 1)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""Incremental ranking of evaluated articles."""
+
+import collections
+import heapq
+
+
+class TopRanking(object):
+
+    """Keeps the best evaluated articles as they arrive.
+
+    The ranking is a min-heap of at most size entries, so adding an entry
+    costs O(log size) and the ranking is only sorted when it is read.
+    Articles with the same score keep their arrival order, as with a
+    stable sort of every entry, or the order of the positions given with
+    them, so that rankings of parts of a list of articles merge into the
+    ranking of the whole list.
+    """
+
+    def __init__(self, size=None):
+        """Constructor.
+
+        Args:
+            size (int, optional): number of best entries kept, None to keep
+                every entry.
+
+        Attributes:
+            count (int): number of entries pushed, kept or not
+        """
+        self.size = size
+        self.count = 0
+        self.__heap__ = []
+
+    def __len__(self):
+        return len(self.__heap__)
+
+    def push(self, entry, position=None):
+        """Add an entry to the ranking.
+
+        Args:
+            entry (records.ArticleRecord): evaluated article
+            position (int, optional): position of the article in the list
+                of articles ranked, default is its arrival order.
+        """
+        if position is None:
+            position = self.count
+        # the smallest item is the worst entry: lowest score, and the
+        # latest one among equal scores
+        item = (entry.score, -position, entry)
+        self.count += 1
+        if self.size is None or len(self.__heap__) < self.size:
+            heapq.heappush(self.__heap__, item)
+        elif item > self.__heap__[0]:
+            heapq.heapreplace(self.__heap__, item)
+
+    def extend(self, entries):
+        """Add entries to the ranking."""
+        for entry in entries:
+            self.push(entry)
+
+    def ranked(self):
+        """Entries from the best score to the lowest."""
+        return [item[2] for item in sorted(self.__heap__, reverse=True)]
+
+    def positioned(self):
+        """(position, entry) from the best score to the lowest."""
+        return [(-item[1], item[2])
+                for item in sorted(self.__heap__, reverse=True)]
+
+
+class LatestRanking(object):
+
+    """Keeps the latest evaluated articles of a followed stream, in which
+    articles come again.
+
+    An article pushed again replaces its former entry, an article removed
+    (which no longer passes the filters) leaves the ranking, and the oldest
+    entries are dropped above size entries. Entries are ranked from the
+    best score, and from the latest among equal scores.
+    """
+
+    def __init__(self, size, top=None):
+        """Constructor.
+
+        Args:
+            size (int): number of latest entries kept
+            top (int, optional): number of best entries ranked, None to rank
+                every entry kept
+
+        Attributes:
+            count (int): number of entries pushed, kept or not
+        """
+        self.size = size
+        self.top = top
+        self.count = 0
+        self.__entries__ = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.__entries__)
+
+    def push(self, entry, position=None):
+        """Add an entry to the ranking, replacing the one of its title.
+
+        Args:
+            entry (records.ArticleRecord): evaluated article
+            position (int, optional): ignored, entries are ranked by arrival
+        """
+        self.__entries__.pop(entry.title, None)
+        self.__entries__[entry.title] = (self.count, entry)
+        self.count += 1
+        if len(self.__entries__) > self.size:
+            self.__entries__.popitem(last=False)
+
+    def extend(self, entries):
+        """Add entries to the ranking."""
+        for entry in entries:
+            self.push(entry)
+
+    def remove(self, title):
+        """Remove the entry of title, if any."""
+        self.__entries__.pop(title, None)
+
+    def ranked(self):
+        """Best entries from the best score to the lowest, the latest
+        first."""
+        items = sorted(self.__entries__.values(),
+                       key=lambda item: (item[1].score, item[0]),
+                       reverse=True)
+        return [entry for _, entry in items[:self.top]]
@@ -3,10 +3,15 @@ import datetime
 import time
 
 
-from surfaceimagecontentgap.imagegap import isthereanimage
+from surfaceimagecontentgap import cache, logger
 from surfaceimagecontentgap.bot import SurfaceContentGapBot
 
 
+LOG = logger.logger()
+RC_TIME_FORMAT = '%Y%m%d%H%M%S'
+POLL_INTERVAL = 60
+
+
 def last_rc_time(site):
     """Datetime of last change."""
     rc = site.recentchanges()
@@ -27,31 +32,83 @@ def previousday(dt):
     return dt - delta
 
 
-def rc_from(site, dt):
-    """Recent changes from a given datetime."""
+def rc_pages(site, dt):
+    """Yields the titles of the articles changed since a given datetime,
+    once each, fetched by batches by the bot."""
     kwargs = {
-        'end': dt.strftime('%Y%m%d%H%M%S'),
+        'end': dt.strftime(RC_TIME_FORMAT),
         'namespace': 0
     }
-    rc = site.recentchanges(**kwargs)
-    # revisions
-    changes = []
-    # page titles
-    pages = []
-    for rev in rc:
-        changes.append(rev)
-        title = rev['title'].encode('utf-8')
-        if title not in pages:
-            pages.append(title)
-    return {
-        'list_revisions': changes,
-        'list_pages': pages
-    }
-
-
-def articles_from_titles(site, titles):
-    """Articles object from list of titles"""
-    return [site.Pages[title.decode('utf-8')] for title in titles]
+    titles = set()
+    for rev in site.recentchanges(**kwargs):
+        if rev['title'] not in titles:
+            titles.add(rev['title'])
+            yield rev['title']
+
+
+class RecentChangesFollower(object):
+
+    """Follows the recent changes of a wiki as they are made.
+
+    Recent changes are polled from a cursor, the timestamp of the latest
+    change read and the ids of the changes read at that timestamp. A title is
+    yielded once per poll, and again at the next poll it is changed in, so
+    that its latest revision is analyzed again (see ContentGap follow).
+    """
+
+    def __init__(self, site, start, poll=POLL_INTERVAL, sleep=time.sleep):
+        """Constructor.
+
+        Args:
+            site (mwclient.Site): wiki followed
+            start (datetime.datetime): time of the first changes followed
+            poll (int): seconds between two polls of the recent changes
+            sleep (function): function waiting between two polls
+        """
+        self.site = site
+        self.cursor = start.strftime(RC_TIME_FORMAT)
+        self.poll = poll
+        self.sleep = sleep
+        self.__boundary__ = set()
+
+    def changes(self):
+        """Yields the changes after the cursor, from the oldest."""
+        kwargs = {
+            'start': self.cursor,
+            'dir': 'newer',
+            'namespace': 0
+        }
+        for rev in self.site.recentchanges(**kwargs):
+            timestamp = time.strftime(RC_TIME_FORMAT, rev['timestamp'])
+            if timestamp == self.cursor:
+                # the change at the cursor is listed again
+                if rev['rcid'] in self.__boundary__:
+                    continue
+            else:
+                self.cursor = timestamp
+                self.__boundary__ = set()
+            self.__boundary__.add(rev['rcid'])
+            yield rev
+
+    def follow(self, polls=None):
+        """Yields the titles of the articles changed, as they are changed.
+
+        Args:
+            polls (int, optional): number of polls, None to follow forever
+        """
+        count = 0
+        while True:
+            titles = set()
+            for rev in self.changes():
+                if rev['title'] not in titles:
+                    titles.add(rev['title'])
+                    yield rev['title']
+            count += 1
+            LOG.info("%d articles changed until %s", len(titles),
+                     self.cursor)
+            if polls is not None and count >= polls:
+                return
+            self.sleep(self.poll)
 
 
 def list_articles(bot):
@@ -60,9 +117,14 @@ def list_articles(bot):
 
     # last hours rc
     end_dt = previoushour(last_rc_time(site))
-    recent_changes = rc_from(site, end_dt)
-    pages = recent_changes['list_pages']
-    return articles_from_titles(site, pages)
+    return rc_pages(site, end_dt)
+
+
+def follow_articles(bot):
+    """Articles changed from the last hour on, followed forever."""
+    site = bot.site
+    follower = RecentChangesFollower(site, previoushour(last_rc_time(site)))
+    return follower.follow()
 
 
 def main():
@@ -84,15 +146,66 @@ def main():
                         dest='config',
                         required=True,
                         help='Config file with login and password.')
+    parser.add_argument('--cache',
+                        type=str,
+                        dest='cache',
+                        required=False,
+                        default=None,
+                        help='Cache file of image status and views.')
+    parser.add_argument('--checkpoint',
+                        type=str,
+                        dest='checkpoint',
+                        required=False,
+                        default=None,
+                        help='Checkpoint file of the analyzed articles.')
+    parser.add_argument('--resume',
+                        action='store_true',
+                        dest='resume',
+                        help='Resume the analysis from the checkpoint file.')
+    parser.add_argument('--follow',
+                        action='store_true',
+                        dest='follow',
+                        help='Follow the recent changes as they are made.')
+    parser.add_argument('--top',
+                        type=int,
+                        dest='top',
+                        required=False,
+                        default=None,
+                        help='Number of best articles in the report, of the '
+                             'latest ones with --follow.')
+    parser.add_argument('--metrics',
+                        type=str,
+                        dest='metrics',
+                        required=False,
+                        default=None,
+                        help='File of the metrics, in the Prometheus text '
+                             'format for a .prom file, JSON otherwise.')
+    parser.add_argument('--state',
+                        type=str,
+                        dest='state',
+                        required=False,
+                        default=None,
+                        help='State file of incremental runs, updating the '
+                             'results of the previous run (or report).')
     args = parser.parse_args()
+    if args.resume and args.checkpoint is None:
+        parser.error('--resume requires --checkpoint')
+    cache.configure(args.cache)
     kwargs = {
         'config_file': args.config,
         'lang': args.lang,
         'report': args.report,
-        'list_fun': list_articles,
-        'filter_fun': lambda bot, x: not isthereanimage(x),
+        'list_fun': follow_articles if args.follow else list_articles,
+        'filter_fun': lambda bot, x: not bot.isthereanimage(x),
         'rank_fun': lambda bot, x: 0,
-        'frequency': 60
+        'frequency': 60,
+        'fetch_batch': True,
+        'checkpoint': args.checkpoint,
+        'resume': args.resume,
+        'top': args.top,
+        'metrics': args.metrics,
+        'state': args.state,
+        'follow': args.follow
     }
     rc_bot = SurfaceContentGapBot(**kwargs)
     rc_bot.run()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""Compact records of the articles kept by a content gap analysis.
+
+Page objects hold the site, the wikitext or the image properties of an
+article. Once an article is filtered, only its title, ids and score are
+kept, in a record without instance dictionary, with a reference to the site
+shared by the records, so that they can still be evaluated by their views
+(see imagegap.latest90).
+"""
+
+
+class ArticleRecord(object):
+
+    """Title, page id, revision id and score of an article.
+
+    For compatibility with the former {'article': name, 'evaluation': score}
+    dictionaries, record['article'] is the utf-8 encoded title and
+    record['evaluation'] the score. The site is not part of the value of the
+    record, nor saved with it.
+    """
+
+    __slots__ = ('title', 'pageid', 'revid', 'score', 'site')
+
+    def __init__(self, title, pageid=None, revid=None, score=None,
+                 site=None):
+        """Constructor.
+
+        Args:
+            title (unicode): title of the article
+            pageid (int, optional): page id
+            revid (int, optional): latest revision id
+            score (int, optional): evaluation of the article
+            site (mwclient.Site, optional): site of the article
+        """
+        self.title = title
+        self.pageid = pageid
+        self.revid = revid
+        self.score = score
+        self.site = site
+
+    @property
+    def name(self):
+        """Title of the article, as the name of a page object."""
+        return self.title
+
+    def __getitem__(self, key):
+        if key == 'article':
+            return self.title.encode('utf-8')
+        if key == 'evaluation':
+            return self.score
+        raise KeyError(key)
+
+    def __eq__(self, other):
+        return (isinstance(other, ArticleRecord) and
+                self.astuple() == other.astuple())
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.astuple())
+
+    def __repr__(self):
+        return 'ArticleRecord(%r, %r, %r, %r)' % self.astuple()
+
+    def astuple(self):
+        """(title, pageid, revid, score) of the record."""
+        return self.title, self.pageid, self.revid, self.score
+
+
+def record(article, score=None):
+    """Record of an article given as a page object (mwclient.Page,
+    batch.BatchPage) or as a record, on the same site."""
+    if isinstance(article, ArticleRecord):
+        return ArticleRecord(article.title, article.pageid, article.revid,
+                             score, article.site)
+    # revid of batch.BatchPage, revision of mwclient.Page
+    revid = getattr(article, 'revid', getattr(article, 'revision', None))
+    return ArticleRecord(article.name,
+                         pageid=getattr(article, 'pageid', None),
+                         revid=revid,
+                         score=score,
+                         site=getattr(article, 'site', None))
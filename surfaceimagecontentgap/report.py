@@ -2,38 +2,204 @@
 
 """Reports for image content gap."""
 
+import hashlib
+from itertools import islice
+import logging
 
-def create(articlelist, articles=None, filtered_articles=None):
+from surfaceimagecontentgap import metrics
+
+# Constants
+LOGGER_NAME = 'sicglog'
+TITLE = u"== Report ==\n"
+HEADER = u"""{| class="wikitable"\n|-\n! Article\n! Views\n"""
+ROW = u"|-\n| [[{0}]]\n| {1}\n"
+ROW_START = u"|-\n| [["
+FOOTER = u"|}\n"
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+def table(articlelist, maxrows=None):
+    """Wiki table of the articles and their score.
+
+    Args:
+        articlelist (iterable): records.ArticleRecord of the articles
+        maxrows (int, optional): maximum number of rows, None for no limit
+    Returns:
+        unicode: wiki code of the table
+    """
+    rows = [ROW.format(article.title, article.score)
+            for article in islice(articlelist, maxrows)]
+    return u''.join([HEADER] + rows + [FOOTER])
+
+
+def data(articles=None, filtered_articles=None):
+    """Data section with the numbers of articles, empty without numbers.
+
+    The number of filtered articles is unknown when it is None (see
+    ContentGap.stopped)."""
+    if not articles or filtered_articles == 0:
+        return u""
+    filtered = u"unknown"
+    if filtered_articles is not None:
+        filtered = u"%d" % filtered_articles
+    return u"".join([u"== Data ==\n",
+                     u"* total articles: %d\n" % articles,
+                     u"* filtered articles: %s\n" % filtered])
+
+
+def create(articlelist, articles=None, filtered_articles=None, maxrows=None):
     """Create a report from article list with views
 
     Args:
-        articlelist (list): list of dictionnaries with article and evaluation
-            for each article [{'article': 'Foo', 'evaluation': 42}, ...]
+        articlelist (list): list of records.ArticleRecord with the title and
+            the score of each article
         articles (optional: int): number of articles to process
         filtered_articles (optional: int): number of articles filtered
+        maxrows (optional: int): maximum number of articles in the report
     Returns:
-        str: wiki code for the report
+        unicode: wiki code for the report
     """
-    reportcode = "== Report ==\n"
-    reportcode += """{| class="wikitable"\n|-\n! Article\n! Views\n"""
-    for article in articlelist:
-        reportcode += "|-\n| [[{0}]]\n| {1}\n".format(article['article'],
-                                                      article['evaluation'])
-    reportcode += "|}\n"
-    if articles and filtered_articles:
-        reportcode += "== Data ==\n"
-        reportcode += "* total articles: %d\n" % articles
-        reportcode += "* filtered articles: %d\n" % filtered_articles
-    return reportcode
+    return u"".join([TITLE,
+                     table(articlelist, maxrows),
+                     data(articles, filtered_articles)])
+
+
+def paginate(articlelist, pagesize):
+    """Split the article list in pages of pagesize articles, at least one."""
+    articlelist = list(articlelist)
+    return ([articlelist[start:start + pagesize]
+             for start in range(0, len(articlelist), pagesize)] or [[]])
+
+
+def subpage(pagename, number):
+    """Name of the page number of a report, the first one is pagename."""
+    if number == 0:
+        return pagename
+    return '{0}/{1}'.format(pagename, number + 1)
 
 
+@metrics.stage('reportsave')
 def save(site, pagename, report):
     """Save report on the wiki site as pagename.
 
     Args:
         site (mwclient.Site): wiki to save to
-        pagename (str): name of the page to save the report to
+        pagename (str): name of the page to save the report to, utf-8
+            encoded or unicode
         report (str): surface image content gap report
     """
-    page = site.Pages[pagename.decode('utf-8')]
+    if isinstance(pagename, bytes):
+        pagename = pagename.decode('utf-8')
+    page = site.Pages[pagename]
     page.save(report, summary='Content gap report')
+
+
+class ReportWriter(object):
+
+    """Saves reports only when their ranking changed.
+
+    The digest of the ranking table of each saved page is kept, and a page is
+    only saved again when its table changes: a change of the numbers of
+    articles alone does not make a new edit, but is saved by flush() at the
+    end of the analysis. Subpages of a former, longer, report are emptied.
+    """
+
+    def __init__(self, site, pagename, maxrows=None, pagesize=None):
+        """Constructor.
+
+        Args:
+            site (mwclient.Site): wiki to save to
+            pagename (str): name of the page to save the report to
+            maxrows (int, optional): maximum number of articles reported
+            pagesize (int, optional): number of articles per page, the
+                following pages are saved as subpages pagename/2, etc.
+        """
+        self.site = site
+        self.pagename = pagename
+        self.maxrows = maxrows
+        self.pagesize = pagesize
+        self.digests = {}
+        self.contents = {}
+        self.pending = {}
+        self.pages = None
+
+    def write(self, articlelist, articles=None, filtered_articles=None):
+        """Save the report pages whose ranking changed.
+
+        Returns:
+            int: number of pages saved
+        """
+        articlelist = list(islice(articlelist, self.maxrows))
+        pages = [articlelist]
+        if self.pagesize:
+            pages = paginate(articlelist, self.pagesize)
+        saved = 0
+        for number, rows in enumerate(pages):
+            pagename = subpage(self.pagename, number)
+            ranking = table(rows)
+            content = u"".join([TITLE, ranking,
+                                data(articles, filtered_articles)])
+            if self.digests.get(pagename) == digest(ranking):
+                if self.contents.get(pagename) == digest(content):
+                    self.pending.pop(pagename, None)
+                else:
+                    # numbers of articles saved by flush
+                    self.pending[pagename] = content
+                LOG.info("Report %s unchanged", pagename)
+                continue
+            self.save(pagename, ranking, content)
+            saved += 1
+        saved += self.clear(len(pages))
+        return saved
+
+    def save(self, pagename, ranking, content):
+        """Save a report page and the digests of its table and content."""
+        save(self.site, pagename, content)
+        self.digests[pagename] = digest(ranking)
+        self.contents[pagename] = digest(content)
+        self.pending.pop(pagename, None)
+
+    def clear(self, count):
+        """Empty the subpages after the count pages of the report: the ones
+        saved before, or the ones found on the wiki at the first write.
+
+        Returns:
+            int: number of pages emptied
+        """
+        number = count
+        cleared = 0
+        while True:
+            pagename = subpage(self.pagename, number)
+            if self.pages is None:
+                page = self.site.Pages[pagename]
+                if not (page.exists and ROW_START in page.text()):
+                    break
+            elif number >= self.pages:
+                break
+            self.save(pagename, table([]), create([]))
+            number += 1
+            cleared += 1
+        self.pages = count
+        return cleared
+
+    def flush(self):
+        """Save the pages whose numbers of articles changed since they were
+        saved.
+
+        Returns:
+            int: number of pages saved
+        """
+        pending = sorted(self.pending.items())
+        for pagename, content in pending:
+            LOG.info("Saving the numbers of articles of %s", pagename)
+            save(self.site, pagename, content)
+            self.contents[pagename] = digest(content)
+        self.pending = {}
+        return len(pending)
+
+
+def digest(text):
+    """Digest of a wiki text."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
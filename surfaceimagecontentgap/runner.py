@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+"""Runs content gap jobs on several wikis concurrently.
+
+A job is a bot (bot.SurfaceContentGapBot) listing the articles of a source on
+a wiki and saving its report, e.g.
+    {"lang": "fr", "source": "category:Coureur de fond français",
+     "report": "Utilisateur:Bot/Coureurs"}
+Sources are 'random', 'recentchanges', 'category:<name>' and
+'template:<name>', jobs may also give the list_fun, filter_fun and rank_fun
+of the bot. Jobs run in a pool of threads shared by every wiki, with at most
+perwiki jobs at the same time on a wiki, and share the HTTP transport of the
+process (transport.default()).
+"""
+
+from argparse import ArgumentParser
+import collections
+import json
+import logging
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+
+from surfaceimagecontentgap import (
+    batch,
+    cache,
+    imagegap,
+    lucky,
+    mwtemplate,
+    rc)
+from surfaceimagecontentgap.bot import SurfaceContentGapBot
+
+# Constants
+LOGGER_NAME = 'sicglog'
+WORKERS = 4
+PER_WIKI = 1
+
+# Bot arguments of the jobs unless given
+DEFAULTS = {
+    'filter_fun': lambda bot, article: not bot.isthereanimage(article),
+    'rank_fun': lucky.pageviews90,
+    'rank_vectorized': True,
+    'fetch_batch': True
+}
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+def categorysource(name, depth=0):
+    """List function of the articles of a category and its subcategories."""
+    def list_fun(bot):
+        category = bot.site.Categories[name]
+        return imagegap.searcharticles(category, depth,
+                                       lister=batch.CategoryLister(bot.site))
+    return list_fun
+
+
+def templatesource(name):
+    """List function of the articles including a template."""
+    def list_fun(bot):
+        return mwtemplate.ArticleWithTemplate(bot.site, name).listarticles()
+    return list_fun
+
+
+def source(name):
+    """List function of a source name.
+
+    Raises:
+        ValueError: when the source is unknown
+    """
+    if name == 'random':
+        return lucky.sample_articles()
+    if name == 'recentchanges':
+        return rc.list_articles
+    kind, _, title = name.partition(':')
+    if kind == 'category':
+        return categorysource(title)
+    if kind == 'template':
+        return templatesource(title)
+    raise ValueError('Unknown source %s' % name)
+
+
+def interleave(jobs):
+    """Jobs ordered by turns of the wikis, so that jobs of a wiki waiting
+    for their turn do not hold every thread of the pool."""
+    bywiki = collections.OrderedDict()
+    for job in jobs:
+        bywiki.setdefault(job['lang'], []).append(job)
+    queues = [collections.deque(wikijobs) for wikijobs in bywiki.values()]
+    ordered = []
+    while queues:
+        for queue in queues:
+            ordered.append(queue.popleft())
+        queues = [queue for queue in queues if queue]
+    return ordered
+
+
+class JobResult(object):
+
+    """Outcome of a job."""
+
+    def __init__(self, lang, report, articles=0, filtered=0, seconds=0.0,
+                 error=None):
+        """Constructor.
+
+        Args:
+            lang (str): language code of the wiki
+            report (str): page name of the report
+            articles (int): number of articles analyzed
+            filtered (int): number of articles kept by the filters
+            seconds (float): duration of the job
+            error (Exception, optional): error which stopped the job
+        """
+        self.lang = lang
+        self.report = report
+        self.articles = articles
+        self.filtered = filtered
+        self.seconds = seconds
+        self.error = error
+
+
+class Runner(object):
+
+    """Runs jobs concurrently, with a limit of concurrent jobs by wiki."""
+
+    def __init__(self, jobs, workers=WORKERS, perwiki=PER_WIKI,
+                 defaults=None, botclass=SurfaceContentGapBot):
+        """Constructor.
+
+        Args:
+            jobs (list): jobs, dictionaries with the lang, the source (or
+                the list_fun) and the report of the job, and any other
+                argument of the bot.
+            workers (int): number of jobs running at the same time
+            perwiki (int): number of jobs running at the same time on a wiki
+            defaults (dict, optional): bot arguments of every job, such as
+                config_file
+            botclass (class): class of the bots
+        """
+        self.jobs = jobs
+        self.workers = workers
+        self.perwiki = perwiki
+        self.defaults = defaults or {}
+        self.botclass = botclass
+        self.results = []
+        self.__semaphores__ = {}
+        self.__lock__ = threading.Lock()
+
+    def semaphore(self, lang):
+        """Semaphore limiting the jobs running on the wiki of lang."""
+        with self.__lock__:
+            if lang not in self.__semaphores__:
+                self.__semaphores__[lang] = threading.Semaphore(self.perwiki)
+            return self.__semaphores__[lang]
+
+    def botkwargs(self, job):
+        """Arguments of the bot of a job."""
+        kwargs = dict(DEFAULTS)
+        kwargs.update(self.defaults)
+        kwargs.update(job)
+        if 'source' in kwargs:
+            name = kwargs.pop('source')
+            kwargs['list_fun'] = source(name)
+            # members of a category or a template are listed again
+            kwargs.setdefault('membership', name.partition(':')[0] in
+                              ('category', 'template'))
+        return kwargs
+
+    def runjob(self, job):
+        """Run a job, when its wiki allows it.
+
+        Returns:
+            JobResult: outcome of the job, errors are logged and kept in it
+        """
+        result = JobResult(job['lang'], job.get('report'))
+        with self.semaphore(job['lang']):
+            LOG.info("Starting job %s on %s", result.report, result.lang)
+            start = time.time()
+            try:
+                gap = self.botclass(**self.botkwargs(job)).run()
+                info = gap.metadata()
+                result.articles = gap.processed + gap.resumed
+                result.filtered = info['filtered']
+            except Exception as error:
+                LOG.exception("Job %s on %s failed", result.report,
+                              result.lang)
+                result.error = error
+            result.seconds = time.time() - start
+        return result
+
+    def run(self):
+        """Run every job.
+
+        Returns:
+            list: JobResult of the jobs, in the order they were started
+        """
+        pool = ThreadPool(self.workers)
+        try:
+            self.results = pool.map(self.runjob, interleave(self.jobs))
+        finally:
+            pool.terminate()
+        return self.results
+
+    def summary(self):
+        """Throughput of each wiki.
+
+        Returns:
+            list: dictionaries with the lang, number of jobs, errors,
+                articles, filtered articles, seconds of the jobs and articles
+                per second, by lang.
+        """
+        bywiki = collections.OrderedDict()
+        for result in self.results:
+            wiki = bywiki.setdefault(result.lang, {
+                'lang': result.lang, 'jobs': 0, 'errors': 0, 'articles': 0,
+                'filtered': 0, 'seconds': 0.0})
+            wiki['jobs'] += 1
+            wiki['errors'] += int(result.error is not None)
+            wiki['articles'] += result.articles
+            wiki['filtered'] += result.filtered
+            wiki['seconds'] += result.seconds
+        for wiki in bywiki.values():
+            wiki['rate'] = wiki['articles'] / wiki['seconds'] \
+                if wiki['seconds'] else 0.0
+        return list(bywiki.values())
+
+    def logsummary(self):
+        """Log the throughput of each wiki."""
+        for wiki in self.summary():
+            LOG.info("%(lang)s: %(jobs)d jobs (%(errors)d failed), "
+                     "%(articles)d articles, %(filtered)d filtered in "
+                     "%(seconds).1f s, %(rate).1f articles/s", wiki)
+
+
+def main():
+    description = 'Analyzing several Wikipedias to surface image content gap.'
+    parser = ArgumentParser(description=description)
+    parser.add_argument('-j', '--jobs',
+                        type=str,
+                        dest='jobs',
+                        required=True,
+                        help='JSON file of the jobs, a list of objects with '
+                             'lang, source and report.')
+    parser.add_argument('-f', '--configfile',
+                        type=str,
+                        dest='config',
+                        required=True,
+                        help='Config file with login and password.')
+    parser.add_argument('--workers',
+                        type=int,
+                        dest='workers',
+                        required=False,
+                        default=WORKERS,
+                        help='Number of jobs running at the same time.')
+    parser.add_argument('--per-wiki',
+                        type=int,
+                        dest='perwiki',
+                        required=False,
+                        default=PER_WIKI,
+                        help='Number of jobs running at the same time on a '
+                             'wiki.')
+    parser.add_argument('--cache',
+                        type=str,
+                        dest='cache',
+                        required=False,
+                        default=None,
+                        help='Cache file of image status and views.')
+    args = parser.parse_args()
+    cache.configure(args.cache)
+    with open(args.jobs) as jobsfile:
+        jobs = json.load(jobsfile)
+    runner = Runner(jobs, workers=args.workers, perwiki=args.perwiki,
+                    defaults={'config_file': args.config})
+    runner.run()
+    runner.logsummary()
+
+
+if __name__ == '__main__':
+    main()
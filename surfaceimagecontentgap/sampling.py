@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Random samples of articles.
+
+Samples are drawn either from the random list of the API, by batches of the
+maximum size allowed, or locally by reservoir sampling over a stream of
+titles such as a dump of all the titles of a wiki
+(https://dumps.wikimedia.org/frwiki/latest/frwiki-latest-all-titles-in-ns0.gz).
+A local sample is uniform and reproducible with a seed.
+"""
+
+import logging
+import random
+
+from surfaceimagecontentgap import dumps
+
+# Constants
+LOGGER_NAME = 'sicglog'
+SAMPLE_SIZE = 1000
+
+# First line of the all titles dump files
+DUMP_HEADER = u'page_title'
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+def randomtitles(site, size=SAMPLE_SIZE, namespace=0):
+    """Yields distinct titles of random pages, requested by batches.
+
+    Stops before size titles when a whole batch only has titles already
+    yielded, which happens on wikis with fewer pages.
+
+    Args:
+        site (mwclient.Site): wiki sampled
+        size (int): number of titles
+        namespace (int): namespace of the pages
+    """
+    params = {'list': 'random', 'rnnamespace': namespace, 'rnlimit': 'max'}
+    kwargs = dict(params)
+    titles = set()
+    while len(titles) < size:
+        result = site.api('query', **kwargs)
+        new = 0
+        for page in result['query']['random']:
+            if page['title'] in titles or len(titles) >= size:
+                continue
+            titles.add(page['title'])
+            new += 1
+            yield page['title']
+        if new == 0:
+            LOG.warning("Only %d distinct random pages", len(titles))
+            return
+        kwargs = dict(params)
+        kwargs.update(result.get('continue', {}))
+
+
+def reservoir(items, size=SAMPLE_SIZE, rng=random):
+    """Uniform sample of size items of a stream, read once.
+
+    Args:
+        items (iterable): stream of items, of unknown length
+        size (int): number of items of the sample
+        rng (random.Random): random generator, seeded for a reproducible
+            sample.
+    Returns:
+        list: sample, all the items when there are fewer than size
+    """
+    sample = []
+    for count, item in enumerate(items):
+        if count < size:
+            sample.append(item)
+        else:
+            position = rng.randint(0, count)
+            if position < size:
+                sample[position] = item
+    return sample
+
+
+def dumptitles(path):
+    """Yields the titles of an all titles dump file, one title per line with
+    underscores, plain or compressed."""
+    with dumps.opendump(path) as dump:
+        for line in dump:
+            title = line.rstrip(b'\n').decode('utf-8')
+            if title and title != DUMP_HEADER:
+                yield title.replace(u'_', u' ')
+
+
+def sampletitles(path, size=SAMPLE_SIZE, seed=None):
+    """Uniform sample of the titles of an all titles dump file.
+
+    Args:
+        path (str): path of the dump file
+        size (int): number of titles
+        seed (int, optional): seed of the sample, the same seed gives the
+            same sample of the same file.
+    """
+    sample = reservoir(dumptitles(path), size, random.Random(seed))
+    LOG.info("%d titles sampled from %s", len(sample), path)
+    return sample
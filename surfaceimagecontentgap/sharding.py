@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""Sharding of content gap analyses.
+
+The articles of an analysis are split in shards by a hash of their title,
+which is the same in every process and on every machine. Each shard is
+filtered and ranked on its own (see contentgap.ContentGap shard argument),
+by a process of a pool or by a separate run, into a partial ranking. The
+partial rankings keep the position of their articles in the whole list, so
+that their merge is the ranking of the serial analysis.
+"""
+
+import json
+import zlib
+
+from surfaceimagecontentgap import ranking, records
+
+
+def partition(title, count):
+    """Shard of a title among count shards."""
+    if not isinstance(title, bytes):
+        title = title.encode('utf-8')
+    return (zlib.crc32(title) & 0xffffffff) % count
+
+
+def parseshard(text):
+    """Shard given as 'index/count', index from 0.
+
+    Returns:
+        tuple: (index, count)
+    Raises:
+        ValueError: when text is not a shard
+    """
+    index, _, count = text.partition('/')
+    index, count = int(index), int(count)
+    if not 0 <= index < count:
+        raise ValueError('Shard %s is not in 0/%d..%d/%d' %
+                         (text, count, count - 1, count))
+    return index, count
+
+
+class Partial(object):
+
+    """Ranking of a part of the articles of an analysis."""
+
+    def __init__(self, entries=None, processed=0, filtered=0):
+        """Constructor.
+
+        Args:
+            entries (list): (position, records.ArticleRecord) of the ranked
+                articles, from the best score.
+            processed (int): number of articles analyzed
+            filtered (int): number of articles kept by the filters
+        """
+        self.entries = entries or []
+        self.processed = processed
+        self.filtered = filtered
+
+    def ranked(self):
+        """Records of the ranked articles, from the best score."""
+        return [entry for _, entry in self.entries]
+
+    def asdict(self):
+        """Partial ranking as a JSON serializable dictionary."""
+        return {'processed': self.processed,
+                'filtered': self.filtered,
+                'ranking': [[position] + list(entry.astuple())
+                            for position, entry in self.entries]}
+
+    @staticmethod
+    def fromdict(partial):
+        """Partial ranking of a dictionary given by asdict."""
+        entries = [(row[0], records.ArticleRecord(*row[1:]))
+                   for row in partial['ranking']]
+        return Partial(entries, partial['processed'], partial['filtered'])
+
+    def dump(self, path):
+        """Save the partial ranking to a JSON file."""
+        with open(path, 'w') as partialfile:
+            json.dump(self.asdict(), partialfile)
+
+    @staticmethod
+    def load(path):
+        """Partial ranking saved to a JSON file."""
+        with open(path) as partialfile:
+            return Partial.fromdict(json.load(partialfile))
+
+
+def merge(partials, top=None):
+    """Merge partial rankings into the ranking of their articles.
+
+    Args:
+        partials (iterable): Partial rankings of distinct articles
+        top (int, optional): number of best articles kept
+
+    Returns:
+        Partial: merged ranking
+    """
+    merged = ranking.TopRanking(top)
+    processed = filtered = 0
+    for partial in partials:
+        processed += partial.processed
+        filtered += partial.filtered
+        for position, entry in partial.entries:
+            merged.push(entry, position)
+    return Partial(merged.positioned(), processed, filtered)
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+"""HTTP transport shared by the wiki and the pageview requests.
+
+The transport is a requests session, given to mwclient.Site as its pool and
+to the pageview fetchers as their session, so that every request of the
+process goes through:
+    - keep-alive connections pooled by host,
+    - a token bucket by host limiting the rate of the requests,
+    - retries with backoff of the throttled and failed GET requests to the
+      hosts of RETRY_HOSTS (the pageview API), waiting as long as the
+      Retry-After header says when there is one; the wiki requests are
+      retried by mwclient itself, as its retry_on_error says,
+    - the maxlag parameter added to MediaWiki API requests,
+    - counters of the requests, retries and bytes received.
+
+Each site has its own client of the transport (see Transport.client), which
+sends its requests with its own User-Agent.
+"""
+
+import logging
+import threading
+import time
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from surfaceimagecontentgap import __version__, metrics
+
+# Constants
+LOGGER_NAME = 'sicglog'
+USER_AGENT = 'SurfaceImageContentGap v{0}'.format(__version__)
+
+# Connections kept alive by host
+POOL_SIZE = 16
+
+# Requests per second by host, and by host suffix overriding it
+RATE = 10
+RATES = {'wikimedia.org': 100}
+
+RETRIES = 5
+BACKOFF = 1
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Hosts, and host suffixes, whose requests are retried by the transport
+RETRY_HOSTS = ('wikimedia.org',)
+
+# Methods of the requests retried, the ones without side effects
+RETRY_METHODS = ('GET', 'HEAD')
+
+# Seconds of replication lag above which MediaWiki refuses requests
+MAXLAG = 5
+API_SCRIPT = 'api.php'
+
+# Transport of the process, created on first use
+TRANSPORT = None
+
+# logger
+LOG = logging.getLogger(LOGGER_NAME)
+
+
+class TokenBucket(object):
+
+    """Rate limit of requests, with bursts up to the size of the bucket.
+
+    Tokens are added at rate per second up to burst tokens, and each request
+    takes one. Requests made when the bucket is empty wait for their token,
+    in the order they were made.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.time, sleep=time.sleep):
+        """Constructor.
+
+        Args:
+            rate (float): tokens added per second
+            burst (int, optional): size of the bucket, default is rate
+            clock (function): current time in seconds
+            sleep (function): function waiting for a token
+        """
+        self.rate = float(rate)
+        self.burst = burst or rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.updated = clock()
+        self.__lock__ = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting for it when the bucket is empty.
+
+        Returns:
+            float: seconds waited
+        """
+        with self.__lock__:
+            now = self.clock()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # a negative number of tokens are the tokens promised to the
+            # requests waiting
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate)
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+
+def retryafter(response):
+    """Seconds to wait given by the Retry-After header, None without it or
+    when it is a date."""
+    value = response.headers.get('retry-after')
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class Transport(requests.Session):
+
+    """Session pooling connections, limiting the rate of the requests and
+    retrying the ones of the retried hosts.
+
+    The transport may be shared by threads.
+    """
+
+    def __init__(self, agent=USER_AGENT, poolsize=POOL_SIZE, rate=RATE,
+                 rates=None, retries=RETRIES, backoff=BACKOFF, maxlag=MAXLAG,
+                 retryhosts=RETRY_HOSTS, sleep=time.sleep):
+        """Constructor.
+
+        Args:
+            agent (str): User-Agent of the requests
+            poolsize (int): connections kept alive by host
+            rate (float): requests per second by host
+            rates (dict, optional): requests per second by host suffix,
+                default is RATES
+            retries (int): retries of a request before giving up
+            backoff (float): seconds to wait before the first retry, without
+                Retry-After header, doubled at each retry
+            maxlag (int): maxlag parameter of MediaWiki API requests, None
+                to leave the requests as they are
+            retryhosts (tuple): hosts, and host suffixes, whose GET requests
+                are retried, the other requests are sent once
+            sleep (function): function waiting before a retry and for tokens
+
+        Attributes:
+            counters (dict): number of 'requests', 'retries' and 'bytes'
+                received, and seconds 'throttled' waiting for tokens.
+        """
+        super(Transport, self).__init__()
+        adapter = HTTPAdapter(pool_connections=poolsize,
+                              pool_maxsize=poolsize)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        self.headers['User-Agent'] = agent
+        self.rate = rate
+        self.rates = RATES if rates is None else rates
+        self.retries = retries
+        self.backoff = backoff
+        self.maxlag = maxlag
+        self.retryhosts = retryhosts
+        self.sleep = sleep
+        self.counters = {'requests': 0, 'retries': 0, 'bytes': 0,
+                         'throttled': 0.0}
+        self.__buckets__ = {}
+        self.__lock__ = threading.Lock()
+
+    def bucket(self, host):
+        """Token bucket of host, created on first use."""
+        with self.__lock__:
+            if host not in self.__buckets__:
+                rate = self.rate
+                for suffix, hostrate in self.rates.items():
+                    if host == suffix or host.endswith('.' + suffix):
+                        rate = hostrate
+                self.__buckets__[host] = TokenBucket(rate, sleep=self.sleep)
+            return self.__buckets__[host]
+
+    def retried(self, method, host):
+        """Whether requests of method to host are retried."""
+        return (method.upper() in RETRY_METHODS and
+                any(host == suffix or host.endswith('.' + suffix)
+                    for suffix in self.retryhosts))
+
+    def client(self, agent=None):
+        """Client of the transport for a site (mwclient.Site pool), sending
+        its requests with its own User-Agent."""
+        return Client(self, agent)
+
+    def count(self, counter, value=1):
+        """Add value to a counter."""
+        with self.__lock__:
+            self.counters[counter] += value
+        metrics.default().count('http_' + counter, value)
+
+    def stats(self):
+        """Copy of the counters."""
+        with self.__lock__:
+            return dict(self.counters)
+
+    def delay(self, response, attempt):
+        """Seconds to wait before retrying, None when response is final.
+
+        Args:
+            response (requests.Response): response, None after a connection
+                error
+            attempt (int): number of the attempt, from 0
+        """
+        backoff = self.backoff * 2 ** attempt
+        if response is None:
+            return backoff
+        if response.headers.get('x-database-lag'):
+            LOG.warning("Database lag of %s seconds",
+                        response.headers['x-database-lag'])
+        elif response.status_code not in RETRY_STATUSES:
+            return None
+        wait = retryafter(response)
+        return backoff if wait is None else wait
+
+    def withmaxlag(self, method, url, kwargs):
+        """Request arguments with the maxlag parameter of MediaWiki API."""
+        if self.maxlag is None or not urlparse(url).path.endswith(API_SCRIPT):
+            return kwargs
+        field = 'data' if method.upper() == 'POST' else 'params'
+        params = kwargs.get(field)
+        if params is None or not isinstance(params, dict):
+            return kwargs
+        if 'maxlag' not in params:
+            params = params.copy()
+            params['maxlag'] = self.maxlag
+            kwargs = dict(kwargs)
+            kwargs[field] = params
+        return kwargs
+
+    def request(self, method, url, **kwargs):
+        """Send a request, retrying it while it is throttled, lagged or
+        failing, up to retries times, when its host and method are
+        retried."""
+        host = urlparse(url).netloc
+        kwargs = self.withmaxlag(method, url, kwargs)
+        retries = self.retries if self.retried(method, host) else 0
+        attempt = 0
+        while True:
+            self.count('throttled', self.bucket(host).acquire())
+            self.count('requests')
+            try:
+                with metrics.timer('http'):
+                    response = super(Transport, self).request(method, url,
+                                                              **kwargs)
+            except requests.exceptions.ConnectionError:
+                if attempt >= retries:
+                    raise
+                wait = self.delay(None, attempt)
+            else:
+                if not kwargs.get('stream'):
+                    self.count('bytes', len(response.content))
+                if attempt >= retries:
+                    return response
+                wait = self.delay(response, attempt)
+                if wait is None:
+                    return response
+            attempt += 1
+            self.count('retries')
+            LOG.warning("Retrying %s %s in %s seconds (attempt %d)",
+                        method, host, wait, attempt + 1)
+            self.sleep(wait)
+
+
+class Client(object):
+
+    """Requests of a site through the shared transport, with the User-Agent
+    of the site.
+
+    It offers the part of requests.Session used by mwclient.Site.
+    """
+
+    def __init__(self, transport, agent=None):
+        """Constructor.
+
+        Args:
+            transport (Transport): transport sending the requests
+            agent (str, optional): User-Agent of the requests, default is
+                the one of the transport
+        """
+        self.transport = transport
+        self.headers = {}
+        if agent is not None:
+            self.headers['User-Agent'] = agent
+
+    @property
+    def cookies(self):
+        """Cookies of the transport."""
+        return self.transport.cookies
+
+    def request(self, method, url, **kwargs):
+        """Send a request with the headers of the client."""
+        headers = dict(self.headers)
+        headers.update(kwargs.pop('headers', None) or {})
+        return self.transport.request(method, url, headers=headers, **kwargs)
+
+    def get(self, url, **kwargs):
+        """Send a GET request."""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a POST request."""
+        return self.request('POST', url, **kwargs)
+
+
+def configure(**kwargs):
+    """Configure the transport of the process with the arguments of
+    Transport."""
+    global TRANSPORT
+    TRANSPORT = Transport(**kwargs)
+    return TRANSPORT
+
+
+def default():
+    """Transport of the process, created on first use."""
+    if TRANSPORT is None:
+        configure()
+    return TRANSPORT
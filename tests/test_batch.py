@@ -0,0 +1,122 @@
+"""Unit test of batch module."""
+
+import unittest
+
+from surfaceimagecontentgap import batch
+
+
+class MockSite(object):
+
+    """Mock of mwclient.Site answering revisions queries."""
+    def __init__(self, contents, rights=None):
+        self.contents = contents
+        self.rights = rights or []
+        self.queries = []
+
+    def api(self, action, **kwargs):
+        titles = kwargs['titles'].split('|')
+        self.queries.append(titles)
+        pages = {}
+        for pageid, title in enumerate(titles):
+            if title in self.contents:
+                revision = {'revid': pageid + 100,
+                            'slots': {'main': {'*': self.contents[title]}}}
+                pages[str(pageid)] = {'pageid': pageid, 'title': title,
+                                      'revisions': [revision]}
+            else:
+                pages[str(-pageid)] = {'title': title, 'missing': ''}
+        return {'query': {'pages': pages}}
+
+
+class MockPropsSite(object):
+
+    """Mock of mwclient.Site answering a continued images query."""
+    rights = []
+
+    def api(self, action, **kwargs):
+        paris = {'pageid': 1, 'title': u'Paris', 'lastrevid': 11,
+                 'pageimage': u'A.jpg'}
+        if 'imcontinue' not in kwargs:
+            paris['images'] = [{'title': u'File:A.jpg'}]
+            lyon = {'pageid': 2, 'title': u'Lyon', 'lastrevid': 12}
+            return {'continue': {'imcontinue': '1|B.svg', 'continue': '||'},
+                    'query': {'pages': {'1': paris, '2': lyon}}}
+        paris['images'] = [{'title': u'File:B.svg'}]
+        return {'query': {'pages': {'1': paris}}}
+
+
+class MockGeneratorSite(object):
+
+    """Mock of mwclient.Site answering a continued categorymembers
+    generator query."""
+    def __init__(self):
+        self.queries = []
+
+    def api(self, action, **kwargs):
+        self.queries.append(kwargs)
+        paris = {'pageid': 1, 'ns': 0, 'title': u'Paris', 'lastrevid': 11,
+                 'length': 1000}
+        sub = {'pageid': 2, 'ns': 14, 'title': u'Category:Sub'}
+        lyon = {'pageid': 3, 'ns': 0, 'title': u'Lyon', 'lastrevid': 12}
+        if 'gcmcontinue' not in kwargs and 'imcontinue' not in kwargs:
+            paris['images'] = [{'title': u'File:A.jpg'}]
+            return {'continue': {'imcontinue': '1|B.svg', 'gcmcontinue': 'L',
+                                 'continue': 'gcmcontinue||'},
+                    'query': {'pages': {'1': paris, '2': sub}}}
+        if 'imcontinue' in kwargs:
+            paris['images'] = [{'title': u'File:B.svg'}]
+            return {'continue': {'gcmcontinue': 'L', 'continue': '-||'},
+                    'query': {'pages': {'1': paris, '2': sub}}}
+        return {'query': {'pages': {'3': lyon}}}
+
+
+class Test(unittest.TestCase):
+
+    def test_batchsize(self):
+        self.assertEqual(batch.batchsize(MockSite({})), 50)
+        site = MockSite({}, rights=['apihighlimits'])
+        self.assertEqual(batch.batchsize(site), 500)
+
+    def test_fetch_by_batches(self):
+        titles = [u'Page %d' % i for i in range(120)]
+        site = MockSite(dict((t, t + u' text') for t in titles))
+        fetcher = batch.ContentFetcher(site)
+        pages = list(fetcher.fetch(titles))
+        self.assertEqual([len(q) for q in site.queries], [50, 50, 20])
+        self.assertEqual([p.name for p in pages], titles)
+        self.assertEqual(pages[7].text(), u'Page 7 text')
+
+    def test_fetch_missing_page(self):
+        fetcher = batch.ContentFetcher(MockSite({u'Paris': u'[[File:x]]'}))
+        pages = list(fetcher.fetch([u'Paris', u'Nowhere']))
+        self.assertEqual(pages[0].text(), u'[[File:x]]')
+        self.assertEqual(pages[1].text(), u'')
+        self.assertEqual(pages[1].pageid, None)
+
+    def test_imageprops(self):
+        fetcher = batch.ImagePropsFetcher(MockPropsSite())
+        pages = list(fetcher.fetch([u'Paris', u'Lyon']))
+        self.assertEqual(pages[0].images, [u'File:A.jpg', u'File:B.svg'])
+        self.assertEqual(pages[0].pageimage, u'A.jpg')
+        self.assertEqual(pages[1].name, u'Lyon')
+        self.assertEqual(pages[1].images, [])
+        self.assertEqual(pages[1].revid, 12)
+
+    def test_categorylister(self):
+        site = MockGeneratorSite()
+        pages = list(batch.CategoryLister(site)(u'Category:Cities'))
+        self.assertEqual([(p.name, p.namespace) for p in pages],
+                         [(u'Category:Sub', 14), (u'Paris', 0), (u'Lyon', 0)])
+        self.assertEqual(pages[1].images, [u'File:A.jpg', u'File:B.svg'])
+        self.assertEqual((pages[1].revid, pages[1].length), (11, 1000))
+        self.assertFalse('imcontinue' in site.queries[2])
+
+    def test_mergepage(self):
+        pages = {}
+        batch.mergepage(pages, {'title': u'Paris', 'images': [1]})
+        batch.mergepage(pages, {'title': u'Paris', 'images': [2]})
+        self.assertEqual(pages[u'Paris']['images'], [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Unit test of cache module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from surfaceimagecontentgap import batch, cache
+
+
+class MockSite(object):
+
+    """Mock of mwclient.Site answering info and revisions queries."""
+    site = {'lang': 'fr'}
+    rights = []
+
+    def __init__(self):
+        self.queries = []
+
+    def api(self, action, **kwargs):
+        titles = kwargs['titles'].split('|')
+        self.queries.append((kwargs['prop'], titles))
+        pages = {}
+        for pageid, title in enumerate(titles):
+            page = {'pageid': pageid, 'title': title, 'lastrevid': 10}
+            if kwargs['prop'] == 'revisions':
+                page['revisions'] = [{'revid': 10, '*': u'text'}]
+            pages[str(pageid)] = page
+        return {'query': {'pages': pages}}
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite')
+
+    def tearDown(self):
+        cache.configure(None)
+        shutil.rmtree(self.directory)
+
+    def test_get_set(self):
+        store = cache.Cache(self.path)
+        self.assertEqual(store.get(('views', 'fr', u'Paris', '20160101')),
+                         None)
+        store.set(('views', 'fr', u'Paris', '20160101'), 42)
+        store.close()
+        store = cache.Cache(self.path)
+        self.assertEqual(store.get(('views', 'fr', u'Paris', '20160101')), 42)
+        self.assertEqual((store.hits, store.misses), (1, 0))
+
+    def test_ttl(self):
+        store = cache.Cache(self.path)
+        store.set(('image', 'fr', u'Paris', 1), True, ttl=-1)
+        self.assertEqual(store.get(('image', 'fr', u'Paris', 1)), None)
+
+    def test_evict(self):
+        store = cache.Cache(self.path, maxsize=2)
+        for revid in range(3):
+            store.set(('image', 'fr', u'Paris', revid), True)
+        store.get(('image', 'fr', u'Paris', 0))
+        store.evict()
+        self.assertEqual(store.get(('image', 'fr', u'Paris', 0)), True)
+        self.assertEqual(store.get(('image', 'fr', u'Paris', 1)), None)
+        self.assertEqual(store.get(('image', 'fr', u'Paris', 2)), True)
+
+    def test_fetch_changed_revisions_only(self):
+        store = cache.configure(self.path)
+        store.set(cache.imagekey('fr', u'Paris', 10), True)
+        site = MockSite()
+        pages = list(batch.ContentFetcher(site).fetch([u'Paris', u'Lyon']))
+        self.assertEqual(site.queries, [('info', [u'Paris', u'Lyon']),
+                                        ('revisions', [u'Lyon'])])
+        self.assertEqual([page.revid for page in pages], [10, 10])
+        self.assertEqual(pages[1].text(), u'text')
+
+    def test_cached_status_outlives_entry(self):
+        store = cache.configure(self.path)
+        store.set(cache.imagekey('fr', u'Paris', 10), True)
+        site = MockSite()
+        page = next(batch.ContentFetcher(site).fetch([u'Paris']))
+        # the entry is gone before the page is filtered
+        cache.configure(None)
+        self.assertEqual(page.hasimage, True)
+        self.assertEqual(page.text(), u'text')
+        self.assertEqual(site.queries[-1], ('revisions', [u'Paris']))
+
+    def test_commit_period(self):
+        store = cache.Cache(self.path)
+        store.set(('views', 'fr', u'Paris', '20160101'), 42)
+        other = cache.Cache(self.path)
+        self.assertEqual(other.get(('views', 'fr', u'Paris', '20160101')),
+                         None)
+        store.flush()
+        self.assertEqual(other.get(('views', 'fr', u'Paris', '20160101')),
+                         42)
+        other.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
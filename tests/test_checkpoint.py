@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of checkpoint module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from surfaceimagecontentgap import checkpoint, contentgap
+from surfaceimagecontentgap.records import ArticleRecord
+
+
+class MockArticle(object):
+
+    """Mock of Article."""
+    def __init__(self, name=""):
+        self.name = name
+
+
+class Interrupted(Exception):
+
+    """Raised by the evaluation to interrupt an analysis."""
+    pass
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'checkpoint.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_checkpoint(self):
+        outcomes = checkpoint.Checkpoint(self.path, period=2)
+        outcomes.add(ArticleRecord(u'a', 1, 10, 5), True)
+        outcomes.add(ArticleRecord(u'b', 2, 20), False)
+        outcomes.add(ArticleRecord(u'é', 3, 30), True)
+        outcomes.close()
+        outcomes = checkpoint.Checkpoint(self.path, resume=True)
+        self.assertEqual(outcomes.analyzed(), set([u'a', u'b', u'é']))
+        self.assertEqual(outcomes.kept(), [ArticleRecord(u'a', 1, 10, 5),
+                                           ArticleRecord(u'é', 3, 30)])
+        outcomes.close()
+        outcomes = checkpoint.Checkpoint(self.path)
+        self.assertEqual(outcomes.analyzed(), set())
+        outcomes.close()
+
+    def test_resume(self):
+        articles = [MockArticle(u'a' * n) for n in range(1, 9)]
+        evaluated = []
+        interrupt = [True]
+
+        def evaluation(article):
+            if len(article.name) == 6 and interrupt[0]:
+                raise Interrupted
+            evaluated.append(article.name)
+            return len(article.name)
+        callback = {'timer': 600, 'function': lambda gap: None}
+        keep = [lambda x: len(x.name) != 3]
+        outcomes = checkpoint.Checkpoint(self.path, period=1)
+        gap = contentgap.ContentGap(articles, checkpoint=outcomes)
+        self.assertRaises(Interrupted, gap.filterandrank, keep, evaluation,
+                          callback)
+        outcomes.close()
+        self.assertEqual(len(evaluated), 4)
+        interrupt[0] = False
+        outcomes = checkpoint.Checkpoint(self.path, resume=True)
+        gap = contentgap.ContentGap(articles, checkpoint=outcomes)
+        gap.filterandrank(keep, evaluation, callback)
+        outcomes.close()
+        # only the articles after the interruption are evaluated again
+        self.assertEqual(evaluated[4:], [u'a' * n for n in [6, 7, 8]])
+        self.assertEqual([record.score for record in gap.ranked_articles],
+                         [8, 7, 6, 5, 4, 2, 1])
+        self.assertEqual(gap.metadata(), {'articles': 8, 'filtered': 7})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,36 @@
 import unittest
 
 from surfaceimagecontentgap import contentgap
+from surfaceimagecontentgap.records import ArticleRecord
+
+
+class MockArticle(object):
+
+    """Mock of Article."""
+    def __init__(self, name="", site=None):
+        self.name = name
+        self.site = site
+
+
+class MockSite(object):
+
+    """Mock of mwclient.Site."""
+    site = {'lang': 'fr'}
+
+
+class MockFetcher(object):
+
+    """Mock of batch.BatchFetcher."""
+    def __init__(self, site):
+        self.site = site
+
+    def fetch(self, articles):
+        return (MockArticle(name, self.site) for name in articles)
+
+
+def latest(article):
+    """Evaluation needing the site of the article, as imagegap.latest90."""
+    return len(article.site.site['lang'] + article.name)
 
 
 class Test(unittest.TestCase):
@@ -14,6 +44,86 @@ class Test(unittest.TestCase):
         gap = contentgap.ContentGap([])
         self.assertEqual(gap.articles, [])
 
+    def test_filterandrank_vectorized(self):
+        articles = [MockArticle(name) for name in [u'a', u'bb', u'ccc']]
+        calls = []
+
+        def lengths(articlelist):
+            calls.append(len(articlelist))
+            return [len(article.name) for article in articlelist]
+        gap = contentgap.ContentGap(articles)
+        callback = {'timer': 600, 'function': lambda gap: None}
+        gap.filterandrank([lambda x: x.name != u'bb'], lengths, callback,
+                          vectorized=True)
+        self.assertEqual(calls, [2])
+        # only counted, the ranked records are the ones kept
+        self.assertEqual(gap.filtered, 2)
+        self.assertEqual(gap.filtered_articles, None)
+        self.assertEqual(gap.ranked_articles,
+                         [ArticleRecord(u'ccc', score=3),
+                          ArticleRecord(u'a', score=1)])
+        self.assertEqual(gap.ranked_articles[0]['article'], b'ccc')
+
+    def test_filterandrank_workers(self):
+        articles = [MockArticle(u'a' * (n % 7)) for n in range(50)]
+        callback = {'timer': 600, 'function': lambda gap: None}
+        results = []
+        for workers in [1, 4]:
+            gap = contentgap.ContentGap(articles, workers=workers, inflight=3)
+            gap.filterandrank([lambda x: len(x.name) % 2 == 0],
+                              lambda x: len(x.name), callback)
+            results.append((gap.filtered, gap.ranked_articles))
+        self.assertEqual(results[0], results[1])
+
+    def test_filterandrank_prerank(self):
+        articles = [MockArticle(u'a' * (n % 7) + str(n)) for n in range(60)]
+        callback = {'timer': 600, 'function': lambda gap: None}
+        filtered = []
+
+        def keep(article):
+            filtered.append(article.name)
+            return len(article.name) % 3 != 0
+
+        def lengths(articlelist):
+            return [len(article.name) for article in articlelist]
+        expected = contentgap.ContentGap(articles, top=5)
+        expected.filterandrank([keep], lengths, callback, vectorized=True)
+        for workers in [1, 4]:
+            del filtered[:]
+            gap = contentgap.ContentGap(articles, workers=workers, top=5)
+            gap.filterandrank([keep], lengths, callback, vectorized=True,
+                              prerank=True)
+            self.assertEqual(gap.ranked_articles, expected.ranked_articles)
+            self.assertEqual(gap.preranked, 60)
+            # the articles after the early stop are not filtered
+            self.assertTrue(gap.stopped)
+            self.assertEqual(gap.metadata(), {'articles': 60,
+                                              'filtered': None})
+            # at most inflight articles filtered after the early stop
+            self.assertTrue(len(filtered) <= 5 + gap.inflight)
+
+    def test_metadata_generator(self):
+        articles = (MockArticle(name) for name in [u'a', u'bb', u'ccc'])
+        gap = contentgap.ContentGap(articles)
+        gap.filter([lambda x: len(x.name) > 1])
+        self.assertEqual(gap.metadata(), {'articles': 3, 'filtered': 2})
+
+    def test_rank_site(self):
+        site = MockSite()
+        articles = [MockArticle(name, site) for name in [u'a', u'bb']]
+        gap = contentgap.ContentGap(articles)
+        gap.filter()
+        self.assertEqual([record.score for record in gap.rank(latest)],
+                         [4, 3])
+
+    def test_prerank_site(self):
+        gap = contentgap.ContentGap([u'a', u'bb', u'ccc'], top=1,
+                                    fetcher=MockFetcher(MockSite()))
+        callback = {'timer': 600, 'function': lambda gap: None}
+        gap.filterandrank([lambda x: True], latest, callback, prerank=True)
+        self.assertEqual(gap.ranked_articles, [ArticleRecord(u'ccc', score=5)])
+        self.assertTrue(gap.ranked_articles[0].site is gap.site)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+"""Unit test of crawler module."""
+
+import unittest
+
+from surfaceimagecontentgap import crawler
+
+
+class MockPage(object):
+
+    """Mock of mwclient.Page in a category."""
+    def __init__(self, name="", namespace=0, pages=None):
+        self.name = name
+        self.namespace = namespace
+        self.pages = pages or []
+        self.listed = 0
+
+    def __iter__(self):
+        self.listed += 1
+        return iter(self.pages)
+
+
+class Test(unittest.TestCase):
+
+    def test_crawl_cycle_and_diamond(self):
+        paris = MockPage(u'Paris')
+        left = MockPage(u'Left', 14, [paris, MockPage(u'Lyon')])
+        right = MockPage(u'Right', 14, [paris])
+        bottom = MockPage(u'Bottom', 14, [MockPage(u'Nice')])
+        root = MockPage(u'Root', 14, [left, right])
+        left.pages.append(bottom)
+        right.pages.append(bottom)
+        bottom.pages.append(root)
+        search = crawler.CategoryCrawler(depth=5, workers=2)
+        names = [article.name for article in search.crawl(root)]
+        self.assertEqual(names, [u'Paris', u'Lyon', u'Nice'])
+        self.assertEqual(bottom.listed, 1)
+        self.assertEqual(root.listed, 1)
+        self.assertEqual([(level['depth'], level['categories'],
+                           level['articles']) for level in search.levels],
+                         [(0, 1, 0), (1, 2, 2), (2, 1, 1)])
+
+    def test_crawl_depth(self):
+        sub = MockPage(u'Sub', 14, [MockPage(u'Lyon')])
+        root = MockPage(u'Root', 14, [MockPage(u'Paris'), sub])
+        search = crawler.CategoryCrawler(depth=0)
+        self.assertEqual([a.name for a in search.crawl(root)], [u'Paris'])
+        self.assertEqual(sub.listed, 0)
+
+    def test_crawl_streams_members(self):
+        listed = []
+
+        def lister(category):
+            for number in range(10):
+                listed.append(number)
+                yield MockPage(u'Article %d' % number)
+        search = crawler.CategoryCrawler(lister=lister, buffersize=1)
+        articles = search.crawl(MockPage(u'Root', 14))
+        self.assertEqual(next(articles).name, u'Article 0')
+        # one member in the queue, one waiting to be put
+        self.assertTrue(len(listed) <= 3)
+        self.assertEqual(len(list(articles)), 9)
+
+    def test_crawl_error(self):
+        def lister(category):
+            yield MockPage(u'Paris')
+            raise ValueError('listing failed')
+        search = crawler.CategoryCrawler(lister=lister)
+        articles = search.crawl(MockPage(u'Root', 14))
+        self.assertEqual(next(articles).name, u'Paris')
+        self.assertRaises(ValueError, list, articles)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of dumps module."""
+
+import bz2
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from surfaceimagecontentgap import contentgap, dumps
+
+HOURLY = b"""fr Paris 10 0
+fr.m Paris 5 0
+en Paris 100 0
+fr Lyon 3 0
+fr Marseille 7 0
+malformed line
+"""
+DAILY = (u"fr.wikipedia Île_de_Ré 123 desktop 4 D4\n"
+         u"fr.wikipedia Paris 681 desktop 20 A20\n"
+         u"fr.wikipedia Lyon 682 mobile-web 1 B1\n").encode('utf-8')
+
+
+class MockArticle(object):
+
+    """Mock of Article."""
+    def __init__(self, name=""):
+        self.name = name
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        hourly = os.path.join(self.directory, 'pageviews-20160301-120000.gz')
+        dump = gzip.open(hourly, 'wb')
+        dump.write(HOURLY)
+        dump.close()
+        daily = os.path.join(self.directory, 'pageviews-20160302-user.bz2')
+        dump = bz2.BZ2File(daily, 'wb')
+        dump.write(DAILY)
+        dump.close()
+        self.paths = [hourly, daily]
+        self.index = dumps.PageviewIndex(
+            os.path.join(self.directory, 'index.sqlite'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def test_readdump(self):
+        views = dumps.readdump(self.paths[0], 'fr', set([u'Paris', u'Lyon']))
+        self.assertEqual(views, {u'Paris': 15, u'Lyon': 3})
+
+    def test_windowdumps(self):
+        paths = dumps.windowdumps(self.directory, last=2,
+                                  today=datetime.date(2016, 3, 3))
+        self.assertEqual(paths, self.paths[1:])
+        paths = dumps.windowdumps(self.directory, last=2, hourly=True,
+                                  today=datetime.date(2016, 3, 3))
+        self.assertEqual(paths, self.paths[:1])
+
+    def test_index(self):
+        self.index.load('fr', self.paths, [u'Paris', u'Île de Ré'])
+        self.assertEqual(self.index.views('fr', u'Paris'), 35)
+        self.assertEqual(self.index.views('fr', u'Paris', start='20160302'),
+                         20)
+        self.assertEqual(self.index.views('fr', u'Île de Ré'), 4)
+        self.assertEqual(self.index.views('fr', u'Lyon'), 0)
+
+    def test_index_new_titles(self):
+        self.index.load('fr', self.paths, [u'Paris'])
+        self.index.load('fr', self.paths, [u'Paris', u'Lyon', u'Nowhere'])
+        self.assertEqual(self.index.views('fr', u'Paris'), 35)
+        self.assertEqual(self.index.views('fr', u'Lyon'), 4)
+        self.assertEqual(self.index.indexed('fr'),
+                         set([u'Paris', u'Lyon', u'Nowhere']))
+
+    def test_evaluation(self):
+        self.index.load('fr', self.paths, [u'Paris'])
+        evaluation = self.index.evaluation('fr', last=1,
+                                           today=datetime.date(2016, 3, 3))
+        self.assertEqual(evaluation(MockArticle(u'Paris')), 20)
+        evaluation = self.index.evaluation('fr', vectorized=True,
+                                           today=datetime.date(2016, 3, 3))
+        self.assertEqual(evaluation([MockArticle(u'Paris'),
+                                     MockArticle(u'Lyon')]), [35, 0])
+
+    def test_prerank(self):
+        titles = [u'Lyon', u'Île de Ré', u'Paris']
+        self.index.load('fr', self.paths, titles)
+        evaluation = self.index.evaluation('fr', vectorized=True,
+                                           today=datetime.date(2016, 3, 3))
+        gap = contentgap.ContentGap([MockArticle(title) for title in titles],
+                                    top=1)
+        callback = {'timer': 600, 'function': lambda gap: None}
+        gap.filterandrank([lambda x: True], evaluation, callback,
+                          vectorized=True, prerank=True)
+        self.assertEqual([(entry.title, entry.score)
+                          for entry in gap.ranked_articles], [(u'Paris', 35)])
+        self.assertEqual(gap.processed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
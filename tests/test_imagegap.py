@@ -16,12 +16,52 @@ class MockArticle(object):
         return self.__text__
 
 
+class MockPropsArticle(object):
+
+    """Mock of batch.BatchPage with page properties."""
+    def __init__(self, name="", images=None, pageimage=None):
+        self.name = name
+        self.images = images
+        self.pageimage = pageimage
+
+
+class MockPage(object):
+
+    """Mock of mwclient.Page in a category."""
+    def __init__(self, name="", namespace=0, pages=None):
+        self.name = name
+        self.namespace = namespace
+        self.pages = pages or []
+
+    def __iter__(self):
+        return iter(self.pages)
+
+
 class Test(unittest.TestCase):
 
     def test_isthereanimage(self):
         article = MockArticle(name="Paris", text="<gallery></gallery>")
         self.assertTrue(imagegap.isthereanimage(article))
 
+    def test_isthereanimageprop(self):
+        article = MockPropsArticle(name="Paris", pageimage="Paris.jpg")
+        self.assertTrue(imagegap.isthereanimageprop(article))
+        article = MockPropsArticle(name="Paris", images=["File:Flag.svg"])
+        self.assertFalse(imagegap.isthereanimageprop(article))
+        article = MockPropsArticle(name="Paris", images=["File:Paris.JPG"])
+        self.assertTrue(imagegap.isthereanimageprop(article))
+
+    def test_searcharticles(self):
+        subcat = MockPage(name=u"Sub", namespace=14,
+                          pages=[MockPage(name=u"Lyon")])
+        category = MockPage(name=u"Cat", namespace=14,
+                            pages=[MockPage(name=u"Paris"), subcat])
+        articles = imagegap.searcharticles(category, depth=1)
+        self.assertEqual(next(articles).name, u"Paris")
+        self.assertEqual([a.name for a in articles], [u"Lyon"])
+        articles = imagegap.searcharticles(category)
+        self.assertEqual([a.name for a in articles], [u"Paris"])
+
 
 if __name__ == "__main__":
     unittest.main()
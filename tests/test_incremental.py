@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of incremental module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from surfaceimagecontentgap import contentgap, incremental, records, report
+
+
+class MockPage(object):
+
+    """Mock of mwclient.Page of a report page."""
+    def __init__(self, content=None):
+        self.exists = content is not None
+        self.content = content
+
+    def text(self):
+        return self.content
+
+
+class MockPages(object):
+
+    """Mock of the pages of a mwclient.Site."""
+    def __init__(self, contents):
+        self.contents = contents
+
+    def __getitem__(self, name):
+        return MockPage(self.contents.get(name))
+
+
+class MockSite(object):
+
+    """Mock of mwclient.Site answering info queries and report pages."""
+    rights = []
+
+    def __init__(self, revisions, reports=None):
+        self.revisions = revisions
+        self.Pages = MockPages(reports or {})
+
+    def api(self, action, **kwargs):
+        pages = {}
+        for pageid, title in enumerate(kwargs['titles'].split(u'|')):
+            if title in self.revisions:
+                pages[str(pageid)] = {'pageid': pageid, 'title': title,
+                                      'lastrevid': self.revisions[title]}
+            else:
+                pages[str(-pageid)] = {'title': title, 'missing': ''}
+        return {'query': {'pages': pages}}
+
+
+class MockArticle(object):
+
+    """Mock of Article."""
+    def __init__(self, name="", revid=None):
+        self.name = name
+        self.revid = revid
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.state = incremental.State([
+            records.ArticleRecord(u'Paris', 1, 10, 500),
+            records.ArticleRecord(u'Lyon', 2, 20, 300),
+            records.ArticleRecord(u'Nice', 3, 30, 200)], '20160101', [
+            records.ArticleRecord(u'Lille', 4, 40),
+            records.ArticleRecord(u'Metz', 5, 50)])
+        # Lyon and Metz edited, Nice deleted
+        self.site = MockSite({u'Paris': 10, u'Lyon': 21, u'Lille': 40,
+                              u'Metz': 51})
+
+    def test_refresh(self):
+        kept, stale, rejected = incremental.refresh(self.site, self.state,
+                                                    '20160101')
+        self.assertEqual(kept, [records.ArticleRecord(u'Paris', 1, 10, 500)])
+        self.assertEqual(stale, [u'Lyon', u'Metz'])
+        self.assertEqual(rejected, [records.ArticleRecord(u'Lille', 4, 40)])
+        kept, _, _ = incremental.refresh(self.site, self.state, '20160102')
+        self.assertEqual(kept, [records.ArticleRecord(u'Paris', 1, 10)])
+
+    def test_parsereport(self):
+        ranked = [records.ArticleRecord(u'Saint-Étienne', score=12),
+                  records.ArticleRecord(u'Lyon', score=3)]
+        text = report.create(ranked, 10, 2)
+        self.assertEqual(incremental.parsereport(text), ranked)
+
+    def test_fromreport(self):
+        first = [records.ArticleRecord(u'Paris', score=2)]
+        second = [records.ArticleRecord(u'Lyon', score=1)]
+        site = MockSite({}, {u'Report': report.create(first),
+                             u'Report/2': report.create(second)})
+        state = incremental.fromreport(site, 'Report')
+        self.assertEqual(state.kept, first + second)
+        self.assertEqual(state.window, None)
+
+    def test_dump(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'state.json')
+            self.state.dump(path)
+            state = incremental.previous(self.site, path, 'Report')
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(state.kept, self.state.kept)
+        self.assertEqual(state.rejected, self.state.rejected)
+        self.assertEqual(state.window, '20160101')
+
+    def test_load_ranking(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'state.json')
+            with open(path, 'w') as statefile:
+                statefile.write('{"window": null, '
+                                '"ranking": [["Paris", 1, 10, 500]]}')
+            state = incremental.State.load(path)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(state.kept, [records.ArticleRecord(u'Paris', 1, 10,
+                                                            500)])
+        self.assertEqual(state.rejected, [])
+
+    def test_rerank(self):
+        kept, stale, _ = incremental.refresh(self.site, self.state,
+                                             '20160101')
+        listed = [MockArticle(name) for name in [u'Paris', u'Lyon', u'Caen']]
+        stale = [MockArticle(name) for name in stale]
+        articles = incremental.candidates(stale, listed)
+        evaluated = []
+
+        def evaluation(article):
+            evaluated.append(article.name)
+            return len(article.name)
+        gap = contentgap.ContentGap(articles, previous=kept)
+        callback = {'timer': 600, 'function': lambda gap: None}
+        # Lyon gained an image, Metz still has one
+        gap.filterandrank([lambda x: x.name not in (u'Lyon', u'Metz')],
+                          evaluation, callback)
+        self.assertEqual(evaluated, [u'Caen'])
+        self.assertEqual([entry.title for entry in gap.ranked_articles],
+                         [u'Paris', u'Caen'])
+        self.assertEqual(gap.processed, 3)
+
+    def test_rerank_members(self):
+        kept, _, _ = incremental.refresh(self.site, self.state, '20160101')
+        # Paris left the category, Lyon (edited) is still in it
+        listed = [MockArticle(name) for name in [u'Caen', u'Lyon']]
+        gap = contentgap.ContentGap(listed, previous=kept)
+        callback = {'timer': 600, 'function': lambda gap: None}
+        gap.filterandrank([lambda x: True], lambda x: len(x.name), callback)
+        self.assertEqual([entry.title for entry in gap.ranked_articles],
+                         [u'Caen', u'Lyon'])
+        self.assertEqual(gap.metadata(), {'articles': 2, 'filtered': 2})
+
+    def test_rerank_listed_again(self):
+        kept = [records.ArticleRecord(u'Paris', 1, 10, 500),
+                records.ArticleRecord(u'Nice', 3, 30)]
+        listed = [MockArticle(name) for name in [u'Nice', u'Caen', u'Paris']]
+        evaluated = []
+
+        def evaluation(article):
+            evaluated.append(article.name)
+            return len(article.name)
+        gap = contentgap.ContentGap(listed, previous=kept, workers=2)
+        callback = {'timer': 600, 'function': lambda gap: None}
+        gap.filterandrank([lambda x: True], evaluation, callback)
+        self.assertEqual(sorted(evaluated), [u'Caen', u'Nice'])
+        self.assertEqual([entry.title for entry in gap.ranked_articles],
+                         [u'Paris', u'Nice', u'Caen'])
+        self.assertEqual(gap.processed, 1)
+        self.assertEqual(gap.metadata()['articles'], 3)
+
+    def test_rerank_outcomes(self):
+        kept, _, rejected = incremental.refresh(self.site, self.state,
+                                                '20160101')
+        listed = [MockArticle(name, revid)
+                  for name, revid in [(u'Lille', 40), (u'Paris', 10),
+                                      (u'Metz', 51), (u'Caen', 60)]]
+        analyzed = []
+
+        def keep(article):
+            analyzed.append(article.name)
+            return article.name != u'Metz'
+        results = incremental.State(window='20160101')
+        gap = contentgap.ContentGap(listed, top=1, previous=kept,
+                                    rejected=rejected, outcomes=results)
+        callback = {'timer': 600, 'function': lambda gap: None}
+        gap.filterandrank([keep], lambda x: len(x.name), callback)
+        # Lille is still filtered out, Metz gained an image
+        self.assertEqual(analyzed, [u'Metz', u'Caen'])
+        self.assertEqual(gap.metadata(), {'articles': 4, 'filtered': 2})
+        # every outcome is saved, not only the top ones
+        self.assertEqual(results.kept,
+                         [records.ArticleRecord(u'Paris', 1, 10, 500),
+                          records.ArticleRecord(u'Caen', None, 60, 4)])
+        self.assertEqual([entry.title for entry in results.rejected],
+                         [u'Lille', u'Metz'])
+        site = MockSite({u'Paris': 10, u'Lille': 40, u'Metz': 51, u'Caen': 60})
+        _, stale, rejected = incremental.refresh(site, results, '20160101')
+        self.assertEqual(stale, [])
+        self.assertEqual(len(rejected), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of logger module."""
+
+import logging
+import unittest
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+from surfaceimagecontentgap import logger
+
+
+class MockClock(object):
+
+    """Mock of time.time, moved forward by hand."""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class MockHandler(logging.Handler):
+
+    """Handler keeping the messages of the records."""
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = MockHandler()
+        self.log = logging.getLogger(logger.LOGGER_NAME)
+        self.level = self.log.level
+        self.log.setLevel(logging.INFO)
+        # records of the test are kept by the handler only
+        self.handlers = self.log.handlers
+        self.log.handlers = [self.handler]
+
+    def tearDown(self):
+        self.log.handlers = self.handlers
+        self.log.setLevel(self.level)
+
+    def test_queue(self):
+        queue = Queue()
+        listener = logger.QueueListener(queue, self.handler)
+        listener.start()
+        handler = logger.ProcessQueueHandler(queue, [self.handler])
+        record = logging.LogRecord('sicglog', logging.INFO, __file__, 1,
+                                   '%s articles', (3,), None)
+        handler.handle(record)
+        listener.stop()
+        self.assertEqual(self.handler.messages, ['3 articles'])
+
+    def test_progress(self):
+        clock = MockClock()
+        progress = logger.Progress(total=100, interval=10, sample=20,
+                                   clock=clock)
+        for number in range(40):
+            clock.now += 0.5
+            progress.tick(u'Article %d' % number)
+        self.assertEqual(self.handler.messages, [
+            'Analyzing: Article 19 (article 20)',
+            '20/100 articles analyzed, 2.0 articles/s, ETA 0:00:40',
+            'Analyzing: Article 39 (article 40)',
+            '40/100 articles analyzed, 2.0 articles/s, ETA 0:00:30'])
+        self.assertEqual(progress.eta(), 30)
+
+    def test_progress_unknown_total(self):
+        progress = logger.Progress(sample=None, clock=MockClock())
+        progress.tick()
+        self.assertEqual(progress.eta(), None)
+        progress.report()
+        self.assertEqual(self.handler.messages,
+                         ['1 articles analyzed, 0.0 articles/s'])
+
+
+if __name__ == '__main__':
+    unittest.main()
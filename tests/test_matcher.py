@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of matcher module."""
+
+import unittest
+
+from surfaceimagecontentgap import matcher
+
+
+class MockSite(object):
+
+    """Mock of mwclient.Site answering siteinfo namespaces queries."""
+    site = {'lang': 'fr'}
+
+    def api(self, action, **kwargs):
+        return {'query': {
+            'namespaces': {'6': {'id': 6, '*': u'Fichier',
+                                 'canonical': u'File'}},
+            'namespacealiases': [{'id': 6, '*': u'Image'},
+                                 {'id': 4, '*': u'WP'}]}}
+
+
+class Test(unittest.TestCase):
+
+    def test_search(self):
+        imagematcher = matcher.ImageMatcher()
+        self.assertTrue(imagematcher.search(u'[[File:Paris.png]]'))
+        self.assertTrue(imagematcher.search(u'<gallery></gallery>'))
+        self.assertFalse(imagematcher.search(u'[[Fichier:Paris]]'))
+        self.assertFalse(imagematcher.search(u'No image here.'))
+
+    def test_filenamespaces(self):
+        names = matcher.filenamespaces(MockSite())
+        self.assertEqual(names, [u'Fichier', u'File', u'Image'])
+
+    def test_matcher_by_lang(self):
+        imagematcher = matcher.matcher(MockSite())
+        self.assertTrue(imagematcher is matcher.matcher(MockSite()))
+        self.assertTrue(imagematcher.search(u'[[fichier:Paris]]'))
+
+    def test_search_colons(self):
+        imagematcher = matcher.ImageMatcher()
+        self.assertFalse(imagematcher.search(u':le: [[Category:Paris]] e:'))
+        self.assertTrue(imagematcher.search(u'[[Paris]] [[image:Paris]]'))
+        self.assertTrue(imagematcher.search(u'Paris.JPEG'))
+
+    def test_searchstream(self):
+        imagematcher = matcher.ImageMatcher()
+        chunks = iter([u'foo [[Fi', u'le:Paris]]', u'never read'])
+        self.assertTrue(imagematcher.searchstream(chunks))
+        self.assertEqual(list(chunks), [u'never read'])
+        self.assertFalse(imagematcher.searchstream([u'foo', u'bar']))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of metrics module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from surfaceimagecontentgap import contentgap, metrics
+
+
+class MockArticle(object):
+
+    """Mock of Article."""
+    def __init__(self, name=""):
+        self.name = name
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = metrics.Metrics(buckets=(0.1, 1, 10))
+
+    def test_histogram(self):
+        for value in [0.05, 0.5, 0.5, 5, 50]:
+            self.metrics.observe('fetch', value)
+        summary = self.metrics.asdict()['stages']['fetch']
+        self.assertEqual(summary['count'], 5)
+        self.assertEqual(summary['p50'], 1)
+        self.assertEqual(summary['p99'], 50)
+        self.assertEqual(summary['max'], 50)
+        self.assertAlmostEqual(summary['sum'], 56.05)
+
+    def test_caches(self):
+        for hit in [True, True, False, True]:
+            self.metrics.hit('image', hit)
+        self.assertEqual(self.metrics.asdict()['caches']['image'],
+                         {'hits': 3, 'misses': 1, 'rate': 0.75})
+
+    def test_timed(self):
+        stats = metrics.configure()
+        elements = list(metrics.timed('enumeration', iter([1, 2, 3])))
+        self.assertEqual(elements, [1, 2, 3])
+        self.assertEqual(stats.asdict()['stages']['enumeration']['count'], 3)
+
+    def test_filterandrank(self):
+        stats = metrics.configure()
+        gap = contentgap.ContentGap([MockArticle(u'a'), MockArticle(u'bb')])
+        callback = {'timer': 600, 'function': lambda gap: None}
+        gap.filterandrank([lambda x: len(x.name) > 1],
+                          lambda x: len(x.name), callback)
+        summary = stats.asdict()
+        self.assertEqual(summary['counters'], {'articles': 2, 'filtered': 1})
+        self.assertEqual(summary['stages']['filter']['count'], 2)
+        self.assertEqual(summary['stages']['evaluation']['count'], 1)
+        self.assertEqual(summary['stages']['filterandrank']['count'], 1)
+
+    def test_prometheus(self):
+        self.metrics.observe('fetch', 0.5)
+        self.metrics.observe('fetch', 5)
+        self.metrics.count('http_requests', 2)
+        self.metrics.hit('views', False)
+        text = self.metrics.prometheus()
+        self.assertIn('sicg_stage_seconds_bucket{stage="fetch",le="1.0"} 1',
+                      text)
+        self.assertIn('sicg_stage_seconds_bucket{stage="fetch",le="+Inf"} 2',
+                      text)
+        self.assertIn('sicg_stage_seconds_count{stage="fetch"} 2', text)
+        self.assertIn('sicg_http_requests_total 2', text)
+        self.assertIn('sicg_cache_lookups_total{cache="views",result="miss"} 1',
+                      text)
+
+    def test_write(self):
+        self.metrics.count('articles')
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'metrics.json')
+            self.metrics.write(path)
+            with open(path) as metricsfile:
+                summary = json.load(metricsfile)
+            self.metrics.write(os.path.join(directory, 'metrics.prom'))
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['metrics.json', 'metrics.prom'])
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(summary['counters'], {'articles': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of pageviews module."""
+
+import datetime
+import unittest
+
+from surfaceimagecontentgap import pageviews
+
+
+class MockResponse(object):
+
+    """Mock of requests.Response."""
+    def __init__(self, status_code, views=None):
+        self.status_code = status_code
+        self.views = views
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'items': [{'views': views} for views in self.views]}
+
+
+class MockSession(object):
+
+    """Mock of requests.Session with views by page url name."""
+    def __init__(self, views):
+        self.views = views
+
+    def get(self, url):
+        page = url.split('/')[-4]
+        if page not in self.views:
+            return MockResponse(404)
+        return MockResponse(200, self.views[page])
+
+
+class MockArticle(object):
+
+    """Mock of Article."""
+    def __init__(self, name=""):
+        self.name = name
+
+
+class Test(unittest.TestCase):
+
+    def test_window(self):
+        start, end = pageviews.window(90, datetime.date(2016, 3, 31))
+        self.assertEqual((start, end), ('20160101', '20160331'))
+
+    def test_pagename(self):
+        self.assertEqual(pageviews.pagename(u'AC/DC'), 'AC%2FDC')
+        self.assertEqual(pageviews.pagename(u'Île de Ré'),
+                         '%C3%8Ele_de_R%C3%A9')
+
+    def test_bulk(self):
+        http = MockSession({'Paris': [1, 2, 3], 'Lyon': [4]})
+        fetcher = pageviews.PageviewFetcher('fr', workers=2, http=http)
+        views = fetcher.bulk([u'Paris', u'Lyon', u'Nowhere'])
+        self.assertEqual(views, {u'Paris': 6, u'Lyon': 4, u'Nowhere': 0})
+
+    def test_evaluation(self):
+        http = MockSession({'Paris': [1, 2, 3], 'Lyon': [4]})
+        fetcher = pageviews.PageviewFetcher('fr', workers=2, http=http)
+        articles = [MockArticle(u'Lyon'), MockArticle(u'Paris')]
+        self.assertEqual(fetcher.evaluation(articles), [4, 6])
+
+
+if __name__ == "__main__":
+    unittest.main()
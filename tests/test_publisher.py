@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of publisher module."""
+
+import threading
+import unittest
+
+from surfaceimagecontentgap import publisher
+
+
+class MockWriter(object):
+
+    """Mock of report.ReportWriter recording the snapshots written."""
+    def __init__(self, failures=0, gate=None):
+        self.written = []
+        self.failures = failures
+        self.gate = gate
+
+    def write(self, articlelist, articles=None, filtered_articles=None):
+        if self.gate is not None:
+            self.gate.wait()
+        if self.failures > 0:
+            self.failures -= 1
+            raise IOError('edit failed')
+        self.written.append((articlelist, articles, filtered_articles))
+
+
+class Test(unittest.TestCase):
+
+    def test_publish(self):
+        writer = MockWriter()
+        pub = publisher.AsyncPublisher(writer)
+        pub.publish(['a', 'b'], 10, 2)
+        pub.close()
+        self.assertEqual(writer.written, [(['a', 'b'], 10, 2)])
+        self.assertEqual(pub.published, 1)
+
+    def test_coalesce(self):
+        gate = threading.Event()
+        writer = MockWriter(gate=gate)
+        pub = publisher.AsyncPublisher(writer)
+        pub.publish(['a'], 1, 1)
+        # the first snapshot may be in writing, the next ones wait
+        for count in range(2, 6):
+            pub.publish(['a'] * count, count, count)
+        gate.set()
+        pub.close()
+        self.assertEqual(writer.written[-1], (['a'] * 5, 5, 5))
+        self.assertTrue(len(writer.written) <= 2)
+        self.assertEqual(pub.published + pub.coalesced, 5)
+
+    def test_retry(self):
+        writer = MockWriter(failures=2)
+        pub = publisher.AsyncPublisher(writer, retries=2, backoff=0)
+        pub.publish(['a'], 1, 1)
+        pub.close()
+        self.assertEqual(writer.written, [(['a'], 1, 1)])
+        self.assertEqual(pub.failures, 0)
+
+    def test_give_up(self):
+        writer = MockWriter(failures=3)
+        pub = publisher.AsyncPublisher(writer, retries=1, backoff=0)
+        pub.publish(['a'], 1, 1)
+        pub.close()
+        self.assertEqual(pub.failures, 1)
+        self.assertEqual(writer.written, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Unit test of ranking module."""
+
+import random
+import unittest
+
+from surfaceimagecontentgap import ranking
+from surfaceimagecontentgap.records import ArticleRecord
+
+
+class Test(unittest.TestCase):
+
+    def test_ranked_like_sorted(self):
+        generator = random.Random(42)
+        entries = [ArticleRecord(str(n), score=generator.randint(0, 20))
+                   for n in range(500)]
+        expected = sorted(entries, key=lambda x: -x.score)
+        top = ranking.TopRanking()
+        top.extend(entries)
+        self.assertEqual(top.ranked(), expected)
+        top = ranking.TopRanking(10)
+        top.extend(entries)
+        self.assertEqual(top.ranked(), expected[:10])
+        self.assertEqual(len(top), 10)
+        self.assertEqual(top.count, 500)
+
+    def test_latest(self):
+        latest = ranking.LatestRanking(3)
+        latest.extend(ArticleRecord(title, score=0)
+                      for title in [u'a', u'b', u'c', u'd', u'b'])
+        self.assertEqual([entry.title for entry in latest.ranked()],
+                         [u'b', u'd', u'c'])
+        latest.push(ArticleRecord(u'c', score=5))
+        latest.remove(u'd')
+        self.assertEqual([entry.title for entry in latest.ranked()],
+                         [u'c', u'b'])
+        latest = ranking.LatestRanking(3, top=1)
+        latest.extend(ArticleRecord(title, score=0) for title in [u'a', u'b'])
+        self.assertEqual(latest.ranked(), [ArticleRecord(u'b', score=0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
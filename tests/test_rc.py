@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of rc module."""
+
+import datetime
+import time
+import unittest
+
+from surfaceimagecontentgap import contentgap, rc
+
+
+def change(rcid, title, second):
+    """Recent change at 2016-01-01 00:00:second."""
+    timestamp = time.strptime('20160101000%03d' % second, '%Y%m%d%H%M%S')
+    return {'rcid': rcid, 'title': title, 'timestamp': timestamp}
+
+
+class MockArticle(object):
+
+    """Mock of mwclient.Page."""
+    def __init__(self, name):
+        self.name = name
+
+
+def pages(titles):
+    """Articles of titles, as fetched by a batch fetcher."""
+    return (MockArticle(title) for title in titles)
+
+
+class MockSite(object):
+
+    """Mock of mwclient.Site with a feed of recent changes."""
+    def __init__(self, feed):
+        self.feed = feed
+        self.queries = []
+
+    def recentchanges(self, start=None, dir='older', namespace=None):
+        self.queries.append(start)
+        return [rev for rev in self.feed
+                if time.strftime('%Y%m%d%H%M%S', rev['timestamp']) >= start]
+
+
+class Test(unittest.TestCase):
+
+    def test_follow(self):
+        polls = [[change(3, u'C', 2), change(4, u'A', 3), change(5, u'C', 3)],
+                 [change(6, u'C', 3), change(7, u'B', 4)]]
+        site = MockSite([change(1, u'A', 1), change(2, u'B', 2)])
+
+        def sleep(seconds):
+            site.feed.extend(polls.pop(0))
+        start = datetime.datetime(2016, 1, 1)
+        follower = rc.RecentChangesFollower(site, start, sleep=sleep)
+        titles = list(follower.follow(polls=3))
+        # once per poll, and again at the next poll changing it
+        self.assertEqual(titles, [u'A', u'B', u'C', u'A', u'C', u'B'])
+        self.assertEqual(site.queries, ['20160101000000', '20160101000002',
+                                        '20160101000003'])
+        self.assertEqual(follower.cursor, '20160101000004')
+
+    def test_follow_ranking(self):
+        site = MockSite([change(n, u'a' * n, n) for n in range(1, 6)])
+        start = datetime.datetime(2016, 1, 1)
+        follower = rc.RecentChangesFollower(site, start, sleep=lambda s: None)
+        gap = contentgap.ContentGap(pages(follower.follow(polls=2)), top=2)
+        published = []
+        callback = {'timer': -1,
+                    'function': lambda gap: published.append(
+                        [record.title for record in gap.ranked_articles])}
+        gap.filterandrank([lambda x: len(x.name) != 4],
+                          lambda x: len(x.name), callback)
+        self.assertEqual(published[-1], [u'aaaaa', u'aaa'])
+        # after each article, and at the end
+        self.assertEqual(len(published), 6)
+
+    def test_follow_latest(self):
+        site = MockSite([change(n, u'p%d' % n, n) for n in range(10)])
+
+        def sleep(seconds):
+            # p1 changes again, ranked p8 gains an image
+            site.feed.extend([change(10, u'p1', 10), change(11, u'p8', 11)])
+        follower = rc.RecentChangesFollower(site, datetime.datetime(2016, 1, 1),
+                                            sleep=sleep)
+        gap = contentgap.ContentGap(pages(follower.follow(polls=2)), top=3,
+                                    follow=True)
+        published = []
+        callback = {'timer': -1,
+                    'function': lambda gap: published.append(
+                        [record.title for record in gap.ranked_articles])}
+        seen = set()
+
+        def keep(article):
+            kept = article.name != u'p8' or article.name not in seen
+            seen.add(article.name)
+            return kept
+        gap.filterandrank([keep], lambda x: 0, callback)
+        self.assertEqual([record.title for record in gap.ranked_articles],
+                         [u'p1', u'p9', u'p7'])
+        self.assertIn([u'p9', u'p8', u'p7'], published)
+        self.assertEqual(gap.metadata(), {'articles': 12, 'filtered': 9})
+
+
+if __name__ == '__main__':
+    unittest.main()
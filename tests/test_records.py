@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of records module."""
+
+import unittest
+
+from surfaceimagecontentgap import records
+
+
+class MockPage(object):
+
+    """Mock of mwclient.Page."""
+    def __init__(self, name="", pageid=None, revision=None):
+        self.name = name
+        self.pageid = pageid
+        self.revision = revision
+
+
+class Test(unittest.TestCase):
+
+    def test_record(self):
+        record = records.record(MockPage(u'Île', 3, 42), score=7)
+        self.assertEqual(record.astuple(), (u'Île', 3, 42, 7))
+        self.assertEqual(record.name, u'Île')
+        self.assertEqual(record['article'], u'Île'.encode('utf-8'))
+        self.assertEqual(record['evaluation'], 7)
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_record_of_record(self):
+        record = records.ArticleRecord(u'Paris', 1, 2)
+        self.assertEqual(records.record(record, 5),
+                         records.ArticleRecord(u'Paris', 1, 2, 5))
+
+    def test_hash(self):
+        entries = set([records.ArticleRecord(u'Paris', 1, 2, 5),
+                       records.ArticleRecord(u'Paris', 1, 2, 5),
+                       records.ArticleRecord(u'Paris', 1, 2)])
+        self.assertEqual(len(entries), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of report module."""
+
+import unittest
+
+from surfaceimagecontentgap import report
+from surfaceimagecontentgap.records import ArticleRecord
+
+
+class MockPage(object):
+
+    """Mock of mwclient.Page recording its saves."""
+    def __init__(self, site, name):
+        self.site = site
+        self.name = name
+        self.exists = name in site.contents
+
+    def text(self):
+        return self.site.contents.get(self.name, u'')
+
+    def save(self, text, summary=None):
+        self.site.saved.append((self.name, text))
+        self.site.contents[self.name] = text
+
+
+class MockPages(object):
+
+    """Mock of mwclient.Site.Pages."""
+    def __init__(self, site):
+        self.site = site
+
+    def __getitem__(self, name):
+        return MockPage(self.site, name)
+
+
+class MockSite(object):
+
+    """Mock of mwclient.Site recording the saved pages."""
+    def __init__(self, contents=None):
+        self.saved = []
+        self.contents = contents or {}
+        self.Pages = MockPages(self)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.articles = [ArticleRecord(u'Île', score=42),
+                         ArticleRecord(u'Paris', score=7),
+                         ArticleRecord(u'Lyon', score=1)]
+
+    def test_create(self):
+        content = report.create(self.articles, articles=10,
+                                filtered_articles=3, maxrows=2)
+        self.assertEqual(content,
+                         u'== Report ==\n'
+                         u'{| class="wikitable"\n|-\n! Article\n! Views\n'
+                         u'|-\n| [[Île]]\n| 42\n'
+                         u'|-\n| [[Paris]]\n| 7\n'
+                         u'|}\n'
+                         u'== Data ==\n'
+                         u'* total articles: 10\n'
+                         u'* filtered articles: 3\n')
+
+    def test_data_unknown(self):
+        self.assertEqual(report.data(10, None),
+                         u'== Data ==\n'
+                         u'* total articles: 10\n'
+                         u'* filtered articles: unknown\n')
+        self.assertEqual(report.data(10, 0), u'')
+
+    def test_writer_skips_unchanged(self):
+        site = MockSite()
+        writer = report.ReportWriter(site, 'User:Bot/Report')
+        self.assertEqual(writer.write(self.articles, 10, 3), 1)
+        self.assertEqual(writer.write(self.articles, 20, 3), 0)
+        self.assertEqual(writer.write(self.articles[:2], 20, 2), 1)
+        self.assertEqual(len(site.saved), 2)
+        self.assertEqual(writer.flush(), 0)
+
+    def test_writer_flush_numbers(self):
+        site = MockSite()
+        writer = report.ReportWriter(site, 'User:Bot/Report')
+        writer.write(self.articles, 10, 3)
+        writer.write(self.articles, 20, 3)
+        self.assertEqual(writer.flush(), 1)
+        self.assertTrue(u'total articles: 20' in site.saved[-1][1])
+        self.assertEqual(writer.flush(), 0)
+
+    def test_writer_pages(self):
+        site = MockSite()
+        writer = report.ReportWriter(site, 'User:Bot/Report', pagesize=2)
+        writer.write(self.articles)
+        self.assertEqual([name for name, _ in site.saved],
+                         [u'User:Bot/Report', u'User:Bot/Report/2'])
+        self.assertTrue(u'[[Lyon]]' in site.saved[1][1])
+
+    def test_writer_clears_subpages(self):
+        # subpage left by a former, longer, report
+        site = MockSite({u'User:Bot/Report/3': report.create(self.articles)})
+        writer = report.ReportWriter(site, 'User:Bot/Report', pagesize=2)
+        self.assertEqual(writer.write(self.articles), 3)
+        self.assertEqual(writer.write(self.articles[:1]), 2)
+        self.assertEqual([name for name, _ in site.saved],
+                         [u'User:Bot/Report', u'User:Bot/Report/2',
+                          u'User:Bot/Report/3', u'User:Bot/Report',
+                          u'User:Bot/Report/2'])
+        self.assertFalse(report.ROW_START in site.contents[u'User:Bot/Report/2'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of runner module."""
+
+import threading
+import time
+import unittest
+
+from surfaceimagecontentgap import contentgap, runner
+
+
+class MockArticle(object):
+
+    """Mock of Article."""
+    def __init__(self, name=""):
+        self.name = name
+
+
+class MockBot(object):
+
+    """Mock of bot.SurfaceContentGapBot recording the jobs running."""
+    lock = threading.Lock()
+    running = {}
+    concurrency = {}
+
+    def __init__(self, lang='fr', report=None, list_fun=None,
+                 filter_fun=None, **kwargs):
+        self.lang = lang
+        self.list_fun = list_fun
+        self.filter_fun = filter_fun
+
+    def run(self):
+        with self.lock:
+            running = self.running.get(self.lang, 0) + 1
+            self.running[self.lang] = running
+            self.concurrency[self.lang] = max(
+                running, self.concurrency.get(self.lang, 0))
+        time.sleep(0.01)
+        with self.lock:
+            self.running[self.lang] -= 1
+        if self.lang == 'xx':
+            raise IOError('wiki unreachable')
+        gap = contentgap.ContentGap(self.list_fun(self))
+        gap.filter([lambda article: self.filter_fun(self, article)])
+        return gap
+
+
+def articles(bot):
+    return [MockArticle(name) for name in [u'a', u'bb', u'ccc']]
+
+
+class Test(unittest.TestCase):
+
+    def test_interleave(self):
+        jobs = [{'lang': 'fr', 'n': 1}, {'lang': 'fr', 'n': 2},
+                {'lang': 'en', 'n': 3}, {'lang': 'de', 'n': 4},
+                {'lang': 'en', 'n': 5}]
+        self.assertEqual([job['n'] for job in runner.interleave(jobs)],
+                         [1, 3, 4, 2, 5])
+
+    def test_source(self):
+        self.assertRaises(ValueError, runner.source, 'unknown')
+        self.assertTrue(callable(runner.source('category:Paris')))
+
+    def test_run(self):
+        jobs = [{'lang': lang, 'report': 'Report', 'list_fun': articles}
+                for lang in ['fr', 'fr', 'fr', 'en', 'en', 'xx']]
+        run = runner.Runner(jobs, workers=4, perwiki=2, botclass=MockBot,
+                            defaults={'filter_fun':
+                                      lambda bot, x: len(x.name) > 1})
+        results = run.run()
+        self.assertEqual(len(results), 6)
+        self.assertEqual(max(MockBot.concurrency.values()), 2)
+        summary = dict((wiki['lang'], wiki) for wiki in run.summary())
+        self.assertEqual(summary['fr']['jobs'], 3)
+        self.assertEqual(summary['fr']['articles'], 9)
+        self.assertEqual(summary['fr']['filtered'], 6)
+        self.assertEqual(summary['xx']['errors'], 1)
+        self.assertEqual(summary['en']['errors'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
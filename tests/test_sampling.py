@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of sampling module."""
+
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from surfaceimagecontentgap import sampling
+
+
+class MockSite(object):
+
+    """Mock of mwclient.Site answering random queries from batches."""
+    def __init__(self, batches):
+        self.batches = batches
+        self.queries = []
+
+    def api(self, action, **kwargs):
+        self.queries.append(kwargs)
+        titles = self.batches.pop(0)
+        return {'query': {'random': [{'ns': 0, 'title': title}
+                                     for title in titles]},
+                'continue': {'rncontinue': 'next', 'continue': '-||'}}
+
+
+class Test(unittest.TestCase):
+
+    def test_randomtitles(self):
+        site = MockSite([[u'A', u'B', u'A'], [u'B', u'C', u'D', u'E']])
+        titles = list(sampling.randomtitles(site, 4))
+        self.assertEqual(titles, [u'A', u'B', u'C', u'D'])
+        self.assertEqual(site.queries[0]['rnlimit'], 'max')
+        self.assertEqual(site.queries[1]['rncontinue'], 'next')
+
+    def test_randomtitles_small_wiki(self):
+        site = MockSite([[u'A', u'B'], [u'B', u'A']])
+        self.assertEqual(list(sampling.randomtitles(site, 4)), [u'A', u'B'])
+
+    def test_reservoir(self):
+        self.assertEqual(sampling.reservoir(range(3), 5), [0, 1, 2])
+        sample = sampling.reservoir(range(1000), 10, random.Random(1))
+        self.assertEqual(len(set(sample)), 10)
+        self.assertEqual(sample,
+                         sampling.reservoir(range(1000), 10, random.Random(1)))
+
+    def test_reservoir_uniform(self):
+        rng = random.Random(0)
+        counts = [0] * 10
+        for _ in range(2000):
+            for item in sampling.reservoir(range(10), 3, rng):
+                counts[item] += 1
+        # each item is expected 600 times
+        self.assertTrue(all(500 < count < 700 for count in counts))
+
+    def test_sampletitles(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'all-titles-in-ns0.gz')
+            dump = gzip.open(path, 'wb')
+            dump.write(u'page_title\nParis\nÉcole_normale\nLyon\n'
+                       .encode('utf-8'))
+            dump.close()
+            self.assertEqual(sorted(sampling.sampletitles(path, 5)),
+                             [u'Lyon', u'Paris', u'École normale'])
+            self.assertEqual(sampling.sampletitles(path, 2, seed=3),
+                             sampling.sampletitles(path, 2, seed=3))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of sharding module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from surfaceimagecontentgap import contentgap, sharding
+
+
+class MockArticle(object):
+
+    """Mock of Article."""
+    def __init__(self, name=""):
+        self.name = name
+
+
+def keep(article):
+    return len(article.name) % 3 != 0
+
+
+def evaluation(article):
+    # many equal scores, ranked by their order
+    return len(article.name) % 5
+
+
+def serial(articles, top=None):
+    gap = contentgap.ContentGap(articles, top=top)
+    callback = {'timer': 600, 'function': lambda gap: None}
+    gap.filterandrank([keep], evaluation, callback)
+    return gap
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.articles = [MockArticle(u'é' * (n % 11) + str(n))
+                         for n in range(200)]
+
+    def test_partition(self):
+        self.assertEqual(sharding.partition(u'Paris', 4),
+                         sharding.partition(b'Paris', 4))
+        shards = [sharding.partition(article.name, 4)
+                  for article in self.articles]
+        self.assertEqual(set(shards), set(range(4)))
+
+    def test_parseshard(self):
+        self.assertEqual(sharding.parseshard('1/4'), (1, 4))
+        self.assertRaises(ValueError, sharding.parseshard, '4/4')
+        self.assertRaises(ValueError, sharding.parseshard, '1')
+
+    def test_merge(self):
+        for top in [None, 10]:
+            expected = serial(self.articles, top)
+            partials = []
+            for index in range(3):
+                gap = contentgap.ContentGap(self.articles, top=top,
+                                            shard=(index, 3))
+                callback = {'timer': 600, 'function': lambda gap: None}
+                gap.filterandrank([keep], evaluation, callback)
+                partials.append(gap.partial())
+            merged = sharding.merge(partials, top)
+            self.assertEqual(merged.ranked(), expected.ranked_articles)
+            self.assertEqual(merged.processed, 200)
+            self.assertEqual(merged.filtered, expected.filtered)
+
+    def test_dump(self):
+        gap = contentgap.ContentGap(self.articles, shard=(0, 2))
+        gap.filter([keep])
+        gap.rank(evaluation)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'partial.json')
+            gap.partial().dump(path)
+            partial = sharding.Partial.load(path)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(partial.entries, gap.partial().entries)
+
+    def test_shardedrank(self):
+        merged = contentgap.shardedrank(self.articles, [keep], evaluation,
+                                        processes=2, top=20)
+        self.assertEqual(merged.ranked(),
+                         serial(self.articles, 20).ranked_articles)
+
+
+if __name__ == '__main__':
+    unittest.main()
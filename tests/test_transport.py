@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""Unit test of transport module."""
+
+import unittest
+
+import requests
+from requests.adapters import BaseAdapter
+
+from surfaceimagecontentgap import transport
+
+
+class MockClock(object):
+
+    """Clock advanced by its sleeps."""
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class MockAdapter(BaseAdapter):
+
+    """Adapter answering scripted (status, headers) responses."""
+    def __init__(self, answers):
+        super(MockAdapter, self).__init__()
+        self.answers = answers
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        status, headers = self.answers.pop(0)
+        if status is None:
+            raise requests.exceptions.ConnectionError('refused')
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = b'{}'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def mocktransport(answers, **kwargs):
+    clock = MockClock()
+    http = transport.Transport(sleep=clock.sleep, **kwargs)
+    adapter = MockAdapter(answers)
+    http.mount('https://', adapter)
+    return http, adapter, clock
+
+
+class Test(unittest.TestCase):
+
+    def test_token_bucket(self):
+        clock = MockClock()
+        bucket = transport.TokenBucket(2, burst=2, clock=clock,
+                                       sleep=clock.sleep)
+        waits = [bucket.acquire() for _ in range(4)]
+        self.assertEqual(waits, [0, 0, 0.5, 0.5])
+        clock.now += 10
+        self.assertEqual(bucket.acquire(), 0)
+
+    def test_retry(self):
+        http, adapter, clock = mocktransport(
+            [(503, {'Retry-After': '7'}), (None, {}), (429, {}), (200, {})],
+            backoff=1)
+        response = http.get('https://wikimedia.org/api/rest_v1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(clock.sleeps, [7, 2, 4])
+        self.assertEqual(http.stats()['requests'], 4)
+        self.assertEqual(http.stats()['retries'], 3)
+        self.assertEqual(http.stats()['bytes'], 6)
+
+    def test_give_up(self):
+        http, adapter, clock = mocktransport([(503, {})] * 3, retries=2)
+        response = http.get('https://wikimedia.org/api/rest_v1/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(adapter.sent), 3)
+
+    def test_not_retried(self):
+        # mwclient retries the wiki requests, edits are never retried
+        http, adapter, clock = mocktransport([(503, {}), (None, {}),
+                                              (503, {})])
+        response = http.get('https://fr.wikipedia.org/w/api.php')
+        self.assertEqual(response.status_code, 503)
+        self.assertRaises(requests.exceptions.ConnectionError, http.get,
+                          'https://fr.wikipedia.org/w/api.php')
+        response = http.post('https://wikimedia.org/api/rest_v1/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(http.stats()['retries'], 0)
+        self.assertEqual(clock.sleeps, [])
+
+    def test_client_agent(self):
+        http, adapter, clock = mocktransport([(200, {}), (200, {})])
+        http.client('Bot/1.0').get('https://fr.wikipedia.org/w/api.php')
+        http.get('https://fr.wikipedia.org/w/api.php')
+        self.assertEqual(adapter.sent[0].headers['User-Agent'], 'Bot/1.0')
+        self.assertEqual(adapter.sent[1].headers['User-Agent'],
+                         transport.USER_AGENT)
+
+    def test_not_found(self):
+        http, adapter, clock = mocktransport([(404, {})])
+        response = http.get('https://wikimedia.org/api/rest_v1/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(http.stats()['retries'], 0)
+
+    def test_maxlag(self):
+        http, adapter, clock = mocktransport([(200, {}), (200, {})])
+        http.post('https://fr.wikipedia.org/w/api.php',
+                  data={'action': 'query'})
+        self.assertIn('maxlag=5', adapter.sent[0].body)
+        http.get('https://wikimedia.org/api/rest_v1/', params={'a': 1})
+        self.assertNotIn('maxlag', adapter.sent[-1].url)
+
+    def test_rates(self):
+        http = transport.Transport()
+        self.assertEqual(http.bucket('wikimedia.org').rate, 100)
+        self.assertEqual(http.bucket('fr.wikipedia.org').rate,
+                         transport.RATE)
+
+
+if __name__ == '__main__':
+    unittest.main()